@@ -1,14 +1,39 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from models.embeddings import EmbeddingModel
-from services.vector_db import VectorDB
-from services.tenor_api import TenorAPI
+from models.batcher import EmbeddingBatcher
+from models import anchors
+from models.anchors import AnchorIndex
+from models.classifier import LinearClassifier
+from services.tenor_api import TenorAPI, format_tenor_results
+from services.indexer import IndexWriter
+from services.retention import RetentionManager
+from services.retrieval import RetrievalEngine, RetrievalPolicy
+from services.result_cache import SemanticResultCache
+from services.conversation import ConversationContext
+from services.prefetch import Prefetcher, warmup_queries
+from services.vector_db import open_vector_db
+from services.hybrid import HybridVectorDB
+from services.favorites import FavoritesStore
+from services.generation import GENERATION_BUCKETS_MS, GenerationQueue, VertexImageGenerator, FakeImageGenerator
+from services.media import MediaStore, media_url
+from utils.executors import BoundedPool
+from utils.instrumentation import metrics, ServerTimingMiddleware
+from utils.log import log, setup_logging, stop_logging
+from utils.ids import point_id
 from dotenv import load_dotenv
+from contextlib import contextmanager
+import asyncio
+from typing import List, Optional
+import config
 import os
+import time
 
 # Load env vars
 load_dotenv()
+setup_logging(config.LOG_LEVEL)
 
 app = FastAPI(title="AI GIF Picker API")
 
@@ -19,17 +44,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+# Per-stage histograms for /metrics and the Server-Timing header
+app.add_middleware(ServerTimingMiddleware)
 
 # Global instances
 model = None
+batcher = None
 vector_db = None
 tenor_api = None
+indexer = None
+retention = None
+retrieval = None
+result_cache = None
+prefetcher = None
+conversations = None
+
+# Blocking work never runs on the event loop; see config.py for sizing
+inference_pool = BoundedPool("inference", config.INFERENCE_WORKERS)
+io_pool = BoundedPool("io", config.IO_WORKERS)
+generation_pool = BoundedPool("generation", config.GENERATION_WORKERS, buckets=GENERATION_BUCKETS_MS)
 
 
 class SearchRequest(BaseModel):
     query: str
     limit: int = 10
+    policy: Optional[str] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    limit: int = 10
+    policy: Optional[str] = None
+
+SIMILARITY_THRESHOLD = config.SIMILARITY_THRESHOLD
 
 @app.get("/")
 async def root():
@@ -37,106 +85,383 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    status = "ok" if model and vector_db else "loading"
-    return {"status": status}
+    if model and vector_db:
+        status = "ok"
+    elif STARTUP["phase"] == "error":
+        status = "error"
+    else:
+        status = "loading"
+    return {
+        "status": status,
+        "phase": STARTUP["phase"],
+        "startup_ms": STARTUP["timings_ms"]
+    }
+
+def runtime_samples():
+    # Gauges and cumulative counters owned by other components, read at scrape time
+    if model and model.cache:
+        cache = model.cache_stats()
+        yield "embedding_cache_lookups_total", "counter", "Embedding cache lookups", {"result": "hit"}, cache["hits"]
+        yield "embedding_cache_lookups_total", "counter", "Embedding cache lookups", {"result": "miss"}, cache["misses"]
+        yield "embedding_cache_entries", "gauge", "Embeddings held in the cache", {}, cache["size"]
+    for name, pool in (("inference", inference_pool), ("io", io_pool), ("generation", generation_pool)):
+        yield "pool_active", "gauge", "Tasks running on each worker pool", {"pool": name}, pool.active
+        yield "pool_queued", "gauge", "Tasks waiting for each worker pool", {"pool": name}, pool.queued
+    if indexer:
+        yield "indexer_pending", "gauge", "Points waiting to be upserted", {}, len(indexer.pending)
+    if generation:
+        yield "generation_queued", "gauge", "Image generation jobs waiting for a worker", {}, generation.queue.qsize()
+
+metrics.collectors.append(runtime_samples)
+metrics.describe("threshold_hits", "Local results at or above the similarity threshold")
+metrics.describe("searches", "Searches by whether the local index had relevant results")
+metrics.describe("result_cache_lookups", "Semantic result cache lookups")
+metrics.describe("tenor_fallbacks", "Tenor calls made in the request path (foreground) or as a background refresh")
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/stats")
+async def get_stats():
+    return {
+        "embedding_cache": model.cache_stats() if model else {},
+        "embedding_batcher": batcher.stats() if batcher else {},
+        "tenor": tenor_api.stats() if tenor_api else {},
+        "indexer": indexer.stats() if indexer else {},
+        "retention": retention.stats() if retention else {},
+        "retrieval": retrieval.stats() if retrieval else {},
+        "result_cache": result_cache.stats() if result_cache else {},
+        "prefetch": prefetcher.stats() if prefetcher else {},
+        "hybrid": vector_db.stats() if isinstance(vector_db, HybridVectorDB) else {},
+        "conversations": conversations.stats() if conversations else {},
+        "favorites": favorites.stats() if favorites else {},
+        "generation": generation.stats() if generation else {},
+        "pools": {
+            pool.name: pool.stats() for pool in (inference_pool, io_pool, generation_pool)
+        }
+    }
 
 @app.post("/api/search/semantic")
 async def semantic_search(request: SearchRequest):
-    print(f"Received search request: {request.query}")
+    log.debug("Received search request: %s", request.query)
     if not model or not vector_db:
-        print("Services not loaded")
+        log.warning("Services not loaded")
         raise HTTPException(status_code=503, detail="Services not loaded")
+    policy = retrieval_policy(request.policy)
     
     try:
         # 1. Generate embedding
-        print("Generating embedding...")
-        embedding, duration = model.encode(request.query)
-        print(f"Embedding generated in {duration}ms")
+        embedding = await encode(request.query)
+
+        # Paraphrases of a recent query reuse its answer
+        cached = cached_results(request.query, embedding, request.limit, policy)
+        if cached is not None:
+            log.debug("Result cache hit (%d results)", len(cached))
+            return {"results": cached}
         
-        # 2. Search vector DB
-        print("Searching vector DB...")
-        all_results = vector_db.search(embedding, limit=request.limit)
+        # 2. Search vector DB (dense + BM25 over titles and queries)
+        with metrics.stage("vector_search"):
+            all_results = await io_pool.run(vector_db.hybrid_search, request.query, embedding, limit=request.limit)
         
         # Filter by similarity threshold
-        SIMILARITY_THRESHOLD = 0.6
-        results = [r for r in all_results if r.score >= SIMILARITY_THRESHOLD]
-        print(f"Found {len(results)} relevant results (score >= {SIMILARITY_THRESHOLD})")
-        
-        # 3. If low confidence or few results, fallback to Tenor
-        tenor_results = []
-        if len(results) < request.limit:
-            print("Fetching from Tenor...")
-            tenor_data = tenor_api.search(request.query, limit=request.limit)
-            
-            # Format Tenor results immediately
-            formatted_tenor_results = []
-            for item in tenor_data:
-                media = item.get("media_formats", {})
-                formatted_tenor_results.append({
-                    "id": item.get("id"),
-                    "title": item.get("content_description", ""),
-                    "url": item.get("itemurl", ""),
-                    "src": media.get("webm", {}).get("url", ""),
-                    "gif_src": media.get("gif", {}).get("url", ""),
-                    "width": media.get("gif", {}).get("dims", [498, 373])[0],
-                    "height": media.get("gif", {}).get("dims", [498, 373])[1],
-                    "preview": media.get("tinygif", {}).get("url", "")
-                })
-            
-            # LAZY INDEXING: Save these results to VectorDB with the query's embedding
-            if formatted_tenor_results:
-                print(f"Indexing {len(formatted_tenor_results)} new results for query: '{request.query}'")
-                # Create a list of the same embedding for all results
-                embeddings = [embedding] * len(formatted_tenor_results)
-                # Use the formatted results as payloads
-                payloads = formatted_tenor_results
-                vector_db.upsert(embeddings, payloads)
-                
-            tenor_results = formatted_tenor_results
-
-        # Format results for Discord
-        formatted_results = []
+        decision = decide(policy, request.query, all_results, request.limit)
+        results = decision.results
+        log.debug("Found %d relevant results (score >= %s)", len(results), SIMILARITY_THRESHOLD)
+        retention.record_hits([r.id for r in results])
         
-        # Process Semantic Results
-        for r in results:
-            payload = r.payload
-            formatted_results.append(payload)
-
-        # Add Tenor Results (already formatted)
-        formatted_results.extend(tenor_results)
-
-        # Deduplicate by ID
-        seen_ids = set()
-        unique_results = []
-        for r in formatted_results:
-            if r['id'] not in seen_ids:
-                unique_results.append(r)
-                seen_ids.add(r['id'])
+        # 3. Tenor in the request path or in the background, per the retrieval policy
+        tenor_results = await fetch_upstream(decision, embedding, request.limit)
 
+        merged = merge_results(results, tenor_results, request.limit)
+        result_cache.put(request.query, embedding, request.limit, merged, policy.name)
         return {
-            "results": unique_results[:request.limit]
+            "results": merged
         }
     except Exception as e:
-        print(f"Error during search: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error during search: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/search/semantic/batch")
+async def semantic_search_batch(request: BatchSearchRequest):
+    # Suggestion chips in one round trip: one batched encode, one batched
+    # vector query, and the Tenor fallbacks run concurrently
+    log.debug("Received batch search request: %d queries", len(request.queries))
+    if not model or not vector_db:
+        log.warning("Services not loaded")
+        raise HTTPException(status_code=503, detail="Services not loaded")
+    if len(request.queries) > config.BATCH_SEARCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"At most {config.BATCH_SEARCH_MAX_QUERIES} queries per batch")
+    policy = retrieval_policy(request.policy)
+
+    # Repeated queries are searched once
+    queries = list(dict.fromkeys(request.queries))
+    if not queries:
+        return {"results": []}
+
+    try:
+        embeddings = await encode_many(queries)
+        by_query = {}
+        misses = []
+        for query, embedding in zip(queries, embeddings):
+            cached = cached_results(query, embedding, request.limit, policy)
+            if cached is not None:
+                by_query[query] = cached
+            else:
+                misses.append((query, embedding))
+
+        async def complete(query, embedding, hits):
+            decision = decide(policy, query, hits, request.limit)
+            retention.record_hits([r.id for r in decision.results])
+            tenor_results = await fetch_upstream(decision, embedding, request.limit)
+            merged = merge_results(decision.results, tenor_results, request.limit)
+            result_cache.put(query, embedding, request.limit, merged, policy.name)
+            return merged
+
+        if misses:
+            with metrics.stage("vector_search"):
+                all_results = await io_pool.run(
+                    vector_db.hybrid_search_batch,
+                    [q for q, _ in misses],
+                    [e for _, e in misses],
+                    limit=request.limit
+                )
+            merged = await asyncio.gather(*(
+                complete(query, embedding, hits)
+                for (query, embedding), hits in zip(misses, all_results)
+            ))
+            by_query.update(zip([q for q, _ in misses], merged))
+        return {
+            "results": [{"query": query, "results": by_query[query]} for query in request.queries]
+        }
+    except Exception as e:
+        log.exception("Error during batch search: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/search/semantic/stream")
+async def semantic_search_stream(request: SearchRequest, format: str = Query("ndjson", pattern="^(ndjson|sse)$")):
+    # Same results as /api/search/semantic, but local hits are sent as soon as
+    # the vector search returns and Tenor results follow when they arrive.
+    # Events: "local", then "tenor" (only new GIFs), then "done".
+    log.debug("Received streaming search request: %s", request.query)
+    if not model or not vector_db:
+        log.warning("Services not loaded")
+        raise HTTPException(status_code=503, detail="Services not loaded")
+    policy = retrieval_policy(request.policy)
+
+    started = time.perf_counter()
+
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000, 1)
+
+    try:
+        embedding = await encode(request.query)
+        cached = cached_results(request.query, embedding, request.limit, policy)
+        if cached is not None:
+            async def cached_events():
+                yield stream_event("local", {"results": cached, "cached": True, "elapsed_ms": elapsed_ms()}, format)
+                yield stream_event("done", {"count": len(cached), "elapsed_ms": elapsed_ms()}, format)
+            return StreamingResponse(
+                cached_events(),
+                media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+        with metrics.stage("vector_search"):
+            all_results = await io_pool.run(vector_db.hybrid_search, request.query, embedding, limit=request.limit)
+    except Exception as e:
+        log.exception("Error during search: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+    decision = decide(policy, request.query, all_results, request.limit)
+    results = decision.results
+    retention.record_hits([r.id for r in results])
+    local_results = merge_results(results, [], request.limit)
+
+    async def events():
+        yield stream_event("local", {"results": local_results, "elapsed_ms": elapsed_ms()}, format)
+        count = len(local_results)
+        tenor_results = []
+        if decision.upstream:
+            try:
+                tenor_results = await fetch_upstream(decision, embedding, request.limit)
+            except Exception as e:
+                log.warning("Error during streaming search: %s", e)
+                yield stream_event("error", {"detail": str(e)}, format)
+                return
+            new_results = merge_results(results, tenor_results, request.limit)[count:]
+            yield stream_event("tenor", {"results": new_results, "elapsed_ms": elapsed_ms()}, format)
+            count += len(new_results)
+        else:
+            await fetch_upstream(decision, embedding, request.limit)
+        result_cache.put(request.query, embedding, request.limit, merge_results(results, tenor_results, request.limit), policy.name)
+        yield stream_event("done", {"count": count, "elapsed_ms": elapsed_ms()}, format)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if format == "sse" else "application/x-ndjson",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_event(event: str, data: dict, format: str) -> str:
+    if format == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps({"event": event, **data}) + "\n"
+
+async def encode(text: str):
+    with metrics.stage("encode"):
+        embedding, duration = await batcher.encode(text)
+    # Forward pass share of the above, as reported by the model
+    metrics.observe("encode_model", duration)
+    return embedding
+
+async def encode_many(texts: List[str]):
+    with metrics.stage("encode"):
+        embeddings, duration = await batcher.encode_many(texts)
+    metrics.observe("encode_model", duration)
+    return embeddings
+
+def decide(policy, query: str, hits, limit: int):
+    decision = retrieval.decide(policy, query, hits, limit)
+    metrics.count("threshold_hits", len(decision.results))
+    metrics.count("searches", outcome="local" if decision.results else "empty")
+    return decision
+
+def cached_results(query: str, embedding, limit: int, policy):
+    with metrics.stage("result_cache"):
+        cached = result_cache.get(query, embedding, limit, policy.name)
+    metrics.count("result_cache_lookups", result="miss" if cached is None else "hit")
+    if cached is not None:
+        # Local hits served from the cache still count as hits for retention
+        retention.record_hits([point_id(r["id"], r["query"]) for r in cached if "query" in r])
+    return cached
+
+def on_index_write(ids, vectors, payloads):
+    retention.record_inserts(ids)
+    result_cache.invalidate(vectors, payloads)
+
+def on_evict(ids):
+    result_cache.forget(ids)
+
+def retrieval_policy(name: Optional[str]):
+    try:
+        return retrieval.get(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def fetch_upstream(decision, embedding, limit: int):
+    # Tenor in the request path, or a background refresh (SWR); [] otherwise
+    def fetch():
+        return tenor_fallback(decision.query, embedding, limit)
+    if decision.upstream:
+        metrics.count("tenor_fallbacks", mode="foreground")
+        return await retrieval.fetch(decision, fetch)
+    if decision.revalidate and retrieval.revalidate(decision, fetch):
+        metrics.count("tenor_fallbacks", mode="background")
+    return []
+
+def build_retrieval_engine():
+    return RetrievalEngine(
+        [
+            RetrievalPolicy("local-only", "never"),
+            RetrievalPolicy(
+                "swr",
+                "swr",
+                min_hits=config.SWR_MIN_HITS,
+                min_top_score=config.SWR_MIN_TOP_SCORE,
+                min_margin=config.SWR_MIN_MARGIN
+            ),
+            RetrievalPolicy("always-upstream", "always"),
+            RetrievalPolicy("fill", "unfilled"),
+        ],
+        default=config.RETRIEVAL_POLICY,
+        threshold=SIMILARITY_THRESHOLD,
+        revalidate_after=config.SWR_REVALIDATE_AFTER,
+        max_revalidations=config.SWR_MAX_REVALIDATIONS,
+        min_coverage=config.HYBRID_MIN_COVERAGE
+    )
+
+async def tenor_fallback(query: str, embedding, limit: int):
+    log.info("Fetching from Tenor: '%s'", query)
+    with metrics.stage("tenor_fetch"):
+        tenor_results = format_tenor_results(await tenor_api.search(query, limit=limit))
+
+    # LAZY INDEXING: Queue these results for VectorDB with the query's embedding.
+    # The write happens in the background; point ids are derived from
+    # (query, Tenor id) so re-indexing the same GIF overwrites it.
+    if tenor_results:
+        log.debug("Queueing %d results for indexing: '%s'", len(tenor_results), query)
+        # Create a list of the same embedding for all results
+        embeddings = [embedding] * len(tenor_results)
+        payloads = [{**r, "query": query} for r in tenor_results]
+        indexer.submit(embeddings, payloads)
+    return tenor_results
+
+def merge_results(local_results, tenor_results, limit: int):
+    # Local hits first, then Tenor, deduplicated by GIF id
+    seen_ids = set()
+    unique_results = []
+    for r in [p.payload for p in local_results] + tenor_results:
+        if r['id'] not in seen_ids:
+            unique_results.append(r)
+            seen_ids.add(r['id'])
+    return unique_results[:limit]
+
 @app.delete("/api/reset")
 async def reset_db():
-    print("Resetting Vector DB...")
+    log.info("Resetting Vector DB...")
     global vector_db
     try:
-        # Re-initialize with a fresh collection (dropping old one)
-        vector_db.client.delete_collection(vector_db.collection_name)
-        vector_db._ensure_collection()
+        async def wipe():
+            # Re-initialize with a fresh collection (dropping old one)
+            await io_pool.run(vector_db.reset)
+            await io_pool.run(retention.clear)
+        # Queued and in-flight writes must not repopulate the fresh collection
+        await indexer.reset(wipe)
+        result_cache.clear()
         return {"status": "success", "message": "Brain wiped! 🧠✨"}
     except Exception as e:
-        print(f"Error resetting DB: {e}")
+        log.exception("Error resetting DB: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/collection")
+async def collection_status():
+    if not vector_db:
+        raise HTTPException(status_code=503, detail="Services not loaded")
+    size = await io_pool.run(vector_db.count)
+    tracked = await io_pool.run(retention.tracked)
+    return {"size": size, "tracked": tracked, **retention.stats()}
+
+@app.post("/api/admin/evict")
+async def evict_now():
+    if not vector_db:
+        raise HTTPException(status_code=503, detail="Services not loaded")
+    evicted = await retention.enforce()
+    return {**evicted, "size": await io_pool.run(vector_db.count)}
+
+@app.post("/api/admin/prefetch")
+async def prefetch_now():
+    # Runs in the background; progress shows up in /api/stats under "prefetch"
+    if not prefetcher:
+        raise HTTPException(status_code=503, detail="Services not loaded")
+    queries = warmup_queries(EMOTION_DATA)
+    if not prefetcher.trigger(queries):
+        return {"status": "already running"}
+    return {"status": "started", "queries": len(queries)}
+
+@app.post("/api/admin/compact")
+async def compact_now():
+    if not vector_db:
+        raise HTTPException(status_code=503, detail="Services not loaded")
+    duration = await retention.compact()
+    return {"compaction_ms": duration, "size": await io_pool.run(vector_db.count)}
+
 class ContextRequest(BaseModel):
-    messages: list[str]
+    messages: list[str] = []
+    # Conversation mode: messages are only the ones posted since the last call
+    # for this channel, draft is the unsent input box text
+    session_id: Optional[str] = None
+    draft: Optional[str] = None
+    reset: bool = False
 
 # Pre-defined anchors for context detection
 EMOTION_ANCHORS = {
@@ -159,18 +484,14 @@ SUGGESTIONS = {
     "funny": ["laughing", "spit take", "wheeze", "dying laughing"]
 }
 
-# Global cache for anchor embeddings
-ANCHOR_EMBEDDINGS = {}
+# Global cache for anchor embeddings (AnchorIndex once computed)
+ANCHOR_EMBEDDINGS = None
 EMOTION_DATA = {}
 CLASSIFIER = None
 CLASSIFIER_LABELS = []
 
 import numpy as np
 import json
-import joblib
-
-def cosine_similarity(a, b):
-    return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 # Mapping GoEmotions labels to our Suggestion Categories
 EMOTION_MAPPING = {
@@ -184,51 +505,239 @@ EMOTION_MAPPING = {
     "neutral": "neutral"
 }
 
-@app.on_event("startup")
-async def startup_event():
-    global model, vector_db, tenor_api, ANCHOR_EMBEDDINGS, EMOTION_DATA, EMOTION_ANCHORS, SUGGESTIONS, CLASSIFIER, CLASSIFIER_LABELS
-    # Initialize model
-    model = EmbeddingModel()
-    # Initialize VectorDB
-    vector_db = VectorDB(memory=False)
-    # Initialize Tenor API
-    tenor_api = TenorAPI()
-    
-    # Load Emotion Data
+EMOTIONS_FILE = "data/emotions.json"
+EMOTIONS_JSON = b""
+
+# Startup progress, reported by /health
+STARTUP = {"phase": "starting", "timings_ms": {}, "error": None}
+startup_task = None
+
+@contextmanager
+def startup_phase(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP["timings_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+
+def load_emotion_data():
+    global EMOTION_DATA, EMOTION_ANCHORS, SUGGESTIONS, EMOTIONS_JSON
     try:
-        with open("data/emotions.json", "r") as f:
-            EMOTION_DATA = json.load(f)
+        with open(EMOTIONS_FILE, "rb") as f:
+            EMOTIONS_JSON = f.read()
+        EMOTION_DATA = json.loads(EMOTIONS_JSON)
             
         # Populate global dicts from JSON
         EMOTION_ANCHORS = {k: v["anchors"] for k, v in EMOTION_DATA["emotions"].items()}
         SUGGESTIONS = {k: v["suggestions"] for k, v in EMOTION_DATA["emotions"].items()}
         
-        print(f"Loaded {len(EMOTION_ANCHORS)} emotion categories from JSON.")
+        log.info("Loaded %d emotion categories from JSON.", len(EMOTION_ANCHORS))
     except Exception as e:
-        print(f"Failed to load emotions.json: {e}")
+        log.error("Failed to load emotions.json: %s", e)
         EMOTION_ANCHORS = {}
         SUGGESTIONS = {}
-    
-    # Load Classifier
+
+def load_classifier():
     try:
-        clf_path = "models/emotion_classifier.pkl"
-        if os.path.exists(clf_path):
-            data = joblib.load(clf_path)
-            CLASSIFIER = data["model"]
-            CLASSIFIER_LABELS = data["labels"]
-            print("Loaded Emotion Classifier.")
-        else:
-            print("Classifier not found. Using keyword fallback.")
+        if config.CLASSIFIER_BACKEND == "numpy" and os.path.exists(config.CLASSIFIER_NPZ_PATH):
+            classifier = LinearClassifier.load(config.CLASSIFIER_NPZ_PATH)
+            log.info("Loaded Emotion Classifier (numpy).")
+            return classifier, classifier.labels
+        if os.path.exists(config.CLASSIFIER_PKL_PATH):
+            # Only this path needs scikit-learn
+            import joblib
+            data = joblib.load(config.CLASSIFIER_PKL_PATH)
+            log.info("Loaded Emotion Classifier (sklearn).")
+            return data["model"], data["labels"]
+        log.warning("Classifier not found. Using keyword fallback.")
+    except Exception as e:
+        log.error("Failed to load classifier: %s", e)
+    return None, []
+
+def load_anchor_index(embedding_model):
+    # Anchor embeddings only change with emotions.json, the model or the mode
+    key = anchors.cache_key(EMOTIONS_JSON, embedding_model.model.name, config.ANCHOR_MODE)
+    path = os.path.join(config.ANCHOR_CACHE_DIR, f"anchors-{key}.npz") if config.ANCHOR_CACHE_DIR else None
+    if path and os.path.exists(path):
+        try:
+            index = AnchorIndex.load(path)
+            log.info("Loaded %d anchor embeddings from %s.", len(index), path)
+            return index
+        except Exception as e:
+            log.warning("Ignoring unreadable anchor cache %s: %s", path, e)
+
+    log.info("Pre-computing emotion anchors (mode: %s)...", config.ANCHOR_MODE)
+    index = AnchorIndex.build(embedding_model, EMOTION_ANCHORS, mode=config.ANCHOR_MODE)
+    log.info("Computed %d anchor embeddings (%d vectors).", len(index), index.matrix.shape[0])
+    if path:
+        try:
+            os.makedirs(config.ANCHOR_CACHE_DIR, exist_ok=True)
+            index.save(path)
+        except Exception as e:
+            log.warning("Failed to cache anchor embeddings: %s", e)
+    return index
+
+
+async def load_models():
+    global model, batcher, vector_db, indexer, retention, result_cache, prefetcher, conversations, ANCHOR_EMBEDDINGS, CLASSIFIER, CLASSIFIER_LABELS
+    STARTUP["phase"] = "loading_models"
+    started = time.perf_counter()
+    try:
+        # Everything runs on the pools so /health, /api/trending and
+        # /api/favorites keep answering while this loads in background mode
+        with startup_phase("embedding_model"):
+            embedding_model = await inference_pool.run(
+                EmbeddingModel,
+                config.EMBEDDING_MODEL,
+                cache_size=config.EMBEDDING_CACHE_SIZE,
+                cache_path=config.EMBEDDING_CACHE_PATH,
+                backend=config.EMBEDDING_BACKEND,
+                onnx_dir=config.ONNX_MODEL_DIR,
+                onnx_quantized=config.ONNX_QUANTIZED,
+                onnx_threads=config.ONNX_THREADS
+            )
+        with startup_phase("vector_db"):
+            db = await io_pool.run(
+                open_vector_db,
+                config.VECTOR_DB_BACKEND,
+                path=config.VECTOR_DB_PATH,
+                dim=embedding_model.dim,
+                **config.vector_db_options()
+            )
+        if config.HYBRID_SEARCH:
+            with startup_phase("lexical_index"):
+                db = await io_pool.run(
+                    HybridVectorDB,
+                    db,
+                    k1=config.BM25_K1,
+                    b=config.BM25_B,
+                    rrf_k=config.RRF_K,
+                    candidates=config.HYBRID_CANDIDATES
+                )
+        with startup_phase("classifier"):
+            classifier, labels = await io_pool.run(load_classifier)
+        with startup_phase("anchors"):
+            anchor_index = await inference_pool.run(load_anchor_index, embedding_model)
     except Exception as e:
-        print(f"Failed to load classifier: {e}")
+        STARTUP["phase"] = "error"
+        STARTUP["error"] = str(e)
+        log.exception("Startup failed: %s", e)
+        raise
+
+    # Publish together so handlers never see a half-initialized state
+    batcher = EmbeddingBatcher(
+        embedding_model,
+        window_ms=config.EMBED_BATCH_WINDOW_MS,
+        max_batch_size=config.EMBED_BATCH_MAX_SIZE,
+        pool=inference_pool
+    )
+    batcher.start()
+    conversations = ConversationContext(
+        batcher.encode_many,
+        window=config.CONTEXT_WINDOW,
+        decay=config.CONTEXT_DECAY,
+        max_sessions=config.CONTEXT_MAX_SESSIONS,
+        ttl=config.CONTEXT_SESSION_TTL
+    )
+    retention = RetentionManager(
+        db,
+        pool=io_pool,
+        path=config.RETENTION_DB_PATH,
+        max_points=config.MAX_COLLECTION_SIZE,
+        max_age=config.MAX_POINT_AGE_DAYS * 86400,
+        low_watermark=config.EVICTION_LOW_WATERMARK,
+        batch_size=config.EVICTION_BATCH_SIZE,
+        interval=config.RETENTION_INTERVAL,
+        compact_interval=config.COMPACTION_INTERVAL,
+        on_evict=on_evict
+    )
+    retention.start()
+    result_cache = SemanticResultCache(
+        embedding_model.dim,
+        capacity=config.RESULT_CACHE_SIZE,
+        max_distance=config.RESULT_CACHE_MAX_DISTANCE,
+        ttl=config.RESULT_CACHE_TTL,
+        threshold=SIMILARITY_THRESHOLD
+    )
+    indexer = IndexWriter(
+        db,
+        pool=io_pool,
+        batch_size=config.INDEX_BATCH_SIZE,
+        flush_interval=config.INDEX_FLUSH_INTERVAL,
+        max_pending=config.INDEX_MAX_PENDING,
+        on_write=on_index_write
+    )
+    indexer.start()
+    prefetcher = Prefetcher(
+        tenor_api,
+        batcher.encode_many,
+        indexer,
+        vector_db=db,
+        pool=io_pool,
+        limit=config.PREFETCH_LIMIT,
+        rate=config.PREFETCH_RATE,
+        burst=config.PREFETCH_BURST,
+        concurrency=config.PREFETCH_CONCURRENCY,
+        on_fetched=retrieval.mark_fresh
+    )
+    prefetcher.start(
+        lambda: warmup_queries(EMOTION_DATA),
+        on_startup=config.PREFETCH_ON_STARTUP,
+        interval=config.PREFETCH_INTERVAL
+    )
+    CLASSIFIER, CLASSIFIER_LABELS = classifier, labels
+    ANCHOR_EMBEDDINGS = anchor_index
+    vector_db = db
+    model = embedding_model
+
+    STARTUP["timings_ms"]["models_total"] = round((time.perf_counter() - started) * 1000, 1)
+    STARTUP["phase"] = "ready"
+    report = ", ".join(f"{name} {ms:.0f}ms" for name, ms in STARTUP["timings_ms"].items())
+    log.info("Startup complete: %s", report)
 
-    # Pre-compute anchor embeddings (Fallback)
-    print("Pre-computing emotion anchors...")
-    for emotion, keywords in EMOTION_ANCHORS.items():
-        anchor_text = " ".join(keywords)
-        embedding, _ = model.encode(anchor_text)
-        ANCHOR_EMBEDDINGS[emotion] = embedding
-    print(f"Computed {len(ANCHOR_EMBEDDINGS)} anchor embeddings.")
+@app.on_event("startup")
+async def startup_event():
+    global tenor_api, retrieval, startup_task
+    # Cheap subsystems first: these are enough for /api/trending and /api/favorites
+    with startup_phase("emotion_data"):
+        load_emotion_data()
+    with startup_phase("tenor_client"):
+        tenor_api = TenorAPI(
+            base_url=config.TENOR_BASE_URL,
+            timeout=config.TENOR_TIMEOUT,
+            cache_ttl=config.TENOR_CACHE_TTL,
+            cache_size=config.TENOR_CACHE_SIZE,
+            max_connections=config.TENOR_MAX_CONNECTIONS
+        )
+        retrieval = build_retrieval_engine()
+
+    if config.STARTUP_MODE == "background":
+        # Start serving immediately; model-backed endpoints return 503 until ready
+        startup_task = asyncio.create_task(load_models())
+    else:
+        await load_models()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if prefetcher:
+        await prefetcher.stop()
+    if indexer:
+        await indexer.stop()
+    if retention:
+        await retention.stop()
+    if retrieval:
+        await retrieval.stop()
+    if batcher:
+        await batcher.stop()
+    if tenor_api:
+        await tenor_api.aclose()
+    if model:
+        model.close()
+    if vector_db:
+        vector_db.close()
+    for pool in (inference_pool, io_pool, generation_pool):
+        pool.shutdown()
+    stop_logging()
 
 @app.post("/api/context/analyze")
 async def analyze_context(request: ContextRequest):
@@ -236,74 +745,92 @@ async def analyze_context(request: ContextRequest):
         raise HTTPException(status_code=503, detail="Model not loaded")
     
     try:
-        if not request.messages:
-             return {"emotion": "neutral", "score": 0.0, "suggestions": []}
-
-        last_message = request.messages[-1]
-        context_text = " ".join(request.messages)
-        
-        best_emotion = "neutral"
-        best_score = 0.0
-        
-        # 1. Try Classifier (Primary)
-        if CLASSIFIER:
-            # Encode last message (Recency Bias)
-            embedding, _ = model.encode(last_message)
-            embedding = np.array(embedding).reshape(1, -1)
-            
-            # Predict
-            probs = CLASSIFIER.predict_proba(embedding)[0]
-            max_idx = np.argmax(probs)
-            pred_label = CLASSIFIER_LABELS[max_idx]
-            confidence = probs[max_idx]
-            
-            print(f"Classifier Prediction: {pred_label} ({confidence:.2f})")
-            
-            if confidence > 0.3:
-                # Map to our categories
-                mapped_emotion = EMOTION_MAPPING.get(pred_label, "neutral")
-                if mapped_emotion != "neutral":
-                    best_emotion = mapped_emotion
-                    best_score = float(confidence)
-        
-        # 2. Check Specific Keywords (Coding, Gaming, Waiting, Tired)
-        # These are often not covered well by general emotion datasets
-        # We check these if the classifier is unsure or predicts "neutral"
-        
-        special_categories = ["coding", "gaming", "waiting", "tired"]
-        
-        # If classifier found nothing or neutral, OR if we want to override with specific context
-        if best_emotion == "neutral" or best_score < 0.6:
-            # Check anchors for special categories
-            last_msg_embedding, _ = model.encode(last_message)
-            
-            for cat in special_categories:
-                if cat in ANCHOR_EMBEDDINGS:
-                    score = cosine_similarity(last_msg_embedding, ANCHOR_EMBEDDINGS[cat])
-                    if score > 0.25 and score > best_score:
-                        best_score = score
-                        best_emotion = cat
-                        print(f"Keyword Override: {cat} ({score:.2f})")
+        context = None
+        if request.session_id:
+            # Recency-weighted context of the channel; only new messages are encoded
+            with metrics.stage("encode"):
+                embedding, context = await conversations.update(
+                    request.session_id, request.messages, request.draft, reset=request.reset
+                )
+            if embedding is None:
+                return {"emotion": "neutral", "score": 0.0, "suggestions": [], "context": context}
+        else:
+            if not request.messages:
+                 return {"emotion": "neutral", "score": 0.0, "suggestions": []}
+            # Encode last message once (Recency Bias); shared by classifier and anchors
+            embedding = await encode(request.messages[-1])
 
+        best_emotion, best_score = classify_context(embedding)
         suggestions = SUGGESTIONS.get(best_emotion, [])
         
-        return {
+        response = {
             "emotion": best_emotion,
             "score": float(best_score),
             "suggestions": suggestions
         }
+        if context is not None:
+            response["context"] = context
+        return response
         
     except Exception as e:
-        print(f"Error analyzing context: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception("Error analyzing context: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+def classify_context(embedding):
+    best_emotion = "neutral"
+    best_score = 0.0
+
+    # 1. Try Classifier (Primary)
+    if CLASSIFIER:
+        # Predict
+        with metrics.stage("classify"):
+            probs = CLASSIFIER.predict_proba(np.array(embedding).reshape(1, -1))[0]
+        max_idx = np.argmax(probs)
+        pred_label = CLASSIFIER_LABELS[max_idx]
+        confidence = probs[max_idx]
+        
+        log.debug("Classifier Prediction: %s (%.2f)", pred_label, confidence)
+        
+        if confidence > 0.3:
+            # Map to our categories
+            mapped_emotion = EMOTION_MAPPING.get(pred_label, "neutral")
+            if mapped_emotion != "neutral":
+                best_emotion = mapped_emotion
+                best_score = float(confidence)
+    
+    # 2. Check Specific Keywords (Coding, Gaming, Waiting, Tired)
+    # These are often not covered well by general emotion datasets
+    # We check these if the classifier is unsure or predicts "neutral"
+    
+    special_categories = ["coding", "gaming", "waiting", "tired"]
+    
+    # If classifier found nothing or neutral, OR if we want to override with specific context
+    if best_emotion == "neutral" or best_score < 0.6:
+        # Check anchors for special categories (all scored in one mat-vec)
+        with metrics.stage("anchors"):
+            anchor_scores = ANCHOR_EMBEDDINGS.scores(embedding) if ANCHOR_EMBEDDINGS else {}
+        
+        for cat in special_categories:
+            if cat in anchor_scores:
+                score = anchor_scores[cat]
+                if score > 0.25 and score > best_score:
+                    best_score = score
+                    best_emotion = cat
+                    log.debug("Keyword Override: %s (%.2f)", cat, score)
+    metrics.count("classifications", emotion=best_emotion)
+    return best_emotion, best_score
+
+@app.delete("/api/context/{session_id}")
+async def drop_context(session_id: str):
+    if not conversations:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return {"dropped": conversations.drop(session_id)}
+
 @app.get("/api/trending")
 async def get_trending(emotion: str = None):
     # If emotion is provided and valid, return suggestions for that emotion as "trending"
     if emotion and emotion in SUGGESTIONS:
-        print(f"Returning contextual trending for: {emotion}")
+        log.info("Returning contextual trending for: %s", emotion)
         return {"trending": SUGGESTIONS[emotion]}
     
     # Otherwise return global trending
@@ -324,51 +851,46 @@ class FavoriteGIF(BaseModel):
     height: int = 0
 
 FAVORITES_FILE = "data/favorites.json"
-FAVORITES_DB = {}
-
-def save_favorites():
-    try:
-        with open(FAVORITES_FILE, "w") as f:
-            json.dump(FAVORITES_DB, f, indent=2)
-    except Exception as e:
-        print(f"Failed to save favorites: {e}")
+favorites = None
 
 @app.on_event("startup")
 async def load_favorites():
-    global FAVORITES_DB
+    global favorites
     try:
-        if os.path.exists(FAVORITES_FILE):
-            with open(FAVORITES_FILE, "r") as f:
-                FAVORITES_DB = json.load(f)
-        else:
-            FAVORITES_DB = {}
-            # Ensure directory exists
-            os.makedirs("data", exist_ok=True)
-            save_favorites()
-        print(f"Loaded {len(FAVORITES_DB)} favorites.")
+        # Imports the legacy favorites.json on first start
+        favorites = await io_pool.run(FavoritesStore, config.FAVORITES_DB_PATH, FAVORITES_FILE)
+        log.info("Loaded %d favorites.", len(favorites))
     except Exception as e:
-        print(f"Failed to load favorites: {e}")
-        FAVORITES_DB = {}
+        log.exception("Failed to load favorites: %s", e)
+        raise
+
+@app.on_event("shutdown")
+async def close_favorites():
+    if favorites:
+        favorites.close()
 
 @app.get("/api/favorites")
-async def get_favorites():
-    # Return list of favorites (values of the dict)
-    return {"favorites": list(FAVORITES_DB.values())}
+async def get_favorites(offset: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1, le=500)):
+    # Without a limit the whole list is returned, as before
+    page = favorites.page(offset, limit)
+    total = len(favorites)
+    next_offset = offset + len(page)
+    return {
+        "favorites": page,
+        "total": total,
+        "offset": offset,
+        "next_offset": next_offset if next_offset < total else None
+    }
 
 @app.post("/api/favorites")
 async def add_favorite(gif: FavoriteGIF):
-    if gif.id in FAVORITES_DB:
+    if not await favorites.add(gif.dict()):
         return {"message": "Already favorited", "favorite": gif}
-    
-    FAVORITES_DB[gif.id] = gif.dict()
-    save_favorites()
     return {"message": "Added to favorites", "favorite": gif}
 
 @app.delete("/api/favorites/{gif_id}")
 async def remove_favorite(gif_id: str):
-    if gif_id in FAVORITES_DB:
-        del FAVORITES_DB[gif_id]
-        save_favorites()
+    if await favorites.remove(gif_id):
         return {"message": "Removed from favorites", "id": gif_id}
     raise HTTPException(status_code=404, detail="Favorite not found")
 
@@ -381,108 +903,120 @@ VERTEX_CREDENTIALS_FILE = "contextual-1764386210520-0e442e93e814.json" # Hardcod
 
 class GenerateRequest(BaseModel):
     prompt: str
+    # Block until the image is ready (the pre-job behavior)
+    wait: bool = False
 
-@app.post("/api/generate")
+generation = None
+media_store = None
+
+@app.on_event("startup")
+async def start_generation():
+    global generation, media_store
+    media_store = MediaStore(config.MEDIA_DIR)
+    if config.GENERATION_BACKEND == "fake":
+        generator = FakeImageGenerator(delay=config.FAKE_GENERATION_DELAY)
+    else:
+        generator = VertexImageGenerator(os.getenv("VERTEX_API_KEY"), model_name=config.VERTEX_IMAGE_MODEL)
+    generation = GenerationQueue(
+        generator,
+        media_store,
+        pool=generation_pool,
+        workers=config.GENERATION_WORKERS,
+        max_queued=config.GENERATION_MAX_QUEUED,
+        job_ttl=config.GENERATION_JOB_TTL
+    )
+    generation.start()
+
+@app.on_event("shutdown")
+async def stop_generation():
+    if generation:
+        await generation.stop()
+
+def generation_response(job):
+    response = job.to_dict()
+    if job.status == "done":
+        # Raw PNG from /api/media, cacheable by the client and proxies
+        response.update({"url": media_url(job.key, "png"), "format": "png"})
+    return response
+
+def generation_job(job_id: str):
+    job = generation.get(job_id) if generation else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.post("/api/generate", status_code=202)
 async def generate_gif(request: GenerateRequest):
-    vertex_api_key = os.getenv("VERTEX_API_KEY")
-    if not vertex_api_key:
+    # Returns a job at once; poll GET /api/generate/{id} or follow
+    # /api/generate/{id}/events. Repeated prompts are served from disk.
+    if generation.generator.name == "vertex" and not generation.generator.api_key:
         raise HTTPException(status_code=500, detail="VERTEX_API_KEY not set in .env")
 
-    print(f"\n{'='*60}")
-    print(f"[GENERATION] Starting image generation")
-    print(f"[GENERATION] Prompt: {request.prompt}")
-    print(f"[GENERATION] Using API Key: {vertex_api_key[:10]}...")
-    print(f"{'='*60}\n")
-    
+    log.info("[GENERATION] Prompt: %s", request.prompt)
     try:
-        from google import genai
-        from google.genai import types
-        import base64
-        
-        print("[GENERATION] Initializing Google GenAI client...")
-        client = genai.Client(
-            vertexai=True,
-            api_key=vertex_api_key
-        )
-        
-        model_name = "gemini-3-pro-image-preview"
-        print(f"[GENERATION] Using model: {model_name}")
-        
-        # Build content with prompt
-        contents = [
-            types.Content(
-                role="user",
-                parts=[
-                    types.Part(text=request.prompt)
-                ]
-            )
-        ]
-        
-        # Configure generation
-        generate_content_config = types.GenerateContentConfig(
-            temperature=1,
-            top_p=0.95,
-            max_output_tokens=32768,
-            response_modalities=["IMAGE"],  # Only image, no text
-            safety_settings=[
-                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
-                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF")
-            ],
-            image_config=types.ImageConfig(
-                aspect_ratio="1:1",
-                image_size="1K",
-                output_mime_type="image/png"
-            )
-        )
-        
-        print("[GENERATION] Sending request to Vertex AI...")
-        
-        # Generate (non-streaming for simplicity)
-        response = client.models.generate_content(
-            model=model_name,
-            contents=contents,
-            config=generate_content_config
-        )
-        
-        print(f"[GENERATION] Response received")
-        print(f"[GENERATION] Response parts: {len(response.candidates[0].content.parts) if response.candidates else 0}")
-        
-        # Extract image from response
-        if not response.candidates or not response.candidates[0].content.parts:
-            print("[GENERATION] ERROR: No content in response")
-            raise HTTPException(status_code=500, detail="No image generated in response")
-        
-        # Find the image part
-        image_part = None
-        for part in response.candidates[0].content.parts:
-            if hasattr(part, 'inline_data') and part.inline_data:
-                image_part = part
-                break
-        
-        if not image_part:
-            print("[GENERATION] ERROR: No image part found in response")
-            raise HTTPException(status_code=500, detail="No image found in response parts")
-        
-        # Get image bytes
-        image_bytes = image_part.inline_data.data
-        print(f"[GENERATION] Image received: {len(image_bytes)} bytes")
-        
-        # Convert to base64
-        img_b64 = base64.b64encode(image_bytes).decode("utf-8")
-        print(f"[GENERATION] Base64 encoded: {len(img_b64)} characters")
-        print(f"[GENERATION] ✅ SUCCESS\n")
-        
-        return {
-            "video_base64": img_b64,
-            "format": "png",
-            "prompt": request.prompt
-        }
-        
-    except Exception as e:
-        print(f"\n[GENERATION] ❌ ERROR: {e}")
-        import traceback
-        traceback.print_exc()
-        print("\n")
-        raise HTTPException(status_code=500, detail=str(e))
+        job = generation.submit(request.prompt)
+    except asyncio.QueueFull:
+        raise HTTPException(status_code=429, detail="Too many generation jobs queued, try again later")
+    log.info("[GENERATION] Job %s: %s%s", job.id, job.status, " (cached)" if job.cached else "")
+    metrics.count("generation_jobs", result="cached" if job.cached else "submitted")
+
+    if request.wait:
+        await generation.wait(job)
+        if job.status == "error":
+            raise HTTPException(status_code=500, detail=job.error)
+    return generation_response(job)
+
+@app.get("/api/generate/{job_id}")
+async def generation_status(job_id: str, wait: float = Query(0, ge=0, le=60)):
+    # wait > 0 long-polls up to that many seconds for the job to finish
+    job = generation_job(job_id)
+    if wait:
+        await generation.wait(job, timeout=wait)
+    return generation_response(job)
+
+@app.get("/api/generate/{job_id}/events")
+async def generation_events(job_id: str):
+    # Server-sent events: the job's status on every change, ending with the
+    # finished job (with its media URL) or the error
+    job = generation_job(job_id)
+
+    async def events():
+        while True:
+            changed = job.changed
+            if job.status in ("done", "error"):
+                yield stream_event(job.status, generation_response(job), "sse")
+                return
+            yield stream_event("status", job.to_dict(), "sse")
+            await changed.wait()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.api_route("/api/media/{name}", methods=["GET", "HEAD"])
+async def get_media(name: str, request: Request):
+    # Stored artifacts as raw bytes. Names never change content, so the digest
+    # is a strong ETag and responses may be cached for MEDIA_MAX_AGE.
+    # FileResponse serves Range requests and hands the file to the server
+    # (http.response.pathsend) when it can send it without copying.
+    found = media_store.resolve(name) if media_store else None
+    if found is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    path, digest, media_type = found
+    headers = {
+        "ETag": f'"{digest}"',
+        "Cache-Control": f"public, max-age={config.MEDIA_MAX_AGE}, immutable"
+    }
+    if etag_matches(request.headers.get("if-none-match"), digest):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+def etag_matches(if_none_match: Optional[str], digest: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return f'"{digest}"' in tags
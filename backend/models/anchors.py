@@ -0,0 +1,73 @@
+import hashlib
+import numpy as np
+from typing import Dict, List
+
+
+# Emotion anchors held as one pre-normalized (rows, dim) float32 matrix so every
+# category is scored with a single mat-vec.
+#
+# mode="joined"   one row per category, embedding of all keywords joined together
+# mode="keywords" one row per keyword; a category scores the max over its rows
+class AnchorIndex:
+    def __init__(self, categories: List[str], matrix: np.ndarray, starts: np.ndarray, mode: str = "joined"):
+        self.categories = categories
+        self.matrix = matrix
+        # Rows for categories[i] are matrix[starts[i]:starts[i + 1]]
+        self.starts = starts
+        self.mode = mode
+
+    @classmethod
+    def build(cls, model, anchors: Dict[str, List[str]], mode: str = "joined"):
+        categories = [c for c, keywords in anchors.items() if keywords]
+        texts = []
+        starts = []
+        for category in categories:
+            starts.append(len(texts))
+            if mode == "keywords":
+                texts.extend(anchors[category])
+            else:
+                texts.append(" ".join(anchors[category]))
+
+        if not texts:
+            return cls([], np.zeros((0, getattr(model, "dim", 384)), dtype=np.float32), np.zeros(0, dtype=np.int64), mode)
+
+        embeddings, _ = model.encode(texts)
+        return cls(categories, normalize_rows(np.asarray(embeddings, dtype=np.float32)), np.asarray(starts, dtype=np.int64), mode)
+
+    def save(self, path: str):
+        np.savez(path, categories=np.array(self.categories), matrix=self.matrix, starts=self.starts, mode=np.array(self.mode))
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["categories"].tolist(), data["matrix"], data["starts"], str(data["mode"]))
+
+    def scores(self, embedding) -> Dict[str, float]:
+        if not self.categories:
+            return {}
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return {c: 0.0 for c in self.categories}
+        sims = self.matrix @ (vector / norm)
+        pooled = np.maximum.reduceat(sims, self.starts)
+        return dict(zip(self.categories, pooled.tolist()))
+
+    def __contains__(self, category: str) -> bool:
+        return category in self.categories
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+
+def cache_key(emotions_json: bytes, model_name: str, mode: str) -> str:
+    # Changes to emotions.json, the embedding backend or the mode invalidate the cache
+    digest = hashlib.sha256(emotions_json)
+    digest.update(f"\n{model_name}\n{mode}".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
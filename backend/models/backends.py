@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import re
+import numpy as np
+
+
+# Inference backends for EmbeddingModel. Each exposes `name`, `dim`,
+# `lowercase` (whether the tokenizer folds case, so "Happy" and "happy" embed
+# the same) and encode(text | list[str]) -> np.ndarray (1-D for a string, 2-D
+# for a list), returning L2-normalized float32 sentence embeddings.
+
+
+class TorchBackend:
+    def __init__(self, model_name: str):
+        # Imported here so the ONNX backend never pulls in torch
+        from sentence_transformers import SentenceTransformer
+
+        self.name = f"torch:{model_name}"
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        # Either the tokenizer or the Transformer module itself may lowercase
+        self.lowercase = bool(
+            getattr(self.model.tokenizer, "do_lower_case", False)
+            or getattr(self.model[0], "do_lower_case", False)
+        )
+
+    def encode(self, text):
+        return self.model.encode(text)
+
+
+# Runs an ONNX export of the sentence-transformer (see scripts/export_onnx.py)
+# with onnxruntime + tokenizers: token embeddings -> mean pooling -> normalize,
+# the same pipeline as all-MiniLM-L6-v2's SentenceTransformer modules.
+class OnnxBackend:
+    def __init__(self, model_dir: str, quantized: bool = False, max_seq_length: int = 256, threads: int = 0):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        filename = "model_int8.onnx" if quantized else "model.onnx"
+        model_path = os.path.join(model_dir, filename)
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"{model_path} not found; run scripts/export_onnx.py first")
+
+        self.name = f"onnx:{os.path.basename(os.path.normpath(model_dir))}/{filename}"
+
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        with open(tokenizer_path, "r", encoding="utf-8") as f:
+            self.lowercase = _normalizer_lowercases(json.load(f).get("normalizer"))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.dim = self.session.get_outputs()[0].shape[-1]
+
+    def encode(self, text):
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feed["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self.session.run(None, feed)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        pooled = pooled.astype(np.float32)
+        return pooled[0] if single else pooled
+
+
+# Deterministic stand-in for offline benchmarks and tests (EMBEDDING_BACKEND=hash):
+# words and character trigrams are hashed into `dim` signed buckets, so texts
+# sharing words get similar vectors, and the same text always gets the same
+# vector on every machine. No model download, and no semantics beyond overlap.
+class HashBackend:
+    def __init__(self, model_name: str, dim: int = 384):
+        self.name = f"hash:{dim}"
+        self.dim = dim
+        self.lowercase = True
+
+    def _bucket(self, feature: str):
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        return value % self.dim, 1.0 if value >> 63 else -1.0
+
+    def _embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z0-9']+", text.lower()):
+            index, sign = self._bucket(word)
+            vector[index] += 2 * sign
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                index, sign = self._bucket(padded[i:i + 3])
+                vector[index] += sign
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, text):
+        if isinstance(text, str):
+            return self._embed(text)
+        return np.array([self._embed(t) for t in text], dtype=np.float32).reshape(-1, self.dim)
+
+
+def _normalizer_lowercases(normalizer) -> bool:
+    # tokenizer.json normalizer: BertNormalizer(lowercase=...), Lowercase, or a Sequence of them
+    if not normalizer:
+        return False
+    kind = normalizer.get("type")
+    if kind == "BertNormalizer":
+        return bool(normalizer.get("lowercase", True))
+    if kind == "Lowercase":
+        return True
+    if kind == "Sequence":
+        return any(_normalizer_lowercases(n) for n in normalizer.get("normalizers", []))
+    return False
+
+
+def load_backend(backend: str, model_name: str, onnx_dir: str = None, onnx_quantized: bool = False, onnx_threads: int = 0):
+    if backend == "torch":
+        return TorchBackend(model_name)
+    if backend == "onnx":
+        return OnnxBackend(onnx_dir or default_onnx_dir(model_name), quantized=onnx_quantized, threads=onnx_threads)
+    if backend == "hash":
+        return HashBackend(model_name)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def default_onnx_dir(model_name: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "onnx", model_name.split("/")[-1])
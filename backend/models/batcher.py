@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import List, Tuple
+
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS
+
+BATCH_SIZE_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128]
+
+
+# Collects encode requests that arrive within `window_ms` of each other (or
+# until `max_batch_size` is reached) and runs them as a single batched forward
+# pass. Each caller gets back its own row with the usual (embedding, duration).
+class EmbeddingBatcher:
+    def __init__(self, model, window_ms: float = 3.0, max_batch_size: int = 32, pool=None):
+        self.model = model
+        self.pool = pool
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue = None
+        self.task = None
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    def start(self):
+        if self.task is None:
+            self.queue = asyncio.Queue()
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+        self.task = None
+        while not self.queue.empty():
+            _, future, _ = self.queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding batcher stopped"))
+
+    async def encode(self, text: str) -> Tuple[List[float], float]:
+        if self.task is None:
+            return await self._run_encode(text)
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, future, time.perf_counter()))
+        return await future
+
+    async def encode_many(self, texts: List[str]) -> Tuple[List[List[float]], float]:
+        # Already a batch: one model call, without going through the queue
+        return await self._run_encode(texts)
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run_encode(self, texts):
+        if self.pool:
+            return await self.pool.run(self.model.encode, texts)
+        return await asyncio.get_running_loop().run_in_executor(None, self.model.encode, texts)
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            dispatched = time.perf_counter()
+            self.batch_sizes.observe(len(batch))
+            for _, _, enqueued in batch:
+                self.queue_wait_ms.observe((dispatched - enqueued) * 1000)
+
+            texts = [text for text, _, _ in batch]
+            try:
+                embeddings, duration = await self._run_encode(texts)
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future, _), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result((embedding, duration))
+
+    def stats(self):
+        return {
+            "window_ms": self.window * 1000,
+            "max_batch_size": self.max_batch_size,
+            "pending": self.queue.qsize() if self.queue else 0,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
@@ -0,0 +1,80 @@
+import numpy as np
+from typing import List
+
+
+# Pure-NumPy inference for a linear (logistic regression) classifier exported by
+# scripts/train_classifier.py or scripts/export_classifier.py. Avoids importing
+# scikit-learn and unpickling at startup; batched prediction is one matmul.
+#
+# activation="softmax" matches multinomial LogisticRegression.predict_proba,
+# activation="ovr" matches one-vs-rest (per-class sigmoid, row-normalized) and
+# activation="sigmoid" a multi-label OneVsRestClassifier (independent per-label
+# probabilities that need not sum to 1).
+class LinearClassifier:
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: List[str], activation: str = "softmax"):
+        self.weights = np.ascontiguousarray(weights, dtype=np.float32)
+        self.bias = np.ascontiguousarray(bias, dtype=np.float32)
+        self.labels = list(labels)
+        self.activation = activation
+
+    @classmethod
+    def load(cls, path: str):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], data["labels"].tolist(), str(data["activation"]))
+
+    @classmethod
+    def from_sklearn(cls, clf, labels: List[str]):
+        if hasattr(clf, "estimators_"):
+            return cls._from_one_vs_rest(clf, labels)
+        # Columns of predict_proba follow clf.classes_, not the label list order
+        class_labels = [labels[int(c)] for c in clf.classes_]
+        multi_class = getattr(clf, "multi_class", "auto")
+        ovr = multi_class == "ovr" or getattr(clf, "solver", "") == "liblinear"
+        return cls(clf.coef_, clf.intercept_, class_labels, "ovr" if ovr else "softmax")
+
+    @classmethod
+    def _from_one_vs_rest(cls, clf, labels: List[str]):
+        # One binary LogisticRegression per label; labels that never (or always)
+        # occur in training get a constant predictor instead
+        dim = next(e.coef_.shape[1] for e in clf.estimators_ if hasattr(e, "coef_"))
+        weights = np.zeros((len(clf.estimators_), dim), dtype=np.float32)
+        bias = np.zeros(len(clf.estimators_), dtype=np.float32)
+        for i, estimator in enumerate(clf.estimators_):
+            if hasattr(estimator, "coef_"):
+                weights[i] = estimator.coef_[0]
+                bias[i] = estimator.intercept_[0]
+            else:
+                bias[i] = 20.0 if float(np.ravel(estimator.y_)[0]) else -20.0
+        # classes_ are label ids for a multiclass target, indicator columns for a multi-label one
+        class_labels = [labels[int(c)] for c in clf.classes_]
+        multilabel = clf.label_binarizer_.y_type_.startswith("multilabel")
+        return cls(weights, bias, class_labels, "sigmoid" if multilabel else "ovr")
+
+    def save(self, path: str):
+        np.savez(
+            path,
+            weights=self.weights,
+            bias=self.bias,
+            labels=np.array(self.labels),
+            activation=np.array(self.activation)
+        )
+
+    def decision_function(self, X) -> np.ndarray:
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        return X @ self.weights.T + self.bias
+
+    def predict_proba(self, X) -> np.ndarray:
+        logits = self.decision_function(X)
+        if self.activation in ("ovr", "sigmoid"):
+            probs = 1.0 / (1.0 + np.exp(-logits))
+            if self.activation == "sigmoid":
+                return probs
+            return probs / probs.sum(axis=1, keepdims=True)
+        logits = logits - logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict(self, X) -> List[str]:
+        return [self.labels[i] for i in np.argmax(self.decision_function(X), axis=1)]
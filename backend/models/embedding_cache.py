@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+KEY_BYTES = 16
+
+
+def normalize_text(text: str, lowercase: bool = True) -> str:
+    # Whitespace never changes the tokens; case only does for cased tokenizers
+    text = " ".join(text.split())
+    return text.lower() if lowercase else text
+
+
+# Bounded, thread-safe LRU cache of embeddings. Vectors live in a fixed
+# (capacity, dim) float32 matrix; when `path` is set the matrix and the per-row
+# keys are memory-mapped .npy files, so a restarted process starts warm.
+# Keys fold case only when `lowercase` is set, i.e. the model's tokenizer
+# lowercases its input anyway.
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, capacity: int = 4096, path: Optional[str] = None,
+                 lowercase: bool = False):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.lowercase = lowercase
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # key -> row, ordered from least to most recently used
+        self.slots: "OrderedDict[bytes, int]" = OrderedDict()
+
+        if path:
+            self.vectors, self.keys = self._open_files(path)
+            for row in np.flatnonzero(self.keys.any(axis=1)):
+                self.slots[self.keys[row].tobytes()] = int(row)
+            print(f"Embedding cache: restored {len(self.slots)} entries from {path}")
+        else:
+            self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+            self.keys = np.zeros((capacity, KEY_BYTES), dtype=np.uint8)
+
+        used = set(self.slots.values())
+        self.free = [row for row in range(capacity - 1, -1, -1) if row not in used]
+
+    def _open_files(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        meta_file = os.path.join(path, "meta.json")
+        vectors_file = os.path.join(path, "vectors.npy")
+        keys_file = os.path.join(path, "keys.npy")
+        meta = {"model_name": self.model_name, "dim": self.dim, "capacity": self.capacity, "lowercase": self.lowercase}
+
+        existing = None
+        if os.path.exists(meta_file):
+            try:
+                with open(meta_file, "r") as f:
+                    existing = json.load(f)
+            except Exception as e:
+                print(f"Embedding cache: unreadable metadata ({e}), starting cold")
+
+        if existing == meta and os.path.exists(vectors_file) and os.path.exists(keys_file):
+            vectors = np.lib.format.open_memmap(vectors_file, mode="r+")
+            keys = np.lib.format.open_memmap(keys_file, mode="r+")
+            if vectors.shape == (self.capacity, self.dim) and keys.shape == (self.capacity, KEY_BYTES):
+                return vectors, keys
+
+        vectors = np.lib.format.open_memmap(vectors_file, mode="w+", dtype=np.float32, shape=(self.capacity, self.dim))
+        keys = np.lib.format.open_memmap(keys_file, mode="w+", dtype=np.uint8, shape=(self.capacity, KEY_BYTES))
+        tmp_file = meta_file + ".tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_file, meta_file)
+        return vectors, keys
+
+    def _key(self, text: str) -> bytes:
+        data = f"{self.model_name}\n{normalize_text(text, self.lowercase)}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=KEY_BYTES).digest()
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        key = self._key(text)
+        with self.lock:
+            row = self.slots.get(key)
+            if row is None:
+                self.misses += 1
+                return None
+            self.slots.move_to_end(key)
+            self.hits += 1
+            return self.vectors[row].copy()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        return [self.get(text) for text in texts]
+
+    def put(self, text: str, embedding) -> None:
+        key = self._key(text)
+        vector = np.asarray(embedding, dtype=np.float32)
+        with self.lock:
+            row = self.slots.get(key)
+            if row is None:
+                if self.free:
+                    row = self.free.pop()
+                else:
+                    _, row = self.slots.popitem(last=False)
+                    self.evictions += 1
+                self.slots[key] = row
+            else:
+                self.slots.move_to_end(key)
+            # Clear the key before rewriting the row so a crash mid-write
+            # never leaves a key pointing at a half-written vector.
+            self.keys[row] = 0
+            self.vectors[row] = vector
+            self.keys[row] = np.frombuffer(key, dtype=np.uint8)
+
+    def flush(self) -> None:
+        if not self.path:
+            return
+        with self.lock:
+            self.vectors.flush()
+            self.keys.flush()
+
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.slots),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
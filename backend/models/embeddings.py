@@ -1,14 +1,64 @@
-from sentence_transformers import SentenceTransformer
+from models.backends import load_backend
+from models.embedding_cache import EmbeddingCache
+import numpy as np
 import time
 
 class EmbeddingModel:
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
-        print(f"Loading model: {model_name}...")
-        self.model = SentenceTransformer(model_name)
+    def __init__(self, model_name='all-MiniLM-L6-v2', cache_size=4096, cache_path=None,
+                 backend='torch', onnx_dir=None, onnx_quantized=False, onnx_threads=0):
+        print(f"Loading model: {model_name} (backend: {backend})...")
+        self.model_name = model_name
+        self.model = load_backend(backend, model_name, onnx_dir, onnx_quantized, onnx_threads)
+        self.dim = self.model.dim
         print("Model loaded.")
-    
+
+        # Repeated queries (suggestion chips, trending terms) skip the forward pass
+        self.cache = None
+        if cache_size > 0:
+            # Keyed by backend too: int8 ONNX vectors differ slightly from torch ones
+            self.cache = EmbeddingCache(
+                self.model.name, self.dim, capacity=cache_size, path=cache_path, lowercase=self.model.lowercase
+            )
+
     def encode(self, text):
         start_time = time.time()
-        embedding = self.model.encode(text)
+        if isinstance(text, str):
+            embedding = self._encode_one(text)
+        else:
+            embedding = self._encode_many(list(text))
         duration = (time.time() - start_time) * 1000
         return embedding.tolist(), duration
+
+    def _encode_one(self, text):
+        if self.cache:
+            embedding = self.cache.get(text)
+            if embedding is not None:
+                return embedding
+        embedding = self.model.encode(text)
+        if self.cache:
+            self.cache.put(text, embedding)
+        return embedding
+
+    def _encode_many(self, texts):
+        if not self.cache:
+            return self.model.encode(texts)
+
+        cached = self.cache.get_many(texts)
+        missing = [i for i, e in enumerate(cached) if e is None]
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, e in enumerate(cached):
+            if e is not None:
+                embeddings[i] = e
+        if missing:
+            fresh = self.model.encode([texts[i] for i in missing])
+            for i, e in zip(missing, fresh):
+                embeddings[i] = e
+                self.cache.put(texts[i], e)
+        return embeddings
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache else {}
+
+    def close(self):
+        if self.cache:
+            self.cache.flush()
@@ -0,0 +1,113 @@
+import sys
+import os
+import argparse
+import json
+import time
+import numpy as np
+
+# Add backend to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.backends import load_backend, default_onnx_dir
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Chat-style lines alongside the suggestion chips from emotions.json
+CHAT_SENTENCES = [
+    "I am so happy this works!",
+    "This code is garbage and I hate it.",
+    "I have no idea what is going on.",
+    "That was hilarious lol",
+    "the build has been running for 40 minutes",
+    "its 3am and im still debugging this",
+    "git push --force on main, what could go wrong",
+    "ok who broke prod",
+]
+
+
+def parity_sentences():
+    sentences = list(CHAT_SENTENCES)
+    with open(os.path.join(BACKEND_DIR, "data", "emotions.json"), "r") as f:
+        data = json.load(f)
+    for emotion in data["emotions"].values():
+        sentences.extend(emotion["suggestions"])
+    sentences.extend(data.get("trending_global", []))
+    return sentences
+
+
+def check_parity(reference, candidate, sentences):
+    a = np.asarray(reference.encode(sentences), dtype=np.float32)
+    b = np.asarray(candidate.encode(sentences), dtype=np.float32)
+    cos = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {"min_cosine": float(cos.min()), "mean_cosine": float(cos.mean())}
+
+
+def benchmark(backend, sentences, batch_size, iterations):
+    rng = np.random.default_rng(0)
+    # Warm-up run so lazy initialisation isn't measured
+    backend.encode(sentences[:batch_size])
+    latencies = []
+    for _ in range(iterations):
+        batch = [sentences[i] for i in rng.integers(0, len(sentences), batch_size)]
+        start = time.perf_counter()
+        backend.encode(batch if batch_size > 1 else batch[0])
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies = np.array(latencies)
+    return {
+        "batch_size": batch_size,
+        "throughput": batch_size * iterations / (latencies.sum() / 1000),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ONNX vs PyTorch embedding parity and throughput")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--threshold", type=float, default=0.99, help="Minimum cosine vs PyTorch")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    onnx_dir = args.onnx_dir or default_onnx_dir(args.model)
+    backends = {"torch": load_backend("torch", args.model)}
+    for label, quantized, filename in [("onnx", False, "model.onnx"), ("onnx-int8", True, "model_int8.onnx")]:
+        if os.path.exists(os.path.join(onnx_dir, filename)):
+            backends[label] = load_backend("onnx", args.model, onnx_dir, onnx_quantized=quantized)
+        else:
+            print(f"Skipping {label}: {filename} not found in {onnx_dir}")
+
+    sentences = parity_sentences()
+    results = {"model": args.model, "parity": {}, "benchmark": {}}
+    passed = True
+
+    for label, backend in backends.items():
+        if label == "torch":
+            continue
+        parity = check_parity(backends["torch"], backend, sentences)
+        parity["passed"] = parity["min_cosine"] >= args.threshold
+        passed = passed and parity["passed"]
+        results["parity"][label] = parity
+        print(f"[parity] {label}: min cos {parity['min_cosine']:.5f}, mean {parity['mean_cosine']:.5f} "
+              f"({'ok' if parity['passed'] else 'BELOW ' + str(args.threshold)})")
+
+    for label, backend in backends.items():
+        results["benchmark"][label] = []
+        for batch_size in [int(b) for b in args.batch_sizes.split(",")]:
+            row = benchmark(backend, sentences, batch_size, args.iterations)
+            results["benchmark"][label].append(row)
+            print(f"[bench] {label:10s} batch={batch_size:3d}  {row['throughput']:8.1f} sent/s  "
+                  f"p50 {row['p50_ms']:7.2f} ms  p99 {row['p99_ms']:7.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,431 @@
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import numpy as np
+
+# Add backend to path to import models and services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models.embeddings import EmbeddingModel
+from models.classifier import LinearClassifier
+from services.vector_db import open_vector_db
+from benchmark_embeddings import CHAT_SENTENCES, parity_sentences
+from benchmark_vector_db import make_data
+import stub_tenor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Offline benchmark suite, fixed seeds throughout so two commits can be compared
+# on the same machine:
+#   micro    EmbeddingModel.encode per batch size, VectorDB.search per
+#            collection size (brute force and HNSW), classifier
+#            predict_proba per batch size
+#   load     starts the API (uvicorn) against the stub Tenor server and replays
+#            a query mix built from emotions.json at a fixed concurrency
+#   all      both of the above into one JSON file
+#   compare  diffs two JSON files and flags regressions
+# --embedder hash (the default) uses the deterministic fake embedder, so no
+# model download is needed; torch/onnx measure the real model.
+
+# Share of each request kind in the load mix
+LOAD_MIX = {
+    "search": 0.45,
+    "search_combined": 0.1,
+    "search_batch": 0.1,
+    "analyze": 0.3,
+    "trending": 0.05,
+}
+
+
+def summarize(latencies_ms, items=1):
+    latencies = np.asarray(latencies_ms, dtype=np.float64)
+    if not len(latencies):
+        return {"count": 0}
+    return {
+        "count": int(len(latencies)),
+        "throughput": round(float(items * len(latencies) / (latencies.sum() / 1000)), 2),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def timed(fn, iterations):
+    fn()  # Warm-up, so lazy initialisation isn't measured
+    latencies = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def bench_encode(embedder, model_name, batch_sizes, iterations):
+    # Cache off: every call is a forward pass
+    model = EmbeddingModel(model_name, cache_size=0, backend=embedder)
+    sentences = parity_sentences()
+    rng = np.random.default_rng(0)
+    results = {}
+    for batch_size in batch_sizes:
+        batches = []
+        for _ in range(iterations + 1):
+            batch = [sentences[i] for i in rng.integers(0, len(sentences), batch_size)]
+            batches.append(batch if batch_size > 1 else batch[0])
+        it = iter(batches)
+        latencies = timed(lambda: model.encode(next(it)), iterations)
+        results[f"batch_{batch_size}"] = summarize(latencies, items=batch_size)
+        print(f"[encode] batch={batch_size:4d}  {results[f'batch_{batch_size}']}")
+    return {"backend": model.model.name, **results}
+
+
+def bench_vector_search(sizes, dim, queries, k, clusters):
+    # Every size twice: brute force (threshold above the size, so no graph is
+    # built) and HNSW with the configured parameters, measured after the
+    # background build has finished rather than on its brute-force fallback
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    Q = make_data(queries, centers, rng)
+    results = {"brute_force": {}}
+    try:
+        import hnswlib  # noqa: F401
+        results["hnsw"] = {}
+    except ImportError:
+        print("[vector_search] hnswlib not installed, brute force only")
+    for n in sizes:
+        X = make_data(n, centers, rng)
+        for mode in results:
+            threshold = n if mode == "hnsw" else n + 1
+            db = open_vector_db(
+                "numpy", collection_name="bench", memory=True, dim=dim, hnsw_threshold=threshold,
+                hnsw_m=config.HNSW_M, hnsw_ef_construction=config.HNSW_EF_CONSTRUCTION,
+                hnsw_ef_search=config.HNSW_EF_SEARCH
+            )
+            for i in range(0, n, 5000):
+                rows = range(i, min(i + 5000, n))
+                db.upsert(X[i:i + 5000], [{"row": r} for r in rows], ids=[f"p{r}" for r in rows])
+            start = time.perf_counter()
+            indexed = db.wait_for_index()
+            build_s = time.perf_counter() - start
+            it = iter(np.concatenate([Q, Q[:1]]))
+            latencies = timed(lambda: db.search(next(it).tolist(), limit=k), queries)
+            db.close()
+            row = summarize(latencies)
+            if indexed:
+                row["build_s"] = round(build_s, 2)
+            results[mode][f"size_{n}"] = row
+            print(f"[vector_search] {mode:11s} size={n:8d}  {row}")
+    return results
+
+
+def bench_classifier(dim, batch_sizes, iterations):
+    path = os.path.join(BACKEND_DIR, config.CLASSIFIER_NPZ_PATH)
+    if os.path.exists(path):
+        classifier = LinearClassifier.load(path)
+        source = config.CLASSIFIER_NPZ_PATH
+    else:
+        rng = np.random.default_rng(0)
+        classifier = LinearClassifier(rng.standard_normal((12, dim)), np.zeros(12), [f"c{i}" for i in range(12)])
+        source = "random"
+    dim = classifier.weights.shape[1]
+    rng = np.random.default_rng(0)
+    results = {"source": source}
+    for batch_size in batch_sizes:
+        X = rng.standard_normal((batch_size, dim)).astype(np.float32)
+        latencies = timed(lambda: classifier.predict_proba(X), iterations)
+        results[f"batch_{batch_size}"] = summarize(latencies, items=batch_size)
+        print(f"[classifier] batch={batch_size:4d}  {results[f'batch_{batch_size}']}")
+    return results
+
+
+def run_micro(args):
+    return {
+        "encode": bench_encode(args.embedder, args.model, _ints(args.batch_sizes), args.iterations),
+        "vector_search": bench_vector_search(_ints(args.sizes), args.dim, args.queries, args.k, args.clusters),
+        "classifier": bench_classifier(args.dim, _ints(args.batch_sizes), args.iterations),
+    }
+
+
+def query_mix(n, seed):
+    # [(kind, method, path, body)] drawn from emotions.json chips, trending
+    # terms and chat lines. Combined queries are new to the index and Tenor.
+    with open(os.path.join(BACKEND_DIR, "data", "emotions.json"), "r") as f:
+        data = json.load(f)
+    emotions = list(data["emotions"])
+    suggestions = [s for e in data["emotions"].values() for s in e["suggestions"]]
+    queries = suggestions + data.get("trending_global", [])
+    rng = random.Random(seed)
+    kinds, weights = zip(*LOAD_MIX.items())
+    requests = []
+    for kind in rng.choices(kinds, weights, k=n):
+        if kind == "search":
+            requests.append((kind, "POST", "/api/search/semantic", {"query": rng.choice(queries), "limit": 10}))
+        elif kind == "search_combined":
+            query = f"{rng.choice(queries)} {rng.choice(queries)}"
+            requests.append((kind, "POST", "/api/search/semantic", {"query": query, "limit": 10}))
+        elif kind == "search_batch":
+            requests.append((kind, "POST", "/api/search/semantic/batch", {"queries": rng.sample(queries, 4), "limit": 10}))
+        elif kind == "analyze":
+            messages = [rng.choice(CHAT_SENTENCES + suggestions) for _ in range(rng.randint(1, 3))]
+            requests.append((kind, "POST", "/api/context/analyze", {"messages": messages}))
+        else:
+            requests.append((kind, "GET", f"/api/trending?emotion={rng.choice(emotions)}", None))
+    return requests
+
+
+async def drive(base_url, requests, concurrency, timeout):
+    import httpx
+
+    queue = list(reversed(requests))
+    latencies = {}
+    errors = {}
+
+    async def worker(client):
+        while queue:
+            kind, method, path, body = queue.pop()
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            if ok:
+                latencies.setdefault(kind, []).append(elapsed)
+            else:
+                errors[kind] = errors.get(kind, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        wall = time.perf_counter() - start
+    return latencies, errors, wall
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, tenor_url, workdir):
+    port = free_port()
+    env = {
+        **os.environ,
+        "TENOR_API_KEY": "stub",
+        "TENOR_BASE_URL": tenor_url,
+        "EMBEDDING_BACKEND": args.embedder,
+        "EMBEDDING_MODEL": args.model,
+        "EMBEDDING_CACHE_PATH": "",
+        "VECTOR_DB_BACKEND": "numpy",
+        "VECTOR_DB_PATH": os.path.join(workdir, "vectors"),
+        "RETENTION_DB_PATH": os.path.join(workdir, "retention.db"),
+        "FAVORITES_DB_PATH": os.path.join(workdir, "favorites.db"),
+        "ANCHOR_CACHE_DIR": os.path.join(workdir, "anchors"),
+        "MEDIA_DIR": os.path.join(workdir, "media"),
+        "GENERATION_BACKEND": "fake",
+        "PREFETCH_ON_STARTUP": "false",
+        "STARTUP_MODE": "eager",
+        "LOG_LEVEL": "WARNING",
+    }
+    log = open(os.path.join(workdir, "server.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, f"http://127.0.0.1:{port}"
+
+
+def wait_healthy(base_url, process, timeout):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("Server exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).json().get("status") == "ok":
+                return
+        except (httpx.HTTPError, ValueError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server not healthy after {timeout}s")
+
+
+def run_load(args):
+    tenor = stub_tenor.serve(latency=args.tenor_latency)
+    tenor_url = "http://%s:%d" % tenor.server_address[:2]
+    workdir = tempfile.mkdtemp(prefix="bench-load-")
+    process = None
+    try:
+        if args.url:
+            base_url = args.url
+        else:
+            process, base_url = start_server(args, tenor_url, workdir)
+        wait_healthy(base_url, process, args.startup_timeout)
+
+        requests = query_mix(args.warmup + args.requests, args.seed)
+        if args.warmup:
+            print(f"[load] warm-up: {args.warmup} requests")
+            asyncio.run(drive(base_url, requests[:args.warmup], args.concurrency, args.timeout))
+        upstream_before = tenor.RequestHandlerClass.calls
+        print(f"[load] {args.requests} requests, concurrency {args.concurrency}")
+        latencies, errors, wall = asyncio.run(
+            drive(base_url, requests[args.warmup:], args.concurrency, args.timeout)
+        )
+
+        everything = [ms for values in latencies.values() for ms in values]
+        overall = summarize(everything)
+        # Wall-clock rate under concurrency, not the per-request inverse
+        overall["throughput"] = round(len(everything) / wall, 2)
+        overall["errors"] = sum(errors.values())
+        endpoints = {}
+        for kind in LOAD_MIX:
+            row = summarize(latencies.get(kind, []))
+            row.pop("throughput", None)
+            row["errors"] = errors.get(kind, 0)
+            endpoints[kind] = row
+            print(f"[load] {kind:16s} {row}")
+        print(f"[load] overall          {overall}")
+        return {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "tenor_latency_ms": args.tenor_latency * 1000,
+            "tenor_calls": tenor.RequestHandlerClass.calls - upstream_before,
+            "wall_s": round(wall, 3),
+            "overall": overall,
+            "endpoints": endpoints,
+        }
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        tenor.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def flatten(results, prefix=""):
+    flat = {}
+    for key, value in results.items():
+        if key == "meta":
+            continue
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif key in ("throughput", "p50_ms", "p95_ms", "p99_ms"):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(baseline_path, candidate_path, tolerance):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    with open(candidate_path, "r") as f:
+        candidate = json.load(f)
+    print(f"baseline : {baseline.get('meta', {}).get('commit')}  ({baseline_path})")
+    print(f"candidate: {candidate.get('meta', {}).get('commit')}  ({candidate_path})")
+    before, after = flatten(baseline), flatten(candidate)
+    regressions = 0
+    for key in sorted(before.keys() & after.keys()):
+        old, new = before[key], after[key]
+        if not old:
+            continue
+        change = (new - old) / old
+        # Higher throughput is better; higher latency is worse
+        worse = -change if key.endswith("throughput") else change
+        flag = ""
+        if worse > tolerance:
+            flag = "  REGRESSION"
+            regressions += 1
+        elif worse < -tolerance:
+            flag = "  improved"
+        print(f"{key:48s} {old:12.3f} -> {new:12.3f}  {change * 100:+7.1f}%{flag}")
+    print(f"{regressions} regression(s) beyond {tolerance * 100:.0f}%")
+    return regressions
+
+
+def metadata(args):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "embedder": args.embedder,
+        "model": args.model,
+        "seed": args.seed,
+    }
+
+
+def _ints(values):
+    return [int(v) for v in values.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline micro-benchmarks and load test")
+    parser.add_argument("mode", choices=["micro", "load", "all", "compare"])
+    parser.add_argument("files", nargs="*", help="compare: baseline.json candidate.json")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    parser.add_argument("--embedder", default="hash", choices=["hash", "torch", "onnx"])
+    parser.add_argument("--model", default=config.EMBEDDING_MODEL)
+    parser.add_argument("--seed", type=int, default=0)
+    # micro
+    parser.add_argument("--batch-sizes", default="1,8,32,128")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Vector DB collection sizes")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    # load
+    parser.add_argument("--url", default=None, help="Drive an already running server instead of starting one")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--tenor-latency", type=float, default=0.05, help="Stub Tenor delay in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    # compare
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative change reported as a regression")
+    args = parser.parse_args()
+
+    if args.mode == "compare":
+        if len(args.files) != 2:
+            parser.error("compare needs baseline.json and candidate.json")
+        return 1 if compare(args.files[0], args.files[1], args.tolerance) else 0
+
+    results = {"meta": metadata(args)}
+    if args.mode in ("micro", "all"):
+        results["micro"] = run_micro(args)
+    if args.mode in ("load", "all"):
+        results["load"] = run_load(args)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+import sys
+import os
+import argparse
+import json
+import shutil
+import tempfile
+import time
+import uuid
+import numpy as np
+
+# Add backend to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.vector_db import open_vector_db
+
+# Compares the embedded NumPy/HNSW store against Qdrant local mode on synthetic
+# clustered embeddings. Ground truth is exact brute-force cosine search.
+
+
+def make_data(n, centers, rng):
+    # Clustered unit vectors look more like sentence embeddings than pure noise
+    clusters, dim = centers.shape
+    assignments = rng.integers(0, clusters, n)
+    X = np.empty((n, dim), dtype=np.float32)
+    # In chunks: the float64 noise for 1M x 384 alone would be 3 GB
+    for i in range(0, n, 100000):
+        rows = slice(i, min(i + 100000, n))
+        X[rows] = centers[assignments[rows]] + 0.6 * rng.standard_normal((len(assignments[rows]), dim)).astype(np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X
+
+
+def ground_truth(X, Q, k):
+    truth = []
+    for q in Q:
+        sims = X @ q
+        top = np.argpartition(-sims, k - 1)[:k]
+        truth.append(set(top[np.argsort(-sims[top])].tolist()))
+    return truth
+
+
+def run_backend(name, X, Q, truth, k, batch_size, **options):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{name}-")
+    try:
+        db = open_vector_db(name, collection_name="bench", path=workdir, dim=X.shape[1], **options)
+        start = time.perf_counter()
+        for i in range(0, len(X), batch_size):
+            rows = range(i, min(i + batch_size, len(X)))
+            db.upsert(X[i:i + batch_size], [{"row": r} for r in rows], ids=[str(_uuid(r)) for r in rows])
+        load_s = time.perf_counter() - start
+        # The NumPy store builds its HNSW graph in the background; measure
+        # the graph, not the brute-force fallback served until it is ready
+        start = time.perf_counter()
+        indexed = db.wait_for_index() if hasattr(db, "wait_for_index") else False
+        build_s = time.perf_counter() - start
+
+        # Warm-up
+        db.search(Q[0].tolist(), limit=k)
+        latencies, recalls = [], []
+        for q, expected in zip(Q, truth):
+            start = time.perf_counter()
+            points = db.search(q.tolist(), limit=k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = {p.payload["row"] for p in points}
+            recalls.append(len(found & expected) / k)
+        db.close()
+        result = {
+            "load_s": round(load_s, 2),
+            f"recall@{k}": round(float(np.mean(recalls)), 4),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        }
+        if indexed:
+            result["hnsw_build_s"] = round(build_s, 2)
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _uuid(row):
+    # Qdrant local mode needs UUID or integer ids
+    return uuid.UUID(int=row + 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector DB backend benchmark (recall and latency)")
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--hnsw-threshold", type=int, default=50000)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument("--qdrant-max", type=int, default=100000, help="Skip Qdrant local mode above this size")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    results = []
+    for n in [int(s) for s in args.sizes.split(",")]:
+        print(f"\n== {n} points, dim {args.dim} ==")
+        centers = rng.standard_normal((args.clusters, args.dim)).astype(np.float32)
+        X = make_data(n, centers, rng)
+        Q = make_data(args.queries, centers, rng)
+        truth = ground_truth(X, Q, args.k)
+
+        row = {"size": n}
+        row["numpy"] = run_backend(
+            "numpy", X, Q, truth, args.k, args.batch_size,
+            hnsw_threshold=args.hnsw_threshold, hnsw_ef_search=args.ef_search
+        )
+        print(f"numpy : {row['numpy']}")
+        if n <= args.qdrant_max:
+            row["qdrant"] = run_backend("qdrant", X, Q, truth, args.k, args.batch_size)
+            print(f"qdrant: {row['qdrant']}")
+        else:
+            print(f"qdrant: skipped (> --qdrant-max {args.qdrant_max})")
+        results.append(row)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import sys
+import os
+import hashlib
+import json
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from tqdm import tqdm
+
+# Add backend to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.backends import load_backend
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE_DIR = os.path.join(BACKEND_DIR, "data", "embedding_cache", "datasets")
+
+# On-disk embeddings of a whole dataset split for classifier training. Each
+# split is a float32 memmap (rows x dim) in a directory keyed by the embedding
+# backend (model and runtime) and the dataset revision (a hash of the texts),
+# so a different model or a changed dataset never reuses stale vectors.
+# Rows are encoded in chunks; progress.u8 records finished chunks, so an
+# interrupted run resumes where it stopped. Chunks are spread over worker
+# processes, each with its own copy of the model. Workers are spawned, not
+# forked: the parent has already loaded the model (for its name and dim), and
+# a forked child inherits torch/onnxruntime thread pools in an unusable state.
+
+
+def dataset_revision(texts):
+    digest = hashlib.sha256()
+    for text in texts:
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class DatasetEmbeddings:
+    def __init__(self, texts, backend="torch", model_name="all-MiniLM-L6-v2", name="dataset",
+                 cache_dir=DEFAULT_CACHE_DIR, chunk_size=4096, onnx_dir=None, onnx_quantized=False):
+        self.texts = list(texts)
+        self.backend = backend
+        self.model_name = model_name
+        self.onnx_dir = onnx_dir
+        self.onnx_quantized = onnx_quantized
+        self.chunk_size = chunk_size
+        self.model = load_backend(backend, model_name, onnx_dir, onnx_quantized)
+        self.dim = self.model.dim
+        self.revision = dataset_revision(self.texts)
+
+        key = hashlib.sha256(f"{self.model.name}|{self.revision}".encode()).hexdigest()[:12]
+        slug = self.model.name.replace(":", "-").replace("/", "-")
+        self.path = os.path.join(cache_dir, f"{name}-{slug}-{key}")
+        self.matrix_path = os.path.join(self.path, "embeddings.f32")
+        self.progress_path = os.path.join(self.path, "progress.u8")
+        self.meta = {
+            "model": self.model.name,
+            "revision": self.revision,
+            "rows": len(self.texts),
+            "dim": self.dim,
+            "chunk_size": chunk_size
+        }
+        self.chunks = (len(self.texts) + chunk_size - 1) // chunk_size
+        self._open()
+
+    def _open(self):
+        meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r") as f:
+                if json.load(f) == self.meta:
+                    self.progress = np.memmap(self.progress_path, dtype=np.uint8, mode="r+", shape=(max(self.chunks, 1),))
+                    return
+            print(f"Discarding {self.path}: written with different settings")
+        os.makedirs(self.path, exist_ok=True)
+        shape = (max(len(self.texts), 1), self.dim)
+        np.memmap(self.matrix_path, dtype=np.float32, mode="w+", shape=shape).flush()
+        self.progress = np.memmap(self.progress_path, dtype=np.uint8, mode="w+", shape=(max(self.chunks, 1),))
+        self.progress.flush()
+        # meta.json last: its presence means the files above are complete
+        tmp = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp, meta_path)
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.progress[:self.chunks].all())
+
+    def encode(self, batch_size=256, workers=1):
+        pending = [c for c in range(self.chunks) if not self.progress[c]]
+        if not pending:
+            print(f"Embeddings cached: {len(self.texts)} rows in {self.path}")
+            return
+        print(f"Encoding {len(self.texts)} rows with {self.model.name}: {len(pending)}/{self.chunks} chunks left, "
+              f"{workers} worker(s), batch size {batch_size}")
+        jobs = [(c, c * self.chunk_size, min((c + 1) * self.chunk_size, len(self.texts))) for c in pending]
+        shape = (len(self.texts), self.dim)
+
+        with tqdm(total=len(pending), unit="chunk") as bar:
+            if workers <= 1:
+                for chunk, start, stop in jobs:
+                    _encode_chunk(self.model, self.matrix_path, shape, start, self.texts[start:stop], batch_size)
+                    self._mark(chunk)
+                    bar.update()
+                return
+
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            init = (self.backend, self.model_name, self.onnx_dir, self.onnx_quantized, threads)
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker, initargs=init) as pool:
+                futures = {
+                    pool.submit(_encode_chunk, None, self.matrix_path, shape, start, self.texts[start:stop], batch_size): chunk
+                    for chunk, start, stop in jobs
+                }
+                for future in as_completed(futures):
+                    future.result()
+                    self._mark(futures[future])
+                    bar.update()
+
+    def _mark(self, chunk):
+        # Only after the chunk's rows are flushed to disk
+        self.progress[chunk] = 1
+        self.progress.flush()
+
+    def matrix(self) -> np.ndarray:
+        if not self.complete:
+            raise RuntimeError(f"{self.path} is incomplete; run encode() first")
+        return np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self.texts), self.dim))
+
+
+_worker_model = None
+
+
+def _init_worker(backend, model_name, onnx_dir, onnx_quantized, threads):
+    # Split the cores between workers instead of each one grabbing all of them
+    global _worker_model
+    if backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    _worker_model = load_backend(backend, model_name, onnx_dir, onnx_quantized, onnx_threads=threads)
+
+
+def _encode_chunk(model, matrix_path, shape, start, texts, batch_size):
+    if model is None:
+        model = _worker_model
+    # Similar lengths per batch keep padding (and wasted compute) low
+    order = np.argsort([len(t) for t in texts], kind="stable")
+    out = np.memmap(matrix_path, dtype=np.float32, mode="r+", shape=shape)
+    for i in range(0, len(order), batch_size):
+        rows = order[i:i + batch_size]
+        embeddings = np.asarray(model.encode([texts[r] for r in rows]), dtype=np.float32)
+        out[start + rows] = embeddings
+    out.flush()
+    del out
@@ -0,0 +1,55 @@
+import sys
+import os
+import argparse
+import joblib
+import numpy as np
+
+# Add backend to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.classifier import LinearClassifier
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+
+def check_parity(clf, exported, dim, samples=2000, seed=0):
+    # Random unit vectors cover the same space as sentence embeddings
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((samples, dim)).astype(np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+
+    expected = clf.predict_proba(X)
+    actual = exported.predict_proba(X)
+    max_diff = float(np.abs(expected - actual).max())
+    agreement = float((expected.argmax(axis=1) == actual.argmax(axis=1)).mean())
+    print(f"Parity on {samples} vectors: max |dp| = {max_diff:.2e}, argmax agreement = {agreement:.2%}")
+    return max_diff, agreement
+
+
+def export(pkl_path, npz_path, tolerance=1e-4):
+    print(f"Loading {pkl_path}...")
+    data = joblib.load(pkl_path)
+    clf = data["model"]
+
+    exported = LinearClassifier.from_sklearn(clf, data["labels"])
+    exported.save(npz_path)
+    print(f"Saved {exported.activation} classifier ({len(exported.labels)} labels) to {npz_path}")
+
+    # Check the file we just wrote, not the in-memory copy
+    loaded = LinearClassifier.load(npz_path)
+    max_diff, agreement = check_parity(clf, loaded, loaded.weights.shape[1])
+    if max_diff > tolerance or agreement < 1.0:
+        print("Parity check FAILED")
+        return False
+    print("Parity check passed.")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the sklearn emotion classifier to a NumPy .npz artifact")
+    parser.add_argument("--pkl", default=os.path.join(MODELS_DIR, "emotion_classifier.pkl"))
+    parser.add_argument("--out", default=os.path.join(MODELS_DIR, "emotion_classifier.npz"))
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    sys.exit(0 if export(args.pkl, args.out, args.tolerance) else 1)
@@ -0,0 +1,68 @@
+import sys
+import os
+import argparse
+
+# Add backend to path to import models
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.backends import default_onnx_dir
+
+# Export needs torch + transformers (installed with the "torch" extra); the
+# exported model only needs onnxruntime + tokenizers at runtime.
+
+
+def export(model_name, out_dir, quantize=True, opset=14):
+    import torch
+    from transformers import AutoModel, AutoTokenizer
+
+    hf_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+    print(f"Loading {hf_name}...")
+    tokenizer = AutoTokenizer.from_pretrained(hf_name)
+    model = AutoModel.from_pretrained(hf_name).eval()
+
+    # Return only the token embeddings; pooling and normalization run in NumPy
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+    os.makedirs(out_dir, exist_ok=True)
+    model_path = os.path.join(out_dir, "model.onnx")
+    dummy = tokenizer(["an example sentence", "another one"], padding=True, return_tensors="pt")
+    inputs = ["input_ids", "attention_mask", "token_type_ids"]
+
+    print(f"Exporting to {model_path}...")
+    torch.onnx.export(
+        TokenEmbeddings(model),
+        tuple(dummy[name] for name in inputs),
+        model_path,
+        input_names=inputs,
+        output_names=["token_embeddings"],
+        dynamic_axes={name: {0: "batch", 1: "sequence"} for name in inputs + ["token_embeddings"]},
+        opset_version=opset
+    )
+    # Writes tokenizer.json, which OnnxBackend loads with the tokenizers library
+    tokenizer.save_pretrained(out_dir)
+
+    if quantize:
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        quantized_path = os.path.join(out_dir, "model_int8.onnx")
+        print(f"Quantizing (dynamic int8) to {quantized_path}...")
+        quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+
+    print("Done! Check parity with scripts/benchmark_embeddings.py before switching EMBEDDING_BACKEND=onnx.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the sentence-transformer to ONNX (optionally int8)")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--out", default=None, help="Output directory (default: models/onnx/<model>)")
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    export(args.model, args.out or default_onnx_dir(args.model), quantize=not args.no_quantize, opset=args.opset)
@@ -0,0 +1,198 @@
+import sys
+import os
+import argparse
+import hashlib
+import json
+import time
+import numpy as np
+
+# Add backend to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.hybrid import HybridVectorDB
+from services.lexical import tokenize
+from services.retrieval import lexical_match
+from services.vector_db import open_vector_db
+
+# Local hit rate and latency of dense-only vs hybrid (dense + BM25) search on a
+# synthetic lazily-indexed collection: GIFs are stored under the embedding of
+# the query that found them, and their titles use words that query didn't.
+#
+# By default texts are embedded with a bag-of-words random projection, which
+# (like lazy indexing) never sees the titles, so title-term queries are an
+# upper bound on what the lexical side adds. --model uses the real embedding
+# model instead.
+
+
+def pseudo_words(count, rng):
+    syllables = ["ka", "ro", "mi", "ten", "ba", "zu", "lo", "ne", "shi", "po", "dra", "vel", "qua", "rin", "go"]
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(syllables, rng.integers(2, 5))))
+    return sorted(words)
+
+
+class BagOfWordsEmbedder:
+    def __init__(self, dim, seed=0):
+        self.dim = dim
+        self.seed = seed
+        self.vectors = {}
+
+    def word(self, word):
+        vector = self.vectors.get(word)
+        if vector is None:
+            digest = int(hashlib.md5(word.encode()).hexdigest()[:8], 16)
+            rng = np.random.default_rng([self.seed, digest])
+            vector = self.vectors[word] = rng.standard_normal(self.dim).astype(np.float32)
+        return vector
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for word in tokenize(text):
+                out[i] += self.word(word)
+        out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+        return out
+
+
+def build_corpus(points, per_query, topics, rng):
+    # Each topic has a few common words (used in queries and titles) and a few
+    # rare ones (names, catchphrases) that mostly appear in titles
+    words = pseudo_words(topics * 12, rng)
+    topic_words = [words[i * 12:i * 12 + 6] for i in range(topics)]
+    title_words = [words[i * 12 + 6:i * 12 + 12] for i in range(topics)]
+    queries, gifs = [], []
+    for q in range(points // per_query):
+        t = int(rng.integers(topics))
+        query = " ".join(rng.choice(topic_words[t], 2, replace=False))
+        queries.append((query, t))
+        for i in range(per_query):
+            title = list(rng.choice(title_words[t], 2, replace=False)) + [str(rng.choice(topic_words[t]))]
+            rng.shuffle(title)
+            gifs.append({"id": f"g{q}-{i}", "title": " ".join(title), "query": query})
+    return queries, gifs
+
+
+def eval_queries(queries, gifs, count, rng):
+    # Three kinds: a title-only term, a two-word title phrase, and a known
+    # query with its words reordered (which dense search already handles)
+    out = []
+    for _ in range(count):
+        kind = rng.choice(["title_term", "title_phrase", "reordered_query"])
+        gif = gifs[int(rng.integers(len(gifs)))]
+        title = [w for w in gif["title"].split() if w not in gif["query"].split()]
+        if kind == "title_term":
+            out.append((kind, str(rng.choice(title))))
+        elif kind == "title_phrase":
+            out.append((kind, " ".join(gif["title"].split()[:2])))
+        else:
+            out.append((kind, " ".join(reversed(gif["query"].split()))))
+    return out
+
+
+def relevant(text, payload):
+    words = set(tokenize(f"{payload.get('title', '')} {payload.get('query', '')}"))
+    return all(w in words for w in tokenize(text))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense vs hybrid local hit rate and latency")
+    parser.add_argument("--points", type=int, default=100000)
+    parser.add_argument("--per-query", type=int, default=20, help="GIFs stored per originating query")
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    parser.add_argument("--min-coverage", type=float, default=0.99, help="Lexical acceptance (HYBRID_MIN_COVERAGE)")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--model", action="store_true", help="Embed with the configured embedding model")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries, gifs = build_corpus(args.points, args.per_query, args.topics, rng)
+    tests = eval_queries(queries, gifs, args.queries, rng)
+
+    if args.model:
+        import config
+        from models.embeddings import EmbeddingModel
+        model = EmbeddingModel(config.EMBEDDING_MODEL, cache_size=0, backend=config.EMBEDDING_BACKEND)
+        encode = lambda texts: np.asarray(model.encode(texts)[0], dtype=np.float32)
+        dim = model.dim
+    else:
+        embedder = BagOfWordsEmbedder(args.dim)
+        encode = embedder.encode
+        dim = args.dim
+
+    query_vectors = dict(zip([q for q, _ in queries], encode([q for q, _ in queries])))
+    db = open_vector_db("numpy", memory=True, dim=dim, hnsw_threshold=10 ** 9)
+    start = time.perf_counter()
+    for i in range(0, len(gifs), 5000):
+        batch = gifs[i:i + 5000]
+        db.upsert(np.stack([query_vectors[g["query"]] for g in batch]), batch)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    hybrid = HybridVectorDB(db, rrf_k=args.rrf_k, candidates=args.candidates)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    test_vectors = encode([text for _, text in tests])
+    hybrid.hybrid_search(tests[0][1], test_vectors[0].tolist(), args.limit)
+
+    rows = {}
+    for mode in ("dense", "hybrid"):
+        latencies = []
+        for (kind, text), vector in zip(tests, test_vectors):
+            started = time.perf_counter()
+            if mode == "dense":
+                points = db.search(vector.tolist(), limit=args.limit)
+            else:
+                points = hybrid.hybrid_search(text, vector.tolist(), limit=args.limit)
+            latencies.append((time.perf_counter() - started) * 1000)
+            # Same acceptance rule as RetrievalEngine
+            local = [p for p in points if p.score >= args.threshold or lexical_match(p, args.min_coverage)]
+            row = rows.setdefault(kind, {}).setdefault(mode, {"hits": 0, "relevant_hits": 0, "n": 0})
+            row["n"] += 1
+            row["hits"] += bool(local)
+            row["relevant_hits"] += any(relevant(text, p.payload) for p in local)
+        rows.setdefault("latency_ms", {})[mode] = {
+            "p50": round(float(np.percentile(latencies, 50)), 3),
+            "p99": round(float(np.percentile(latencies, 99)), 3),
+            "mean": round(float(np.mean(latencies)), 3)
+        }
+
+    results = {
+        "points": len(gifs),
+        "load_s": round(load_s, 2),
+        "lexical_build_ms": round(build_ms, 1),
+        "lexical": hybrid.lexical.stats(),
+        "lexical_search_ms": {k: v for k, v in hybrid.stats()["lexical_ms"].items() if k != "buckets"},
+        "embedder": "model" if args.model else "bag-of-words",
+    }
+    print(f"{len(gifs)} points, {len(tests)} queries, threshold {args.threshold}")
+    for kind in ("title_term", "title_phrase", "reordered_query"):
+        results[kind] = {}
+        for mode in ("dense", "hybrid"):
+            r = rows[kind][mode]
+            results[kind][mode] = {
+                "local_hit_rate": round(r["hits"] / r["n"], 3),
+                "relevant_hit_rate": round(r["relevant_hits"] / r["n"], 3)
+            }
+        print(f"{kind:16s} dense {results[kind]['dense']}  hybrid {results[kind]['hybrid']}")
+    total = {mode: sum(rows[k][mode]["hits"] for k in rows if k != "latency_ms") / len(tests) for mode in ("dense", "hybrid")}
+    results["overall_local_hit_rate"] = {mode: round(v, 3) for mode, v in total.items()}
+    results["latency_ms"] = rows["latency_ms"]
+    print(f"overall local hit rate: dense {total['dense']:.3f} -> hybrid {total['hybrid']:.3f}")
+    print(f"latency ms: dense {rows['latency_ms']['dense']}  hybrid {rows['latency_ms']['hybrid']}")
+    print(f"lexical search ms: {results['lexical_search_ms']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
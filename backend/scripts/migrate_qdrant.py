@@ -0,0 +1,95 @@
+import sys
+import os
+import argparse
+import time
+
+# Add backend to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from services.qdrant_db import QdrantVectorDB
+
+# Copies an existing collection to a Qdrant server, into a collection created
+# with quantization and on-disk storage (scalar quantization, vectors and
+# payloads on disk, unless QDRANT_QUANTIZATION or the flags below say otherwise).
+# Local mode has neither, so the destination is always a server:
+#
+#   python scripts/migrate_qdrant.py --src-path qdrant_data --dst-url http://localhost:6333
+#
+# An existing collection on a server is converted in place by just starting
+# the backend with QDRANT_URL set; it calls update_collection.
+
+
+def copy_points(src: QdrantClient, dst: QdrantVectorDB, collection: str, batch_size: int):
+    copied = 0
+    offset = None
+    started = time.perf_counter()
+    while True:
+        records, offset = src.scroll(
+            collection_name=collection,
+            limit=batch_size,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True
+        )
+        if records:
+            dst.client.upsert(
+                collection_name=dst.collection_name,
+                points=[models.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records]
+            )
+            copied += len(records)
+            print(f"  copied {copied} points ({time.perf_counter() - started:.1f}s)")
+        if offset is None:
+            return copied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate a Qdrant collection to quantized / on-disk storage")
+    parser.add_argument("--collection", default="gifs")
+    parser.add_argument("--src-path", default=None, help="Local qdrant_data directory")
+    parser.add_argument("--src-url", default=None)
+    parser.add_argument("--dst-url", required=True, help="Qdrant server to copy the collection to")
+    parser.add_argument("--quantization", default=os.getenv("QDRANT_QUANTIZATION", "scalar"), choices=["scalar", "product", "none"])
+    parser.add_argument("--quantile", type=float, default=config.QDRANT_QUANTILE)
+    parser.add_argument("--pq-compression", default=config.QDRANT_PQ_COMPRESSION)
+    parser.add_argument("--in-memory-payload", action="store_true", help="Keep payloads in RAM")
+    parser.add_argument("--in-memory-vectors", action="store_true", help="Keep float32 vectors in RAM")
+    parser.add_argument("--batch-size", type=int, default=1024)
+    args = parser.parse_args()
+
+    if bool(args.src_path) == bool(args.src_url):
+        parser.error("pass exactly one of --src-path / --src-url")
+    if args.src_url and args.src_url.rstrip("/") == args.dst_url.rstrip("/"):
+        parser.error("source and destination are the same server; start the backend with QDRANT_URL to convert it in place")
+
+    src = QdrantClient(path=args.src_path) if args.src_path else QdrantClient(url=args.src_url)
+    if not src.collection_exists(args.collection):
+        sys.exit(f"Collection '{args.collection}' not found in the source")
+    dim = src.get_collection(args.collection).config.params.vectors.size
+    total = src.count(args.collection).count
+    print(f"Source: {total} points, dim {dim}")
+
+    dst = QdrantVectorDB(
+        args.collection,
+        url=args.dst_url,
+        dim=dim,
+        quantization=args.quantization,
+        quantile=args.quantile,
+        pq_compression=args.pq_compression,
+        on_disk_vectors=not args.in_memory_vectors,
+        on_disk_payload=not args.in_memory_payload
+    )
+    copied = copy_points(src, dst, args.collection, args.batch_size)
+    count = dst.count()
+    dst.close()
+    src.close()
+
+    if count < total:
+        sys.exit(f"Destination has {count} of {total} points; source left untouched")
+    print(f"Migrated {copied} points to {args.dst_url}; set QDRANT_URL={args.dst_url} to use it")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import sys
+import os
+import argparse
+import asyncio
+import json
+
+# Add backend to path to import services
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from models.embeddings import EmbeddingModel
+from services.indexer import IndexWriter
+from services.prefetch import Prefetcher, warmup_queries
+from services.tenor_api import TenorAPI
+from services.vector_db import open_vector_db
+
+# Pre-indexes the warm-up queries (suggestion chips + trending_global) into the
+# configured vector DB without running the server.
+#
+#   python scripts/prefetch.py                                 # live Tenor
+#   python scripts/prefetch.py --record data/tenor_fixture.json
+#   python scripts/prefetch.py --fixture data/tenor_fixture.json   # offline
+#
+# A fixture is {"responses": {query: [Tenor v2 result, ...]}}, as written by
+# --record.
+
+EMOTIONS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "emotions.json")
+
+
+class FixtureTenor:
+    def __init__(self, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            self.responses = json.load(f)["responses"]
+
+    async def search(self, query: str, limit: int = 20):
+        if query not in self.responses:
+            print(f"No recorded response for '{query}'")
+        return self.responses.get(query, [])[:limit]
+
+
+class RecordingTenor:
+    def __init__(self, tenor: TenorAPI):
+        self.tenor = tenor
+        self.responses = {}
+
+    async def search(self, query: str, limit: int = 20):
+        results = await self.tenor.search(query, limit=limit)
+        self.responses[query] = results
+        return results
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"responses": self.responses}, f, indent=1)
+        print(f"Recorded {len(self.responses)} responses to {path}")
+
+
+async def run(args):
+    with open(args.emotions, "r", encoding="utf-8") as f:
+        queries = warmup_queries(json.load(f))
+    print(f"{len(queries)} warm-up queries")
+
+    live = None
+    if args.fixture:
+        tenor = FixtureTenor(args.fixture)
+    else:
+        live = TenorAPI(base_url=config.TENOR_BASE_URL, timeout=config.TENOR_TIMEOUT)
+        tenor = RecordingTenor(live) if args.record else live
+
+    model = EmbeddingModel(
+        config.EMBEDDING_MODEL,
+        cache_size=config.EMBEDDING_CACHE_SIZE,
+        cache_path=config.EMBEDDING_CACHE_PATH,
+        backend=config.EMBEDDING_BACKEND,
+        onnx_dir=config.ONNX_MODEL_DIR,
+        onnx_quantized=config.ONNX_QUANTIZED,
+        onnx_threads=config.ONNX_THREADS
+    )
+    vector_db = open_vector_db(config.VECTOR_DB_BACKEND, path=config.VECTOR_DB_PATH, dim=model.dim, **config.vector_db_options())
+    indexer = IndexWriter(vector_db, batch_size=config.INDEX_BATCH_SIZE, max_pending=len(queries) * args.limit)
+
+    async def encode_many(texts):
+        return await asyncio.to_thread(model.encode, texts)
+
+    prefetcher = Prefetcher(
+        tenor,
+        encode_many,
+        indexer,
+        vector_db=vector_db,
+        limit=args.limit,
+        rate=args.rate,
+        burst=args.burst,
+        concurrency=args.concurrency
+    )
+    try:
+        result = await prefetcher.run(queries, skip_existing=args.skip_existing)
+        print(json.dumps({**result, "collection_size": vector_db.count()}, indent=2))
+    finally:
+        if live:
+            await live.aclose()
+        if args.record:
+            tenor.save(args.record)
+        model.close()
+        vector_db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prefetch warm-up queries into the vector DB")
+    parser.add_argument("--fixture", default=None, help="Replay recorded Tenor responses instead of calling Tenor")
+    parser.add_argument("--record", default=None, help="Save the live Tenor responses as a fixture")
+    parser.add_argument("--emotions", default=EMOTIONS_FILE)
+    parser.add_argument("--limit", type=int, default=config.PREFETCH_LIMIT)
+    parser.add_argument("--rate", type=float, default=None, help="Upstream requests per second (0 = unlimited)")
+    parser.add_argument("--burst", type=int, default=config.PREFETCH_BURST)
+    parser.add_argument("--concurrency", type=int, default=config.PREFETCH_CONCURRENCY)
+    parser.add_argument("--skip-existing", action="store_true", help="Skip queries that are already indexed")
+    args = parser.parse_args()
+    if args.fixture and args.record:
+        parser.error("--fixture and --record are exclusive")
+    if args.rate is None:
+        # Replaying a fixture never touches Tenor
+        args.rate = 0 if args.fixture else config.PREFETCH_RATE
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
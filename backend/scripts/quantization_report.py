@@ -0,0 +1,208 @@
+import argparse
+import json
+import numpy as np
+
+# Memory footprint and recall of the GIF collection before and after
+# quantization + on-disk payloads. Vectors come from an existing qdrant_data
+# directory (--path) or are synthetic (--synthetic N). Qdrant's int8 scalar and
+# product quantization are reproduced in NumPy so the numbers are available
+# without a server; with --url the same comparison also runs against a real
+# Qdrant collection (exact search as ground truth).
+
+MB = 1024 * 1024
+HNSW_M = 16
+
+
+def load_collection(path, collection):
+    from qdrant_client import QdrantClient
+    client = QdrantClient(path=path)
+    vectors, payload_bytes, offset = [], 0, None
+    while True:
+        records, offset = client.scroll(collection, limit=1024, offset=offset, with_payload=True, with_vectors=True)
+        for r in records:
+            vectors.append(r.vector)
+            payload_bytes += len(json.dumps(r.payload))
+        if offset is None:
+            break
+    client.close()
+    X = np.asarray(vectors, dtype=np.float32)
+    X /= np.linalg.norm(X, axis=1, keepdims=True)
+    return X, payload_bytes / max(len(vectors), 1)
+
+
+def synthetic(n, dim, clusters, rng):
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    def draw(count):
+        X = centers[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dim)).astype(np.float32)
+        return X / np.linalg.norm(X, axis=1, keepdims=True)
+    return draw(n), draw
+
+
+# --- quantizers (same schemes Qdrant uses) ---
+
+class ScalarInt8:
+    def __init__(self, X, quantile=0.99):
+        # One global range, clipped at the quantile so outliers don't waste levels
+        tail = (1 - quantile) / 2
+        self.low, self.high = np.quantile(X, [tail, 1 - tail])
+        self.step = (self.high - self.low) / 255
+        self.codes = np.round((np.clip(X, self.low, self.high) - self.low) / self.step).astype(np.uint8)
+
+    def bytes_per_vector(self):
+        return self.codes.shape[1]
+
+    def scores(self, q):
+        return (self.codes.astype(np.float32) * self.step + self.low) @ q
+
+
+class Product:
+    def __init__(self, X, compression=16, sample=20000, seed=0):
+        from sklearn.cluster import MiniBatchKMeans
+        dim = X.shape[1]
+        # One byte (256 centroids) per chunk; x16 on 384 floats = 96 chunks of 4 dims
+        self.chunks = dim * 4 // compression
+        self.width = dim // self.chunks
+        rng = np.random.default_rng(seed)
+        train = X[rng.choice(len(X), min(sample, len(X)), replace=False)]
+        self.centroids, codes = [], []
+        for c in range(self.chunks):
+            part = slice(c * self.width, (c + 1) * self.width)
+            k = min(256, len(train))
+            km = MiniBatchKMeans(n_clusters=k, random_state=seed, n_init=1, batch_size=4096).fit(train[:, part])
+            self.centroids.append(km.cluster_centers_.astype(np.float32))
+            codes.append(km.predict(X[:, part]).astype(np.uint8))
+        self.codes = np.stack(codes, axis=1)
+
+    def bytes_per_vector(self):
+        return self.chunks
+
+    def scores(self, q):
+        table = np.stack([
+            self.centroids[c] @ q[c * self.width:(c + 1) * self.width] for c in range(self.chunks)
+        ])
+        return table[np.arange(self.chunks), self.codes].sum(axis=1)
+
+
+def top_k(scores, k):
+    k = min(k, len(scores))
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+
+def recall(X, Q, truth, k, quantizer=None, oversampling=1.0):
+    hits = []
+    for q, expected in zip(Q, truth):
+        if quantizer is None:
+            found = top_k(X @ q, k)
+        else:
+            candidates = top_k(quantizer.scores(q), int(k * oversampling))
+            if oversampling > 1.0:
+                # Rescore the candidates against the float32 originals
+                candidates = candidates[top_k(X[candidates] @ q, k)]
+            found = candidates[:k]
+        hits.append(len(set(found.tolist()) & expected) / k)
+    return round(float(np.mean(hits)), 4)
+
+
+def footprint(n, dim, payload_bytes, vector_bytes=None, on_disk_vectors=False, on_disk_payload=False):
+    # Estimated resident memory: searched vectors, HNSW level-0 links, payloads
+    floats = n * dim * 4
+    ram = n * HNSW_M * 2 * 4
+    disk = 0
+    if vector_bytes is not None:
+        ram += n * vector_bytes
+    if on_disk_vectors:
+        disk += floats
+    else:
+        ram += floats
+    if on_disk_payload:
+        disk += n * payload_bytes
+    else:
+        ram += n * payload_bytes
+    return round(ram / MB, 1), round(disk / MB, 1)
+
+
+def server_recall(url, collection, Q, k, oversampling):
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+    client = QdrantClient(url=url)
+    exact = models.SearchParams(exact=True)
+    modes = {
+        "ignore": models.SearchParams(quantization=models.QuantizationSearchParams(ignore=True)),
+        "quantized": models.SearchParams(quantization=models.QuantizationSearchParams(rescore=False)),
+        "rescored": models.SearchParams(quantization=models.QuantizationSearchParams(rescore=True, oversampling=oversampling)),
+    }
+    results = {name: [] for name in modes}
+    for q in Q:
+        truth = {p.id for p in client.query_points(collection, query=q.tolist(), limit=k, search_params=exact).points}
+        for name, params in modes.items():
+            found = {p.id for p in client.query_points(collection, query=q.tolist(), limit=k, search_params=params).points}
+            results[name].append(len(found & truth) / k)
+    client.close()
+    return {name: round(float(np.mean(v)), 4) for name, v in results.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantization memory / recall report")
+    parser.add_argument("--path", default=None, help="Read vectors from this qdrant_data directory")
+    parser.add_argument("--collection", default="gifs")
+    parser.add_argument("--synthetic", type=int, default=100000, help="Synthetic collection size when --path is not set")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--payload-bytes", type=int, default=400, help="Average payload size for synthetic data")
+    parser.add_argument("--project", default="1000000,5000000", help="Also project the footprint to these sizes")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--oversampling", type=float, default=3.0, help="Rescoring candidates per result (QDRANT_OVERSAMPLING)")
+    parser.add_argument("--pq-compression", type=int, default=16)
+    parser.add_argument("--url", default=None, help="Also measure recall on this Qdrant server collection")
+    parser.add_argument("--json", default=None, help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.path:
+        X, payload_bytes = load_collection(args.path, args.collection)
+        Q = X[rng.choice(len(X), min(args.queries, len(X)), replace=False)] + 0.05 * rng.standard_normal((min(args.queries, len(X)), X.shape[1])).astype(np.float32)
+        Q /= np.linalg.norm(Q, axis=1, keepdims=True)
+    else:
+        X, draw = synthetic(args.synthetic, args.dim, args.clusters, rng)
+        Q = draw(args.queries)
+        payload_bytes = args.payload_bytes
+    n, dim = X.shape
+    print(f"{n} vectors, dim {dim}, ~{payload_bytes:.0f} payload bytes/point")
+
+    truth = [set(top_k(X @ q, args.k).tolist()) for q in Q]
+    print("Quantizing...")
+    scalar = ScalarInt8(X)
+    product = Product(X, compression=args.pq_compression)
+
+    configs = [
+        ("float32, payload in RAM", None, 1.0, dict()),
+        ("int8 scalar, no rescore", scalar, 1.0, dict(vector_bytes=scalar.bytes_per_vector(), on_disk_vectors=True, on_disk_payload=True)),
+        (f"int8 scalar, rescore x{args.oversampling:g}", scalar, args.oversampling, dict(vector_bytes=scalar.bytes_per_vector(), on_disk_vectors=True, on_disk_payload=True)),
+        (f"PQ x{args.pq_compression}, no rescore", product, 1.0, dict(vector_bytes=product.bytes_per_vector(), on_disk_vectors=True, on_disk_payload=True)),
+        (f"PQ x{args.pq_compression}, rescore x{args.oversampling:g}", product, args.oversampling, dict(vector_bytes=product.bytes_per_vector(), on_disk_vectors=True, on_disk_payload=True)),
+    ]
+    sizes = [n] + [int(s) for s in args.project.split(",") if s]
+    rows = []
+    print(f"\n{'config':32} {'recall@' + str(args.k):>9}" + "".join(f" {'RAM/disk MB @' + str(s):>24}" for s in sizes))
+    for name, quantizer, oversampling, storage in configs:
+        r = recall(X, Q, truth, args.k, quantizer, oversampling)
+        memory = {s: footprint(s, dim, payload_bytes, **storage) for s in sizes}
+        rows.append({"config": name, f"recall@{args.k}": r,
+                     "memory_mb": {str(s): {"ram": m[0], "disk": m[1]} for s, m in memory.items()}})
+        print(f"{name:32} {r:>9.4f}" + "".join(f" {f'{m[0]:.0f} / {m[1]:.0f}':>24}" for m in memory.values()))
+
+    report = {"points": n, "dim": dim, "payload_bytes": payload_bytes, "configs": rows}
+    if args.url:
+        report["server"] = server_recall(args.url, args.collection, Q, args.k, args.oversampling)
+        print(f"\nServer recall@{args.k}: {report['server']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
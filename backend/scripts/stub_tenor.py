@@ -0,0 +1,96 @@
+import sys
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Offline stand-in for the Tenor v2 API (point TENOR_BASE_URL at it). /search
+# and /featured return `limit` results derived from the query, so every run
+# sees the same ids and titles; each response is delayed by `latency` seconds
+# to model the upstream round trip. Queries listed in `fail` get a 500.
+
+
+def stub_results(query, limit):
+    results = []
+    for i in range(limit):
+        gif_id = hashlib.sha1(f"{query}:{i}".encode()).hexdigest()[:16]
+        url = f"https://media.tenor.invalid/{gif_id}"
+        results.append({
+            "id": gif_id,
+            "content_description": f"{query} gif {i}" if query else f"featured gif {i}",
+            "itemurl": f"https://tenor.invalid/view/{gif_id}",
+            "media_formats": {
+                "gif": {"url": f"{url}.gif", "dims": [498, 373]},
+                "webm": {"url": f"{url}.webm"},
+                "tinygif": {"url": f"{url}-tiny.gif"}
+            }
+        })
+    return results
+
+
+class StubTenorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.05
+    fail = ()
+    calls = 0
+    queries = {}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if url.path.rstrip("/").split("/")[-1] not in ("search", "featured"):
+            self.send_error(404)
+            return
+        query = params.get("q", [""])[0]
+        type(self).calls += 1
+        self.queries[query] = self.queries.get(query, 0) + 1
+        time.sleep(self.latency)
+        if query in self.fail:
+            body, status = b"upstream broke", 500
+        else:
+            limit = int(params.get("limit", ["20"])[0])
+            body, status = json.dumps({"results": stub_results(query, limit), "next": ""}).encode(), 200
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host="127.0.0.1", port=0, latency=0.05, fail=()):
+    # Runs in a daemon thread; port 0 picks a free one (server.server_address).
+    # Call counts are on server.RequestHandlerClass (calls, queries).
+    handler = type("Handler", (StubTenorHandler,), {"latency": latency, "fail": tuple(fail), "calls": 0, "queries": {}})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub Tenor API server for offline runs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9123)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    args = parser.parse_args()
+
+    server = serve(args.host, args.port, args.latency)
+    host, port = server.server_address[:2]
+    print(f"Stub Tenor listening on http://{host}:{port} (latency {args.latency * 1000:.0f} ms)")
+    print(f"  TENOR_BASE_URL=http://{host}:{port} TENOR_API_KEY=stub")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,97 +1,200 @@
 import sys
 import os
+import argparse
+import glob
+import time
 import joblib
 import numpy as np
-from datasets import load_dataset
 from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import classification_report
-from tqdm import tqdm
+from sklearn.metrics import f1_score
+from sklearn.multiclass import OneVsRestClassifier
 
 # Add backend to path to import models
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.embeddings import EmbeddingModel
+from models.classifier import LinearClassifier
+from dataset_embeddings import DEFAULT_CACHE_DIR, DatasetEmbeddings
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
 
 # GoEmotions Labels
 LABELS = [
-    "admiration", "amusement", "anger", "annoyance", "approval", "caring", 
-    "confusion", "curiosity", "desire", "disappointment", "disapproval", 
-    "disgust", "embarrassment", "excitement", "fear", "gratitude", "grief", 
-    "joy", "love", "nervousness", "optimism", "pride", "realization", 
+    "admiration", "amusement", "anger", "annoyance", "approval", "caring",
+    "confusion", "curiosity", "desire", "disappointment", "disapproval",
+    "disgust", "embarrassment", "excitement", "fear", "gratitude", "grief",
+    "joy", "love", "nervousness", "optimism", "pride", "realization",
     "relief", "remorse", "sadness", "surprise", "neutral"
 ]
 
-def train():
-    print("Loading Embedding Model...")
-    embedder = EmbeddingModel()
-    
-    print("Loading GoEmotions dataset...")
-    # Using a subset for speed (first 10k)
-    dataset = load_dataset("go_emotions", split="train[:10000]")
-    
-    print(f"Loaded {len(dataset)} examples.")
-    
-    texts = []
-    y = []
-    
-    print("Processing dataset...")
-    for item in tqdm(dataset):
-        text = item['text']
-        labels = item['labels']
-        
-        # Multi-label strategy: Pick the first label for simplicity
-        # (Logistic Regression is multi-class, not multi-label by default)
-        if len(labels) > 0:
-            texts.append(text)
-            y.append(labels[0]) # Integer label
-            
-    print(f"Training on {len(texts)} samples.")
-    
-    # Generate Embeddings
-    print("Generating embeddings (this may take a moment)...")
-    X = []
-    batch_size = 32
-    
-    for i in tqdm(range(0, len(texts), batch_size)):
-        batch_texts = texts[i:i+batch_size]
-        embeddings, _ = embedder.encode(batch_texts)
-        X.extend(embeddings)
-        
-    X = np.array(X)
-    y = np.array(y)
-    
-    # Train Classifier
-    print("Training Logistic Regression...")
-    clf = LogisticRegression(max_iter=1000, verbose=1, n_jobs=-1)
-    clf.fit(X, y)
-    
-    # Save Model
-    model_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models", "emotion_classifier.pkl")
-    print(f"Saving model to {model_path}...")
-    
+TEST_PHRASES = [
+    "I am so happy this works!",
+    "This code is garbage and I hate it.",
+    "I have no idea what is going on.",
+    "That was hilarious lol"
+]
+
+# Embeds each GoEmotions split once into the on-disk cache (see
+# dataset_embeddings.py), then trains from the cached matrices:
+#   softmax  multinomial LogisticRegression on each example's first label
+#   ovr      multi-label OneVsRestClassifier, one LogisticRegression per label
+# and reports both on the evaluation split. --export picks the model written
+# to models/emotion_classifier.{pkl,npz}.
+#
+# Offline: pass --dataset a local copy, either a save_to_disk() directory
+# (--save-local writes one) or a directory holding <split>*.parquet/.jsonl
+# files such as a snapshot of the hub repo.
+
+
+def load_splits(source, splits):
+    from datasets import load_dataset, load_from_disk
+
+    if not os.path.isdir(source):
+        return {split: load_dataset(source, "simplified", split=split) for split in splits}
+    if os.path.exists(os.path.join(source, "dataset_dict.json")):
+        data = load_from_disk(source)
+        return {split: data[split] for split in splits}
+    loaded = {}
+    for split in splits:
+        for ext, fmt in (("parquet", "parquet"), ("jsonl", "json"), ("json", "json")):
+            files = sorted(glob.glob(os.path.join(source, "**", f"{split}*.{ext}"), recursive=True))
+            if files:
+                loaded[split] = load_dataset(fmt, data_files=files, split="train")
+                break
+        else:
+            raise FileNotFoundError(f"No {split} split (parquet or jsonl) under {source}")
+    return loaded
+
+
+def multi_hot(label_lists):
+    Y = np.zeros((len(label_lists), len(LABELS)), dtype=np.uint8)
+    for i, labels in enumerate(label_lists):
+        Y[i, labels] = 1
+    return Y
+
+
+def embed_split(name, dataset, args):
+    cache = DatasetEmbeddings(
+        dataset["text"], backend=args.backend, model_name=args.model, name=name,
+        cache_dir=args.cache_dir, chunk_size=args.chunk_size, onnx_dir=args.onnx_dir
+    )
+    cache.encode(batch_size=args.batch_size, workers=args.workers)
+    return cache, cache.matrix(), list(dataset["labels"])
+
+
+def train_softmax(X, labels, C):
+    # Examples without a label are dropped; the first label stands in for the rest
+    keep = np.array([len(l) > 0 for l in labels])
+    y = np.array([l[0] for l in labels if l])
+    clf = LogisticRegression(max_iter=1000, C=C)
+    clf.fit(X[keep], y)
+    return clf
+
+
+def train_ovr(X, labels, C):
+    clf = OneVsRestClassifier(LogisticRegression(max_iter=1000, C=C), n_jobs=-1)
+    clf.fit(X, multi_hot(labels))
+    return clf
+
+
+def evaluate(clf, X, labels):
+    exported = LinearClassifier.from_sklearn(clf, LABELS)
+    # Columns follow the classes seen in training; spread them over all labels
+    probs = np.zeros((len(X), len(LABELS)), dtype=np.float32)
+    probs[:, [LABELS.index(l) for l in exported.labels]] = exported.predict_proba(X)
+    Y = multi_hot(labels)
+    top = probs.argmax(axis=1)
+    has_label = Y.any(axis=1)
+    scores = {
+        # The runtime only uses the top label: is it one of the gold labels?
+        "top1_in_gold": float(Y[np.arange(len(Y)), top][has_label].mean()),
+        "first_label_acc": float(np.mean([top[i] == l[0] for i, l in enumerate(labels) if l])),
+    }
+    if isinstance(clf, OneVsRestClassifier):
+        best = max(
+            ((t, f1_score(Y, probs >= t, average="micro", zero_division=0)) for t in np.arange(0.1, 0.75, 0.05)),
+            key=lambda item: item[1]
+        )
+        scores["micro_f1@0.5"] = float(f1_score(Y, probs >= 0.5, average="micro", zero_division=0))
+        scores["macro_f1@0.5"] = float(f1_score(Y, probs >= 0.5, average="macro", zero_division=0))
+        scores["best_threshold"] = round(float(best[0]), 2)
+        scores["micro_f1@best"] = float(best[1])
+    return scores
+
+
+def train(args):
+    splits = load_splits(args.dataset, [args.train_split, args.eval_split])
+    train_data = splits[args.train_split]
+    if args.limit:
+        train_data = train_data.select(range(min(args.limit, len(train_data))))
+    print(f"Loaded {len(train_data)} {args.train_split} / {len(splits[args.eval_split])} {args.eval_split} examples.")
+
+    start = time.perf_counter()
+    cache, X, labels = embed_split(f"go_emotions-{args.train_split}", train_data, args)
+    _, X_eval, labels_eval = embed_split(f"go_emotions-{args.eval_split}", splits[args.eval_split], args)
+    multi = sum(len(l) > 1 for l in labels)
+    print(f"Embeddings ready in {time.perf_counter() - start:.1f}s ({len(X)} x {X.shape[1]}, {multi} multi-label examples)")
+
+    trainers = {"softmax": train_softmax, "ovr": train_ovr}
+    models = {}
+    for name in args.experiments.split(","):
+        start = time.perf_counter()
+        models[name] = trainers[name](X, labels, args.C)
+        elapsed = time.perf_counter() - start
+        scores = evaluate(models[name], X_eval, labels_eval)
+        print(f"[{name}] trained in {elapsed:.1f}s  " + "  ".join(f"{k} {v:.4f}" for k, v in scores.items()))
+
+    if args.export == "none":
+        return
+    clf = models[args.export]
+    model_path = os.path.join(MODELS_DIR, "emotion_classifier.pkl")
+    print(f"Saving {args.export} model to {model_path}...")
     joblib.dump({
         "model": clf,
         "labels": LABELS
     }, model_path)
-    
-    print("Done! Model saved.")
-    
-    # Test on a few examples
-    test_phrases = [
-        "I am so happy this works!",
-        "This code is garbage and I hate it.",
-        "I have no idea what is going on.",
-        "That was hilarious lol"
-    ]
-    
+
+    # Dependency-free artifact used by the backend at runtime
+    npz_path = os.path.splitext(model_path)[0] + ".npz"
+    exported = LinearClassifier.from_sklearn(clf, LABELS)
+    exported.save(npz_path)
+    print(f"Exported NumPy classifier to {npz_path}")
+
     print("\n--- Test Predictions ---")
-    for phrase in test_phrases:
-        emb, _ = embedder.encode(phrase)
-        # Reshape for single sample
-        emb = np.array(emb).reshape(1, -1)
-        pred_idx = clf.predict(emb)[0]
-        pred_label = LABELS[pred_idx]
-        print(f"'{phrase}' -> {pred_label}")
+    probs = exported.predict_proba(np.asarray(cache.model.encode(TEST_PHRASES), dtype=np.float32))
+    for phrase, row in zip(TEST_PHRASES, probs):
+        print(f"'{phrase}' -> {exported.labels[row.argmax()]} ({row.max():.2f})")
+
+
+def save_local(source, path):
+    from datasets import load_dataset
+
+    print(f"Downloading {source} to {path}...")
+    load_dataset(source, "simplified").save_to_disk(path)
+    print(f"Done. Train offline with --dataset {path}")
+
 
 if __name__ == "__main__":
-    train()
+    parser = argparse.ArgumentParser(description="Train the emotion classifier from cached GoEmotions embeddings")
+    parser.add_argument("--dataset", default="go_emotions", help="Hub dataset name or local copy directory")
+    parser.add_argument("--save-local", default=None, help="Download --dataset to this directory and exit")
+    parser.add_argument("--train-split", default="train")
+    parser.add_argument("--eval-split", default="validation")
+    parser.add_argument("--limit", type=int, default=0, help="Use only the first N training examples")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx", "hash"])
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--onnx-dir", default=None)
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--chunk-size", type=int, default=4096, help="Rows per resumable unit")
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1), help="Encoding processes")
+    parser.add_argument("--experiments", default="softmax,ovr")
+    parser.add_argument("--C", type=float, default=1.0)
+    parser.add_argument("--export", default="softmax", choices=["softmax", "ovr", "none"])
+    args = parser.parse_args()
+
+    if args.save_local:
+        save_local(args.dataset, args.save_local)
+        sys.exit(0)
+    if args.export != "none" and args.export not in args.experiments.split(","):
+        parser.error(f"--export {args.export} is not in --experiments")
+    train(args)
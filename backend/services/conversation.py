@@ -0,0 +1,83 @@
+import asyncio
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.cache import TTLCache
+
+
+class Session:
+    def __init__(self, window: int):
+        self.vectors = deque(maxlen=window)
+        self.lock = asyncio.Lock()
+        self.messages = 0
+
+
+# Per-channel conversation context for /api/context/analyze requests that
+# carry a session_id. Each session keeps the embeddings of its last `window`
+# messages; a request carries only the messages posted since the previous one
+# (plus the unsent draft, which is embedded but not stored), so typing costs
+# one embedding instead of re-encoding the history. The context vector is the
+# recency-weighted mean of the window: the newest message has weight 1, the
+# one before `decay`, then decay^2 and so on. Idle sessions expire after `ttl`
+# seconds and the least recently used ones are dropped beyond `max_sessions`.
+class ConversationContext:
+    def __init__(self, encode_many: Callable[[List[str]], Awaitable], window: int = 10, decay: float = 0.7,
+                 max_sessions: int = 1000, ttl: float = 1800):
+        self.encode_many = encode_many
+        self.window = window
+        self.decay = decay
+        self.sessions = TTLCache(capacity=max_sessions, ttl=ttl)
+        self.encoded = 0
+        self.updates = 0
+
+    async def update(self, session_id: str, messages: List[str], draft: Optional[str] = None,
+                     reset: bool = False) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+        # Concurrent requests for a new channel must share one Session (and
+        # its lock), so it is stored before anything awaits
+        if reset:
+            session = Session(self.window)
+            self.sessions.set(session_id, session)
+        else:
+            session = self.sessions.get_or_set(session_id, Session(self.window))
+        async with session.lock:
+            messages = [m for m in messages if m and m.strip()]
+            draft = draft if draft and draft.strip() else None
+            texts = messages + ([draft] if draft else [])
+            vectors = []
+            if texts:
+                vectors, _ = await self.encode_many(texts)
+            for vector in vectors[:len(messages)]:
+                session.vectors.append(np.asarray(vector, dtype=np.float32))
+            session.messages += len(messages)
+            self.encoded += len(texts)
+            self.updates += 1
+
+            window = list(session.vectors)
+            if draft:
+                window.append(np.asarray(vectors[-1], dtype=np.float32))
+            info = {"messages": len(session.vectors), "total_messages": session.messages, "encoded": len(texts)}
+            if not window:
+                return None, info
+            return self.pool(window), info
+
+    def pool(self, vectors: List[np.ndarray]) -> np.ndarray:
+        # Oldest first; weights decay with distance from the newest
+        weights = self.decay ** np.arange(len(vectors) - 1, -1, -1, dtype=np.float32)
+        pooled = weights @ np.stack(vectors)
+        norm = np.linalg.norm(pooled)
+        return pooled / norm if norm else pooled
+
+    def drop(self, session_id: str) -> bool:
+        return self.sessions.pop(session_id) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.sessions.stats(),
+            "window": self.window,
+            "decay": self.decay,
+            "updates": self.updates,
+            "encoded": self.encoded,
+            "encoded_per_update": self.encoded / self.updates if self.updates else 0.0
+        }
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Favorites persisted in SQLite (WAL mode), one row per favorite, so each add or
+# delete is an O(1) write instead of rewriting the whole list. Writes from all
+# requests go through a single writer thread that commits everything queued at
+# that moment in one transaction (group commit); callers resume once their
+# write is durable. synchronous=FULL fsyncs the WAL on every commit, so an
+# acknowledged write survives power loss; group commit keeps that to one fsync
+# per batch. Reads are served from an in-memory copy in insertion order.
+class FavoritesStore:
+    def __init__(self, path: str = "data/favorites.db", legacy_json: Optional[str] = None):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS favorites ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT UNIQUE NOT NULL, data TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        if legacy_json:
+            self._migrate(legacy_json)
+
+        self.items: "OrderedDict[str, Dict[str, Any]]" = OrderedDict(
+            (row[0], json.loads(row[1]))
+            for row in self.conn.execute("SELECT id, data FROM favorites ORDER BY seq")
+        )
+
+        self.commits = 0
+        self.writes = 0
+        self.queue: "queue.Queue" = queue.Queue()
+        self.writer = threading.Thread(target=self._write_loop, name="favorites-writer", daemon=True)
+        self.writer.start()
+
+    def _migrate(self, legacy_json: str):
+        # One-time import of the old whole-file favorites.json; the file is left in place
+        done = self.conn.execute("SELECT value FROM meta WHERE key = 'migrated_json'").fetchone()
+        if done or not os.path.exists(legacy_json):
+            return
+        with open(legacy_json, "r") as f:
+            legacy = json.load(f)
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO favorites (id, data) VALUES (?, ?)",
+                [(gif_id, json.dumps(data)) for gif_id, data in legacy.items()]
+            )
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('migrated_json', ?)", (legacy_json,))
+        print(f"Migrated {len(legacy)} favorites from {legacy_json}.")
+
+    def __contains__(self, gif_id: str) -> bool:
+        return gif_id in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def page(self, offset: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        stop = None if limit is None else offset + limit
+        return list(islice(self.items.values(), offset, stop))
+
+    async def add(self, favorite: Dict[str, Any]) -> bool:
+        gif_id = favorite["id"]
+        if gif_id in self.items:
+            return False
+        self.items[gif_id] = favorite
+        try:
+            await self._submit(("add", gif_id, json.dumps(favorite)))
+        except Exception:
+            self.items.pop(gif_id, None)
+            raise
+        return True
+
+    async def remove(self, gif_id: str) -> bool:
+        favorite = self.items.pop(gif_id, None)
+        if favorite is None:
+            return False
+        try:
+            await self._submit(("remove", gif_id, None))
+        except Exception:
+            self.items[gif_id] = favorite
+            raise
+        return True
+
+    async def _submit(self, op: Tuple[str, str, Optional[str]]):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.queue.put((op, loop, future))
+        await future
+
+    def _write_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            # Everything queued while the previous commit ran goes into this one
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(item is None for item in batch)
+            batch = [item for item in batch if item is not None]
+            error = None
+            if batch:
+                try:
+                    with self.conn:
+                        self.conn.execute("BEGIN")
+                        for (kind, gif_id, data), _, _ in batch:
+                            if kind == "add":
+                                self.conn.execute("INSERT OR REPLACE INTO favorites (id, data) VALUES (?, ?)", (gif_id, data))
+                            else:
+                                self.conn.execute("DELETE FROM favorites WHERE id = ?", (gif_id,))
+                    self.commits += 1
+                    self.writes += len(batch)
+                except Exception as e:
+                    print(f"Failed to save favorites: {e}")
+                    error = e
+
+            for _, loop, future in batch:
+                loop.call_soon_threadsafe(_resolve, future, error)
+            if stop:
+                return
+
+    def close(self):
+        self.queue.put(None)
+        self.writer.join()
+        self.conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "count": len(self.items),
+            "writes": self.writes,
+            "commits": self.commits,
+            "pending": self.queue.qsize()
+        }
+
+
+def _resolve(future: asyncio.Future, error: Optional[Exception]):
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
@@ -0,0 +1,307 @@
+import asyncio
+import hashlib
+import json
+import struct
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from utils.instrumentation import metrics
+from utils.log import log
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS
+
+# Image generation takes tens of seconds and can queue for minutes
+GENERATION_BUCKETS_MS = LATENCY_BUCKETS_MS + [20000, 30000, 60000, 120000, 300000, 600000]
+
+
+# Vertex AI image generation. One genai client is created on first use and
+# shared by every job (it is safe to call from several pool threads).
+class VertexImageGenerator:
+    name = "vertex"
+
+    def __init__(self, api_key: str, model_name: str = "gemini-3-pro-image-preview", aspect_ratio: str = "1:1",
+                 image_size: str = "1K", temperature: float = 1.0, top_p: float = 0.95):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.aspect_ratio = aspect_ratio
+        self.image_size = image_size
+        self.temperature = temperature
+        self.top_p = top_p
+        self.client = None
+        self.client_lock = threading.Lock()
+
+    def config(self) -> Dict[str, Any]:
+        # Everything that changes the output; part of the result cache key
+        return {
+            "backend": self.name,
+            "model": self.model_name,
+            "aspect_ratio": self.aspect_ratio,
+            "image_size": self.image_size,
+            "temperature": self.temperature,
+            "top_p": self.top_p
+        }
+
+    def _client(self):
+        with self.client_lock:
+            if self.client is None:
+                from google import genai
+                log.info("[GENERATION] Initializing Google GenAI client...")
+                self.client = genai.Client(vertexai=True, api_key=self.api_key)
+            return self.client
+
+    def generate(self, prompt: str) -> bytes:
+        # Blocking Vertex call; runs on the generation pool
+        from google.genai import types
+
+        contents = [types.Content(role="user", parts=[types.Part(text=prompt)])]
+        generate_content_config = types.GenerateContentConfig(
+            temperature=self.temperature,
+            top_p=self.top_p,
+            max_output_tokens=32768,
+            response_modalities=["IMAGE"],  # Only image, no text
+            safety_settings=[
+                types.SafetySetting(category="HARM_CATEGORY_HATE_SPEECH", threshold="OFF"),
+                types.SafetySetting(category="HARM_CATEGORY_DANGEROUS_CONTENT", threshold="OFF"),
+                types.SafetySetting(category="HARM_CATEGORY_SEXUALLY_EXPLICIT", threshold="OFF"),
+                types.SafetySetting(category="HARM_CATEGORY_HARASSMENT", threshold="OFF")
+            ],
+            image_config=types.ImageConfig(
+                aspect_ratio=self.aspect_ratio,
+                image_size=self.image_size,
+                output_mime_type="image/png"
+            )
+        )
+
+        log.info("[GENERATION] Sending request to Vertex AI (%s)...", self.model_name)
+        response = self._client().models.generate_content(
+            model=self.model_name,
+            contents=contents,
+            config=generate_content_config
+        )
+
+        if not response.candidates or not response.candidates[0].content.parts:
+            raise RuntimeError("No image generated in response")
+        for part in response.candidates[0].content.parts:
+            if getattr(part, "inline_data", None):
+                image_bytes = part.inline_data.data
+                log.info("[GENERATION] Image received: %d bytes", len(image_bytes))
+                return image_bytes
+        raise RuntimeError("No image found in response parts")
+
+
+# Local stand-in for Vertex (GENERATION_BACKEND=fake): sleeps `delay` seconds
+# and returns a small solid-color PNG derived from the prompt.
+class FakeImageGenerator:
+    name = "fake"
+
+    def __init__(self, delay: float = 1.0, size: int = 64):
+        self.delay = delay
+        self.size = size
+        self.calls = 0
+
+    def config(self) -> Dict[str, Any]:
+        return {"backend": self.name, "size": self.size}
+
+    def generate(self, prompt: str) -> bytes:
+        self.calls += 1
+        time.sleep(self.delay)
+        return solid_png(hashlib.sha256(prompt.encode()).digest()[:3], self.size)
+
+
+def solid_png(rgb: bytes, size: int) -> bytes:
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+    row = b"\x00" + rgb * size
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", size, size, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(row * size))
+        + chunk(b"IEND", b"")
+    )
+
+
+class Job:
+    def __init__(self, key: str, prompt: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.prompt = prompt
+        self.status = "queued"
+        self.cached = False
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Replaced on every status change; waiters hold the old one
+        self.changed = asyncio.Event()
+
+    def set_status(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        if status == "running":
+            self.started = time.time()
+        elif status in ("done", "error"):
+            self.finished = time.time()
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "prompt": self.prompt,
+            "key": self.key,
+            "cached": self.cached,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished
+        }
+
+
+# Image generation as background jobs. submit() returns a Job at once; `workers`
+# tasks take jobs off a bounded queue and run the generator on the generation
+# pool. Results go to the media store once per key, sha256 of the prompt and
+# the generator config, so a repeated prompt is answered from disk without
+# queueing and concurrent identical prompts share one job. Finished jobs are
+# kept for `job_ttl` seconds (at most `max_jobs`).
+class GenerationQueue:
+    def __init__(self, generator, media, pool=None, workers: int = 2,
+                 max_queued: int = 32, max_jobs: int = 1000, job_ttl: float = 3600):
+        self.generator = generator
+        self.media = media
+        self.pool = pool
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.job_ttl = job_ttl
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queued)
+        self.jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self.inflight: Dict[str, Job] = {}
+        self.tasks = []
+
+        self.submitted = 0
+        self.cache_hits = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.generate_ms = Histogram(GENERATION_BUCKETS_MS)
+        self.queue_ms = Histogram(GENERATION_BUCKETS_MS)
+
+    def start(self):
+        if not self.tasks:
+            self.tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    def key(self, prompt: str) -> str:
+        spec = json.dumps({"prompt": prompt, **self.generator.config()}, sort_keys=True)
+        return hashlib.sha256(spec.encode()).hexdigest()
+
+    def submit(self, prompt: str) -> Job:
+        # Raises asyncio.QueueFull when the queue is at capacity
+        self._expire()
+        self.submitted += 1
+        key = self.key(prompt)
+        job = self.inflight.get(key)
+        if job is not None:
+            self.deduplicated += 1
+            return job
+
+        job = Job(key, prompt)
+        if self.media.exists(key, "png"):
+            self.cache_hits += 1
+            job.cached = True
+            job.set_status("done")
+        else:
+            try:
+                self.queue.put_nowait(job)
+            except asyncio.QueueFull:
+                self.rejected += 1
+                raise
+            self.inflight[key] = job
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: Optional[float] = None) -> Job:
+        # Until the job finishes (or the timeout passes)
+        deadline = time.monotonic() + timeout if timeout else None
+        while job.status not in ("done", "error"):
+            remaining = deadline - time.monotonic() if deadline else None
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(job.changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return job
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self.inflight.pop(job.key, None)
+                self.queue.task_done()
+
+    async def _run(self, job: Job):
+        self.queue_ms.observe((time.time() - job.created) * 1000)
+        job.set_status("running")
+        started = time.perf_counter()
+        try:
+            if self.pool:
+                await self.pool.run(self._generate, job)
+            else:
+                await asyncio.to_thread(self._generate, job)
+        except Exception as e:
+            self.failed += 1
+            log.warning("[GENERATION] Job %s failed: %s", job.id, e)
+            job.set_status("error", str(e))
+            return
+        self.completed += 1
+        duration = (time.perf_counter() - started) * 1000
+        self.generate_ms.observe(duration)
+        metrics.observe("generate", duration, GENERATION_BUCKETS_MS)
+        job.set_status("done")
+
+    def _generate(self, job: Job):
+        self.media.put(self.generator.generate(job.prompt), "png", digest=job.key)
+
+    def _expire(self):
+        # Oldest first; queued and running jobs are never dropped
+        cutoff = time.time() - self.job_ttl
+        excess = len(self.jobs) - self.max_jobs + 1
+        for job in list(self.jobs.values()):
+            if job.finished is None:
+                continue
+            if excess <= 0 and job.finished >= cutoff:
+                break
+            del self.jobs[job.id]
+            excess -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.generator.name,
+            "workers": self.workers,
+            "queued": self.queue.qsize(),
+            "inflight": len(self.inflight),
+            "jobs": len(self.jobs),
+            "submitted": self.submitted,
+            "cache_hits": self.cache_hits,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queue_ms": self.queue_ms.snapshot(),
+            "generate_ms": self.generate_ms.snapshot()
+        }
@@ -0,0 +1,137 @@
+import time
+from typing import Any, Dict, List, Optional
+
+from services.lexical import LexicalIndex
+from services.vector_db import VectorDB, ScoredPoint, resolve_ids
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS
+
+LEXICAL_BUCKETS_MS = [0.05, 0.1, 0.2] + LATENCY_BUCKETS_MS
+
+
+# Dense + lexical retrieval over any VectorDB backend. Lazily indexed points
+# carry the embedding of the query that found them, so a search for a term
+# that only appears in a GIF title ("hackerman") rarely lands near them in
+# vector space. This wrapper keeps a BM25 index over each point's title and
+# originating query in step with upsert/delete/reset, and hybrid_search()
+# fuses the dense and lexical rankings with reciprocal rank fusion.
+#
+# Fused results are ordered by their RRF score (ScoredPoint.rrf); `score` stays
+# the cosine similarity to the query, so the similarity threshold means the
+# same with and without hybrid search. Lexical-only hits get their cosine from
+# the backend. Results the lexical index found carry their IDF coverage
+# (ScoredPoint.coverage), which the retrieval engine accepts on its own when
+# the point matched all of the query's terms. The lexical index holds every point's title and query in
+# memory, which is why HYBRID_SEARCH is opt-in.
+class HybridVectorDB(VectorDB):
+    def __init__(self, db: VectorDB, k1: float = 1.2, b: float = 0.75, rrf_k: int = 60, candidates: int = 20):
+        self.db = db
+        self.collection_name = db.collection_name
+        self.rrf_k = rrf_k
+        self.candidates = candidates
+        self.lexical = LexicalIndex(k1=k1, b=b)
+        self.lexical_ms = Histogram(LEXICAL_BUCKETS_MS)
+        self.searches = 0
+        self.lexical_hits = 0
+        self.lexical_only = 0
+
+        started = time.perf_counter()
+        for ids, payloads in db.scan():
+            self.lexical.add(ids, payloads)
+        stats = self.lexical.stats()
+        print(f"Lexical index built ({stats['documents']} points, {stats['terms']} terms) "
+              f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def upsert(self, vectors: List[List[float]], payloads: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        # Resolve here so both indexes agree on the ids
+        ids = resolve_ids(payloads, ids)
+        self.db.upsert(vectors, payloads, ids=ids)
+        self.lexical.add(ids, payloads)
+
+    def search(self, vector: List[float], limit: int = 10):
+        return self.db.search(vector, limit)
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 10):
+        return self.db.search_batch(vectors, limit)
+
+    def hybrid_search_batch(self, texts: List[str], vectors: List[List[float]], limit: int = 10):
+        depth = max(limit, self.candidates)
+        dense = self.db.search_batch(vectors, limit=depth)
+
+        fused = []
+        for text, hits in zip(texts, dense):
+            started = time.perf_counter()
+            lexical = self.lexical.search(text, depth)
+            self.lexical_ms.observe((time.perf_counter() - started) * 1000)
+            fused.append(self._fuse(hits, lexical, limit))
+
+        # Payloads of lexical-only hits, for the whole batch in one lookup
+        missing = sorted({pid for ranking in fused for pid, point, _, _ in ranking if point is None})
+        payloads = self.db.retrieve(missing) if missing else {}
+        results = []
+        for vector, ranking in zip(vectors, fused):
+            lexical_only = [pid for pid, point, _, _ in ranking if point is None and pid in payloads]
+            sims = self.db.similarity(vector, lexical_only) if lexical_only else {}
+            points = []
+            for pid, point, rrf, coverage in ranking:
+                if point is not None:
+                    points.append(ScoredPoint(str(point.id), float(point.score), point.payload, rrf, coverage))
+                elif pid in sims:
+                    points.append(ScoredPoint(pid, sims[pid], payloads[pid], rrf, coverage))
+            results.append(points)
+        return results
+
+    def _fuse(self, hits, lexical, limit: int):
+        # id -> [RRF score, dense point or None, lexical coverage or None]
+        ranked: Dict[str, list] = {}
+        for rank, point in enumerate(hits):
+            ranked[str(point.id)] = [1.0 / (self.rrf_k + rank + 1), point, None]
+        for rank, (pid, _, coverage) in enumerate(lexical):
+            entry = ranked.setdefault(pid, [0.0, None, None])
+            entry[0] += 1.0 / (self.rrf_k + rank + 1)
+            entry[2] = coverage
+
+        self.searches += 1
+        if lexical:
+            self.lexical_hits += 1
+        order = sorted(ranked.items(), key=lambda item: -item[1][0])[:limit]
+        self.lexical_only += sum(1 for _, (_, point, _) in order if point is None)
+        return [(pid, point, rrf, coverage) for pid, (rrf, point, coverage) in order]
+
+    def count(self) -> int:
+        return self.db.count()
+
+    def point_ids(self) -> List[str]:
+        return self.db.point_ids()
+
+    def retrieve(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return self.db.retrieve(ids)
+
+    def similarity(self, vector: List[float], ids: List[str]) -> Dict[str, float]:
+        return self.db.similarity(vector, ids)
+
+    def scan(self, batch_size: int = 10000):
+        return self.db.scan(batch_size)
+
+    def delete(self, ids: List[str]) -> int:
+        deleted = self.db.delete(ids)
+        self.lexical.remove(ids)
+        return deleted
+
+    def compact(self):
+        self.db.compact()
+
+    def reset(self):
+        self.db.reset()
+        self.lexical.clear()
+
+    def close(self):
+        self.db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.lexical.stats(),
+            "searches": self.searches,
+            "with_lexical_matches": self.lexical_hits,
+            "lexical_only_results": self.lexical_only,
+            "lexical_ms": self.lexical_ms.snapshot()
+        }
@@ -0,0 +1,121 @@
+import asyncio
+from collections import OrderedDict
+from typing import Any, Dict, List
+
+from utils.ids import point_id
+from utils.instrumentation import metrics
+from utils.log import log
+from utils.metrics import Histogram
+
+BATCH_SIZE_BUCKETS = [1, 8, 32, 64, 128, 256, 512, 1024]
+
+
+# Write-behind queue for lazy indexing. Requests hand their Tenor results to
+# submit() and return immediately; a background task merges everything pending
+# into one upsert when `batch_size` points are waiting, every `flush_interval`
+# seconds, and on shutdown. Points are keyed by their deterministic id, so the
+# same GIF submitted twice before a flush is written once. `on_write` is called
+# with the ids, vectors and payloads of every batch that was written.
+class IndexWriter:
+    def __init__(self, vector_db, pool=None, batch_size: int = 256, flush_interval: float = 1.0, max_pending: int = 10000,
+                 on_write=None):
+        self.vector_db = vector_db
+        self.pool = pool
+        self.on_write = on_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self.wakeup = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task = None
+        self.submitted = 0
+        self.merged = 0
+        self.dropped = 0
+        self.written = 0
+        self.flushes = 0
+        self.errors = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+    def submit(self, vectors: List[List[float]], payloads: List[Dict[str, Any]]):
+        for vector, payload in zip(vectors, payloads):
+            pid = point_id(payload["id"], payload.get("query", ""))
+            self.submitted += 1
+            if pid in self.pending:
+                self.merged += 1
+            elif len(self.pending) >= self.max_pending:
+                self.dropped += 1
+                continue
+            self.pending[pid] = (vector, payload)
+        if len(self.pending) >= self.batch_size:
+            self.wakeup.set()
+
+    async def reset(self, wipe):
+        # Drops queued writes and runs `wipe` (async) with no batch in flight, so
+        # an upsert that flush() had already taken can't land after the wipe
+        async with self.flush_lock:
+            self.pending.clear()
+            await wipe()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        async with self.flush_lock:
+            while self.pending:
+                batch = []
+                while self.pending and len(batch) < self.batch_size:
+                    batch.append(self.pending.popitem(last=False))
+                ids = [pid for pid, _ in batch]
+                vectors = [v for _, (v, _) in batch]
+                payloads = [p for _, (_, p) in batch]
+                try:
+                    with metrics.stage("upsert"):
+                        if self.pool:
+                            await self.pool.run(self.vector_db.upsert, vectors, payloads, ids=ids)
+                        else:
+                            self.vector_db.upsert(vectors, payloads, ids=ids)
+                except Exception as e:
+                    self.errors += 1
+                    log.warning("Index flush failed (%d points): %s", len(batch), e)
+                    # Put the batch back unless newer versions arrived meanwhile
+                    for pid, item in batch:
+                        self.pending.setdefault(pid, item)
+                    return
+                self.flushes += 1
+                self.written += len(batch)
+                self.batch_sizes.observe(len(batch))
+                if self.on_write:
+                    self.on_write(ids, vectors, payloads)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "dropped": self.dropped,
+            "written": self.written,
+            "flushes": self.flushes,
+            "errors": self.errors,
+            "batch_size": self.batch_sizes.snapshot()
+        }
@@ -0,0 +1,143 @@
+import math
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    # "Don't" and "dont" are the same term
+    return TOKEN_RE.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+def document_text(payload: Dict[str, Any]) -> str:
+    # The GIF title plus the query it was indexed under
+    return f"{payload.get('title') or ''} {payload.get('query') or ''}"
+
+
+# In-memory BM25 index over point payloads. Each point is a document; postings
+# are term -> {doc: term frequency} and are turned into numpy arrays the first
+# time a term is queried after it changed, so scoring a term is a few vector
+# ops however many points contain it. Doc numbers are recycled after removal.
+class LexicalIndex:
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.lock = threading.Lock()
+        self._reset()
+
+    def clear(self):
+        with self.lock:
+            self._reset()
+
+    def _reset(self):
+        self.docs: Dict[str, int] = {}
+        self.point_ids: List[Optional[str]] = []
+        self.doc_terms: List[Optional[Counter]] = []
+        self.lengths = np.zeros(1024, dtype=np.float32)
+        self.total_length = 0
+        self.free: List[int] = []
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def add(self, ids: List[str], payloads: List[Dict[str, Any]]):
+        with self.lock:
+            for pid, payload in zip(ids, payloads):
+                pid = str(pid)
+                self._remove(pid)
+                terms = Counter(tokenize(document_text(payload)))
+                if not terms:
+                    continue
+                doc = self.free.pop() if self.free else len(self.point_ids)
+                if doc == len(self.point_ids):
+                    self.point_ids.append(None)
+                    self.doc_terms.append(None)
+                    if doc >= len(self.lengths):
+                        self.lengths = np.concatenate([self.lengths, np.zeros_like(self.lengths)])
+                self.docs[pid] = doc
+                self.point_ids[doc] = pid
+                self.doc_terms[doc] = terms
+                length = sum(terms.values())
+                self.lengths[doc] = length
+                self.total_length += length
+                for term, tf in terms.items():
+                    self.postings.setdefault(term, {})[doc] = tf
+                    self.arrays.pop(term, None)
+
+    def remove(self, ids: List[str]):
+        with self.lock:
+            for pid in ids:
+                self._remove(str(pid))
+
+    def _remove(self, pid: str):
+        doc = self.docs.pop(pid, None)
+        if doc is None:
+            return
+        for term in self.doc_terms[doc]:
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+            self.arrays.pop(term, None)
+        self.total_length -= int(self.lengths[doc])
+        self.lengths[doc] = 0
+        self.point_ids[doc] = None
+        self.doc_terms[doc] = None
+        self.free.append(doc)
+
+    def _term_arrays(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        arrays = self.arrays.get(term)
+        if arrays is None:
+            postings = self.postings[term]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            )
+            self.arrays[term] = arrays
+        return arrays
+
+    def search(self, text: str, limit: int = 10) -> List[Tuple[str, float, float]]:
+        # (point id, BM25 score, coverage) best first. Coverage is the share of
+        # the query's IDF weight found in the document: 1.0 means every term
+        # matched, rare terms count for more than common ones.
+        terms = list(dict.fromkeys(tokenize(text)))
+        with self.lock:
+            n = len(self.docs)
+            if not n or not terms or limit <= 0:
+                return []
+            avgdl = self.total_length / n
+            size = len(self.point_ids)
+            scores = np.zeros(size, dtype=np.float32)
+            coverage = np.zeros(size, dtype=np.float32)
+            total_idf = 0.0
+            matched = []
+            for term in terms:
+                df = len(self.postings.get(term, ()))
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                total_idf += idf
+                if not df:
+                    continue
+                docs, tfs = self._term_arrays(term)
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[docs] / avgdl)
+                scores[docs] += idf * tfs * (self.k1 + 1) / (tfs + norm)
+                coverage[docs] += idf
+                matched.append(docs)
+            if not matched:
+                return []
+            candidates = np.unique(np.concatenate(matched)) if len(matched) > 1 else matched[0]
+            k = min(limit, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self.point_ids[doc], float(scores[doc]), float(coverage[doc] / total_idf)) for doc in top]
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "documents": len(self.docs),
+                "terms": len(self.postings),
+                "avg_length": self.total_length / len(self.docs) if self.docs else 0.0
+            }
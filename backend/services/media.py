@@ -0,0 +1,58 @@
+import hashlib
+import os
+import re
+import uuid
+from typing import Optional
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "mp4": "video/mp4",
+    "webm": "video/webm",
+}
+MEDIA_NAME_RE = re.compile(r"^([0-9a-f]{64})\.(" + "|".join(MEDIA_TYPES) + r")$")
+
+
+# Immutable binary artifacts on disk, one file per 64-hex-digit digest at
+# <root>/<digest[:2]>/<digest>.<ext>. The digest is the sha256 of the content
+# unless the caller derives it from what produced the content (generation
+# uses prompt + config). Either way a name never points at different bytes,
+# so the digest doubles as a strong ETag and clients may cache forever.
+class MediaStore:
+    def __init__(self, root: str = "data/media"):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, digest: str, ext: str) -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}.{ext}")
+
+    def exists(self, digest: str, ext: str) -> bool:
+        return os.path.exists(self.path(digest, ext))
+
+    def put(self, data: bytes, ext: str, digest: Optional[str] = None) -> str:
+        digest = digest or hashlib.sha256(data).hexdigest()
+        path = self.path(digest, ext)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename, so a crash never leaves a partial artifact behind
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        return digest
+
+    def resolve(self, name: str) -> Optional[tuple]:
+        # "<digest>.<ext>" -> (path, digest, media type), or None for unknown or malformed names
+        match = MEDIA_NAME_RE.match(name)
+        if not match:
+            return None
+        digest, ext = match.groups()
+        path = self.path(digest, ext)
+        if not os.path.exists(path):
+            return None
+        return path, digest, MEDIA_TYPES[ext]
+
+
+def media_url(digest: str, ext: str) -> str:
+    return f"/api/media/{digest}.{ext}"
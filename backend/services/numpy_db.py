@@ -0,0 +1,405 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+from typing import List, Dict, Any, Optional
+from services.vector_db import VectorDB, ScoredPoint, resolve_ids
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+INITIAL_CAPACITY = 1024
+# Rows handed to hnswlib per add_items call during a background build
+HNSW_BUILD_CHUNK = 10000
+
+
+# Embedded vector store. Vectors are kept pre-normalized in one contiguous
+# float32 matrix (a memory-mapped .npy on disk), so search is a single mat-vec
+# plus argpartition. Payloads live in a SQLite side table and are only decoded
+# for the rows that are returned. Once the collection reaches `hnsw_threshold`
+# points (and hnswlib is installed) an HNSW graph is built in the background,
+# and searches go through it once it is ready.
+#
+# Overwriting an id reuses its row, and a row only becomes visible once its
+# payload row is committed. Deleted rows are masked out of searches and left
+# as holes until compact() renumbers the live rows and rebuilds the matrix.
+class NumpyVectorDB(VectorDB):
+    def __init__(self, collection_name="gifs", memory=False, path="./vector_data", dim=384,
+                 hnsw_threshold=50000, hnsw_m=16, hnsw_ef_construction=200, hnsw_ef_search=64):
+        print(f"Initializing VectorDB (NumPy, Memory: {memory})...")
+        self.collection_name = collection_name
+        self.dim = dim
+        self.dir = None if memory else os.path.join(path, collection_name)
+        self.hnsw_threshold = hnsw_threshold
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.hnsw_ef_search = hnsw_ef_search
+        self.lock = threading.RLock()
+
+        if self.dir:
+            os.makedirs(self.dir, exist_ok=True)
+        self.conn = sqlite3.connect(
+            os.path.join(self.dir, "payloads.db") if self.dir else ":memory:",
+            check_same_thread=False,
+            isolation_level=None
+        )
+        if self.dir:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS points (row INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, payload TEXT NOT NULL)")
+
+        # ids[row] is None for deleted rows
+        self.rows: Dict[str, int] = dict(
+            (pid, row) for row, pid in self.conn.execute("SELECT row, id FROM points ORDER BY row")
+        )
+        self.size = max(self.rows.values()) + 1 if self.rows else 0
+        self.ids: List[Optional[str]] = [None] * self.size
+        for pid, row in self.rows.items():
+            self.ids[row] = pid
+
+        self.vectors = self._open_vectors(max(INITIAL_CAPACITY, self.size))
+        self.live = np.zeros(self.vectors.shape[0], dtype=bool)
+        self.live[list(self.rows.values())] = True
+        self.hnsw = None
+        self.hnsw_build: Optional[threading.Thread] = None
+        self.hnsw_dirty: Optional[set] = None
+        self.hnsw_generation = 0
+        self._load_hnsw()
+        print(f"VectorDB initialized ({len(self.rows)} points).")
+
+    # --- storage ---
+
+    def _vectors_file(self):
+        return os.path.join(self.dir, "vectors.npy")
+
+    def _open_vectors(self, capacity: int):
+        if not self.dir:
+            return np.zeros((capacity, self.dim), dtype=np.float32)
+        path = self._vectors_file()
+        if os.path.exists(path):
+            vectors = np.lib.format.open_memmap(path, mode="r+")
+            if vectors.shape[1] == self.dim and vectors.shape[0] >= self.size:
+                return vectors
+            print(f"Ignoring {path}: shape {vectors.shape} does not match the payload store")
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+
+    def _grow(self, needed: int):
+        capacity = self.vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2)
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:capacity] = self.live
+        self.live = live
+        if not self.dir:
+            grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+            return
+        # Copy into a new file and swap it in atomically
+        tmp = self._vectors_file() + ".tmp.npy"
+        grown = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float32, shape=(new_capacity, self.dim))
+        grown[:self.size] = self.vectors[:self.size]
+        grown.flush()
+        del grown
+        self.vectors = None
+        os.replace(tmp, self._vectors_file())
+        self.vectors = np.lib.format.open_memmap(self._vectors_file(), mode="r+")
+
+    # --- HNSW ---
+
+    def _hnsw_file(self):
+        return os.path.join(self.dir, "hnsw.bin") if self.dir else None
+
+    def _load_hnsw(self):
+        if hnswlib is None or len(self.rows) < self.hnsw_threshold:
+            return
+        path = self._hnsw_file()
+        if path and os.path.exists(path):
+            index = hnswlib.Index(space="ip", dim=self.dim)
+            try:
+                index.load_index(path, max_elements=max(self.size * 2, INITIAL_CAPACITY))
+                if index.get_current_count() == self.size:
+                    index.set_ef(self.hnsw_ef_search)
+                    self.hnsw = index
+                    return
+            except Exception as e:
+                print(f"Rebuilding HNSW index ({e})")
+        self._start_hnsw_build()
+
+    def _start_hnsw_build(self):
+        # Caller holds the lock. The graph is built on a background thread
+        # from the rows live right now; searches stay brute-force until it is
+        # swapped in. Rows written or deleted meanwhile are collected in
+        # hnsw_dirty and replayed at the swap.
+        if self.hnsw_build is not None:
+            return
+        rows = np.flatnonzero(self.live[:self.size])
+        self.hnsw_dirty = set()
+        self.hnsw_build = threading.Thread(
+            target=self._build_hnsw, args=(self.hnsw_generation, self.vectors, rows, self.size),
+            name="hnsw-build", daemon=True
+        )
+        self.hnsw_build.start()
+
+    def _build_hnsw(self, generation: int, vectors: np.ndarray, rows: np.ndarray, size: int):
+        # Reads `vectors` without the lock: an in-place write to one of `rows`
+        # during the build is in hnsw_dirty and gets re-added, and _grow()
+        # swaps in a new matrix rather than changing this one
+        print(f"Building HNSW index over {len(rows)} points in the background...")
+        start = time.perf_counter()
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(max_elements=max(size * 2, INITIAL_CAPACITY), M=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+        for i in range(0, len(rows), HNSW_BUILD_CHUNK):
+            chunk = rows[i:i + HNSW_BUILD_CHUNK]
+            index.add_items(vectors[chunk], chunk)
+        index.set_ef(self.hnsw_ef_search)
+
+        # Catch up on writes made during the build outside the lock, a batch
+        # at a time, so only the last few rows are replayed while holding it
+        replayed = 0
+        while True:
+            with self.lock:
+                if generation != self.hnsw_generation:
+                    # reset() or compact() renumbered the rows and started its own build
+                    return
+                final = len(self.hnsw_dirty) <= HNSW_BUILD_CHUNK
+                count = len(self.hnsw_dirty) if final else HNSW_BUILD_CHUNK
+                dirty = np.sort(np.fromiter((self.hnsw_dirty.pop() for _ in range(count)), dtype=np.int64, count=count))
+                replayed += count
+                if final:
+                    self._replay_hnsw(index, dirty, self.vectors[dirty], self.live[dirty], self.size)
+                    self.hnsw_dirty = None
+                    self.hnsw_build = None
+                    self.hnsw = index
+                    break
+                batch = (dirty, self.vectors[dirty], self.live[dirty], self.size)
+            # Rows changed from here on are back in hnsw_dirty; deleted rows
+            # are never reused before compact(), which starts a new generation
+            self._replay_hnsw(index, *batch)
+        print(f"HNSW index ready in {time.perf_counter() - start:.1f}s ({replayed} rows replayed).")
+
+    def _replay_hnsw(self, index, rows: np.ndarray, vectors: np.ndarray, live: np.ndarray, size: int):
+        self._resize_hnsw(index, size)
+        if live.any():
+            index.add_items(vectors[live], rows[live])
+        for row in rows[~live]:
+            try:
+                index.mark_deleted(int(row))
+            except RuntimeError:
+                # Added and deleted during the build: never in the graph
+                pass
+
+    def _resize_hnsw(self, index, size: int):
+        # 1.5x headroom: the graph costs ~1.7 KB per slot at 384 dims
+        if size > index.get_max_elements():
+            index.resize_index(size + size // 2)
+
+    def wait_for_index(self, timeout: Optional[float] = None) -> bool:
+        # True once searches go through the HNSW graph
+        build = self.hnsw_build
+        if build is not None:
+            build.join(timeout)
+        return self.hnsw is not None
+
+    def _new_hnsw_generation(self):
+        # Caller holds the lock; a build still running for the old rows is dropped
+        self.hnsw = None
+        self.hnsw_build = None
+        self.hnsw_dirty = None
+        self.hnsw_generation += 1
+
+    def _update_hnsw(self, rows: np.ndarray, vectors: np.ndarray):
+        if self.hnsw is None:
+            if self.hnsw_dirty is not None:
+                self.hnsw_dirty.update(rows.tolist())
+            elif hnswlib is not None and len(self.rows) >= self.hnsw_threshold:
+                self._start_hnsw_build()
+            return
+        self._resize_hnsw(self.hnsw, self.size)
+        # Re-adding an existing label replaces its vector
+        self.hnsw.add_items(vectors, rows)
+
+    # --- VectorDB interface ---
+
+    def upsert(self, vectors: List[List[float]], payloads: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        ids = resolve_ids(payloads, ids)
+        matrix = normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+        with self.lock:
+            # Later duplicates in the same batch win
+            assigned = {}
+            next_row = self.size
+            for pid in ids:
+                if pid not in self.rows and pid not in assigned:
+                    assigned[pid] = next_row
+                    next_row += 1
+            self._grow(next_row)
+
+            rows = np.array([self.rows.get(pid, assigned.get(pid)) for pid in ids], dtype=np.int64)
+            self.vectors[rows] = matrix
+            if self.dir:
+                self.vectors.flush()
+
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO points (row, id, payload) VALUES (?, ?, ?)",
+                    [(int(row), pid, json.dumps(p)) for row, pid, p in zip(rows, ids, payloads)]
+                )
+
+            for pid, row in sorted(assigned.items(), key=lambda item: item[1]):
+                self.rows[pid] = row
+                self.ids.append(pid)
+            self.size = next_row
+            self.live[rows] = True
+            self._update_hnsw(rows, matrix)
+
+    def search(self, vector: List[float], limit: int = 10):
+        return self.search_batch([vector], limit)[0]
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 10):
+        queries = normalize(np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim))
+        with self.lock:
+            if not self.rows or limit <= 0:
+                return [[] for _ in queries]
+            k = min(limit, len(self.rows))
+            if self.hnsw is not None:
+                labels, distances = self.hnsw.knn_query(queries, k=k)
+                hits = [(labels[i].astype(np.int64), 1.0 - distances[i]) for i in range(len(queries))]
+            else:
+                # One (queries, size) mat-mul for the whole batch
+                sims = queries @ self.vectors[:self.size].T
+                if len(self.rows) < self.size:
+                    sims[:, ~self.live[:self.size]] = -np.inf
+                hits = []
+                for row_sims in sims:
+                    rows = np.argpartition(-row_sims, k - 1)[:k]
+                    rows = rows[np.argsort(-row_sims[rows])]
+                    hits.append((rows, row_sims[rows]))
+            return self._points(hits)
+
+    def _points(self, hits):
+        # Payloads for every query in the batch come from a single SELECT
+        row_list = sorted({int(r) for rows, _ in hits for r in rows})
+        placeholders = ",".join("?" * len(row_list))
+        payloads = {
+            row: json.loads(payload)
+            for row, payload in self.conn.execute(f"SELECT row, payload FROM points WHERE row IN ({placeholders})", row_list)
+        }
+        return [
+            [ScoredPoint(self.ids[int(row)], float(score), payloads.get(int(row), {})) for row, score in zip(rows, scores)]
+            for rows, scores in hits
+        ]
+
+    def count(self) -> int:
+        return len(self.rows)
+
+    def point_ids(self) -> List[str]:
+        with self.lock:
+            return list(self.rows)
+
+    def retrieve(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        placeholders = ",".join("?" * len(ids))
+        with self.lock:
+            return {
+                pid: json.loads(payload)
+                for pid, payload in self.conn.execute(f"SELECT id, payload FROM points WHERE id IN ({placeholders})", list(ids))
+            }
+
+    def similarity(self, vector: List[float], ids: List[str]) -> Dict[str, float]:
+        query = normalize(np.asarray(vector, dtype=np.float32).reshape(1, self.dim))[0]
+        with self.lock:
+            found = [(pid, self.rows[pid]) for pid in ids if pid in self.rows]
+            if not found:
+                return {}
+            sims = self.vectors[[row for _, row in found]] @ query
+        return {pid: float(sim) for (pid, _), sim in zip(found, sims)}
+
+    def scan(self, batch_size: int = 10000):
+        last = -1
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT row, id, payload FROM points WHERE row > ? ORDER BY row LIMIT ?", (last, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [pid for _, pid, _ in rows], [json.loads(payload) for _, _, payload in rows]
+
+    def delete(self, ids: List[str]) -> int:
+        with self.lock:
+            rows = [self.rows.pop(pid) for pid in ids if pid in self.rows]
+            if not rows:
+                return 0
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany("DELETE FROM points WHERE row = ?", [(row,) for row in rows])
+            self.live[rows] = False
+            self.vectors[rows] = 0
+            for row in rows:
+                self.ids[row] = None
+                if self.hnsw is not None:
+                    self.hnsw.mark_deleted(row)
+            if self.hnsw_dirty is not None:
+                self.hnsw_dirty.update(rows)
+            return len(rows)
+
+    def compact(self):
+        # Close the holes left by deletes: live rows are moved down in order,
+        # so each target row is already free when it is written
+        with self.lock:
+            if len(self.rows) == self.size:
+                return
+            old_rows = np.flatnonzero(self.live[:self.size])
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.executemany(
+                    "UPDATE points SET row = ? WHERE row = ?",
+                    [(new, int(old)) for new, old in enumerate(old_rows) if new != old]
+                )
+            self.vectors[:len(old_rows)] = self.vectors[old_rows]
+            self.vectors[len(old_rows):self.size] = 0
+            if self.dir:
+                self.vectors.flush()
+            self.ids = [self.ids[row] for row in old_rows]
+            self.rows = {pid: row for row, pid in enumerate(self.ids)}
+            self.size = len(self.ids)
+            self.live[:] = False
+            self.live[:self.size] = True
+            self._new_hnsw_generation()
+            if hnswlib is not None and self.size >= self.hnsw_threshold:
+                self._start_hnsw_build()
+
+    def reset(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM points")
+            self.ids = []
+            self.rows = {}
+            self.size = 0
+            self._new_hnsw_generation()
+            self.live = np.zeros(INITIAL_CAPACITY, dtype=bool)
+            if self.dir:
+                self.vectors = None
+                for path in (self._vectors_file(), self._hnsw_file()):
+                    if os.path.exists(path):
+                        os.remove(path)
+            self.vectors = self._open_vectors(INITIAL_CAPACITY)
+
+    def close(self):
+        with self.lock:
+            if self.dir:
+                self.vectors.flush()
+                if self.hnsw is not None:
+                    self.hnsw.save_index(self._hnsw_file())
+            self.conn.close()
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
@@ -0,0 +1,184 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from models.embedding_cache import normalize_text
+from services.tenor_api import format_tenor_results
+from utils.log import log
+from utils.rate_limit import TokenBucket
+
+
+def warmup_queries(emotion_data: Dict[str, Any]) -> List[str]:
+    # Every suggestion chip plus trending_global, in file order, without repeats
+    queries = []
+    for emotion in emotion_data.get("emotions", {}).values():
+        queries.extend(emotion.get("suggestions", []))
+    queries.extend(emotion_data.get("trending_global", []))
+    seen = set()
+    unique = []
+    for query in queries:
+        key = normalize_text(query)
+        if key and key not in seen:
+            seen.add(key)
+            unique.append(query)
+    return unique
+
+
+# Pre-indexes known queries so their first search is a local lookup. A run
+# embeds all queries in batches, fetches each one from Tenor (at most
+# `concurrency` at a time and `rate` requests per second), and bulk-loads the
+# results through the index writer with the query's embedding, exactly like
+# lazy indexing does. `tenor` only needs an async search(query, limit), so
+# the CLI can pass a recorded fixture instead of the live API.
+class Prefetcher:
+    def __init__(self, tenor, encode_many: Callable[[List[str]], Awaitable], indexer, vector_db=None, pool=None,
+                 limit: int = 20, rate: float = 2.0, burst: int = 2, concurrency: int = 4,
+                 embed_batch_size: int = 64, on_fetched: Optional[Callable[[str], None]] = None):
+        self.tenor = tenor
+        self.encode_many = encode_many
+        self.indexer = indexer
+        self.vector_db = vector_db
+        self.pool = pool
+        self.limit = limit
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self.embed_batch_size = embed_batch_size
+        self.on_fetched = on_fetched
+        self.task = None
+        self.manual = None
+        self.running = False
+        self.runs = 0
+        self.fetched = 0
+        self.skipped = 0
+        self.empty = 0
+        self.indexed = 0
+        self.errors = 0
+        self.last_run: Dict[str, Any] = {}
+
+    def start(self, queries: Callable[[], List[str]], on_startup: bool = True, interval: float = 0):
+        if self.task is None:
+            self.task = asyncio.create_task(self._loop(queries, on_startup, interval))
+
+    def trigger(self, queries: List[str]) -> bool:
+        # One-off run in the background (admin endpoint)
+        if self.running:
+            return False
+        self.manual = asyncio.create_task(self.run(queries))
+        return True
+
+    async def stop(self):
+        for task in (self.task, self.manual):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self.task = self.manual = None
+
+    async def _loop(self, queries, on_startup: bool, interval: float):
+        # The first run skips queries that are already indexed; scheduled
+        # runs refresh everything
+        first = True
+        if not on_startup:
+            if not interval:
+                return
+            await asyncio.sleep(interval)
+            first = False
+        while True:
+            try:
+                await self.run(queries(), skip_existing=first)
+            except Exception as e:
+                self.errors += 1
+                log.warning("Prefetch run failed: %s", e)
+            if not interval:
+                return
+            first = False
+            await asyncio.sleep(interval)
+
+    async def run(self, queries: List[str], skip_existing: bool = False) -> Dict[str, Any]:
+        if self.running:
+            return {"status": "already running"}
+        self.running = True
+        started = time.perf_counter()
+        waited = self.bucket.waited
+        try:
+            embeddings = []
+            for i in range(0, len(queries), self.embed_batch_size):
+                batch, _ = await self.encode_many(queries[i:i + self.embed_batch_size])
+                embeddings.extend(batch)
+
+            pending = list(zip(queries, embeddings))
+            skipped = 0
+            if skip_existing and self.vector_db is not None:
+                pending = await self._missing(pending)
+                skipped = len(queries) - len(pending)
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            counts = await asyncio.gather(*(self._fetch(q, e, semaphore) for q, e in pending))
+            await self.indexer.flush()
+        finally:
+            self.running = False
+
+        indexed = sum(counts)
+        self.runs += 1
+        self.skipped += skipped
+        self.fetched += len(pending)
+        self.indexed += indexed
+        self.last_run = {
+            "at": time.time(),
+            "queries": len(queries),
+            "fetched": len(pending),
+            "skipped": skipped,
+            "indexed": indexed,
+            "rate_limited_s": round(self.bucket.waited - waited, 2),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+        log.info("Prefetch: %d queries fetched (%d already indexed), %d GIFs indexed in %.0fms",
+                 len(pending), skipped, indexed, self.last_run["duration_ms"])
+        return self.last_run
+
+    async def _missing(self, pending):
+        # A query counts as indexed once `limit` points were stored under it
+        vectors = [e for _, e in pending]
+        if self.pool:
+            hits = await self.pool.run(self.vector_db.search_batch, vectors, limit=self.limit)
+        else:
+            hits = await asyncio.to_thread(self.vector_db.search_batch, vectors, limit=self.limit)
+        missing = []
+        for (query, embedding), points in zip(pending, hits):
+            key = normalize_text(query)
+            stored = sum(1 for p in points if normalize_text(p.payload.get("query", "")) == key)
+            if stored < self.limit:
+                missing.append((query, embedding))
+        return missing
+
+    async def _fetch(self, query: str, embedding, semaphore: asyncio.Semaphore) -> int:
+        async with semaphore:
+            await self.bucket.acquire()
+            try:
+                results = format_tenor_results(await self.tenor.search(query, limit=self.limit))
+            except Exception as e:
+                self.errors += 1
+                log.warning("Prefetch failed for '%s': %s", query, e)
+                return 0
+        if not results:
+            self.empty += 1
+            return 0
+        self.indexer.submit([embedding] * len(results), [{**r, "query": query} for r in results])
+        if self.on_fetched:
+            self.on_fetched(query)
+        return len(results)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "fetched": self.fetched,
+            "skipped": self.skipped,
+            "empty": self.empty,
+            "indexed": self.indexed,
+            "errors": self.errors,
+            "rate_per_s": self.bucket.rate,
+            "last_run": self.last_run
+        }
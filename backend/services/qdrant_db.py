@@ -0,0 +1,256 @@
+import time
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from typing import List, Dict, Any, Optional
+from services.vector_db import VectorDB, resolve_ids
+
+PQ_COMPRESSION = {
+    "x4": models.CompressionRatio.X4,
+    "x8": models.CompressionRatio.X8,
+    "x16": models.CompressionRatio.X16,
+    "x32": models.CompressionRatio.X32,
+    "x64": models.CompressionRatio.X64,
+}
+
+
+def quantization_config(quantization: str = "scalar", quantile: float = 0.99, pq_compression: str = "x16",
+                        always_ram: bool = True):
+    # "scalar" keeps one int8 per dimension (4x smaller), "product" splits the
+    # vector into sub-vectors and stores one centroid code per chunk.
+    if quantization in (None, "", "none"):
+        return None
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=quantile,
+                always_ram=always_ram
+            )
+        )
+    if quantization == "product":
+        return models.ProductQuantization(
+            product=models.ProductQuantizationConfig(
+                compression=PQ_COMPRESSION[pq_compression],
+                always_ram=always_ram
+            )
+        )
+    raise ValueError(f"Unknown quantization: {quantization}")
+
+
+# Qdrant-backed store. With a server (`url`), the collection can keep
+# quantized vectors in RAM and the float32 originals plus payloads on disk.
+# Searches then run over the quantized vectors, oversample, and rescore the
+# candidates against the originals. Local mode (`path` or `memory`) has no
+# quantization or on-disk storage: it keeps everything in memory and searches
+# exactly, so those settings are dropped there with a warning.
+class QdrantVectorDB(VectorDB):
+    def __init__(self, collection_name="gifs", memory=False, path="./qdrant_data", dim=384, url=None,
+                 quantization="none", quantile=0.99, pq_compression="x16", always_ram=True,
+                 on_disk_vectors=False, on_disk_payload=False, rescore=True, oversampling=3.0):
+        print(f"Initializing VectorDB (Qdrant, Memory: {memory})...")
+        if memory:
+            self.client = QdrantClient(":memory:")
+        elif url:
+            self.client = QdrantClient(url=url)
+        else:
+            self.client = QdrantClient(path=path)
+            
+        self.collection_name = collection_name
+        self.dim = dim
+        self.local = memory or not url
+        if self.local:
+            ignored = [name for name, enabled in (
+                (f"QDRANT_QUANTIZATION={quantization}", quantization not in (None, "", "none")),
+                ("QDRANT_ON_DISK_VECTORS", on_disk_vectors),
+                ("QDRANT_ON_DISK_PAYLOAD", on_disk_payload)
+            ) if enabled]
+            if ignored:
+                print(f"WARNING: Qdrant local mode ignores {', '.join(ignored)}; set QDRANT_URL to use a Qdrant server.")
+            quantization, on_disk_vectors, on_disk_payload = "none", False, False
+        self.quantization = quantization_config(quantization, quantile, pq_compression, always_ram)
+        self.on_disk_vectors = on_disk_vectors and self.quantization is not None
+        self.on_disk_payload = on_disk_payload
+        self.search_params = None
+        if self.quantization is not None:
+            self.search_params = models.SearchParams(
+                quantization=models.QuantizationSearchParams(rescore=rescore, oversampling=oversampling)
+            )
+        self._ensure_collection()
+        print("VectorDB initialized.")
+
+    def _ensure_collection(self):
+        try:
+            info = self.client.get_collection(self.collection_name)
+            print(f"Collection '{self.collection_name}' exists.")
+        except Exception:
+            print(f"Creating collection '{self.collection_name}'...")
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(
+                    size=self.dim,  # MiniLM-L6-v2 dimension
+                    distance=models.Distance.COSINE,
+                    on_disk=self.on_disk_vectors
+                ),
+                quantization_config=self.quantization,
+                on_disk_payload=self.on_disk_payload
+            )
+            return
+        if not self.local:
+            self._apply_config(info)
+
+    def _apply_config(self, info):
+        # Bring an existing server collection in line with the configured
+        # storage; Qdrant re-quantizes and moves data in the background.
+        # Local collections are migrated with scripts/migrate_qdrant.py.
+        changes = {}
+        if info.config.quantization_config != self.quantization:
+            changes["quantization_config"] = self.quantization or models.Disabled.DISABLED
+        if bool(info.config.params.on_disk_payload) != self.on_disk_payload:
+            changes["collection_params"] = models.CollectionParamsDiff(on_disk_payload=self.on_disk_payload)
+        if bool(info.config.params.vectors.on_disk) != self.on_disk_vectors:
+            changes["vectors_config"] = {"": models.VectorParamsDiff(on_disk=self.on_disk_vectors)}
+        if changes:
+            print(f"Updating collection '{self.collection_name}': {', '.join(changes)}")
+            self.client.update_collection(self.collection_name, **changes)
+
+    def upsert(self, vectors: List[List[float]], payloads: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        points = [
+            models.PointStruct(
+                id=i,
+                vector=v,
+                payload=p
+            )
+            for i, v, p in zip(resolve_ids(payloads, ids), vectors, payloads)
+        ]
+        self.client.upsert(
+            collection_name=self.collection_name,
+            points=points
+        )
+
+    def search(self, vector: List[float], limit: int = 10):
+        return self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            limit=limit,
+            search_params=self.search_params
+        ).points
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 10):
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=[
+                models.QueryRequest(query=v, limit=limit, params=self.search_params, with_payload=True)
+                for v in vectors
+            ]
+        )
+        return [response.points for response in responses]
+
+    def count(self) -> int:
+        return self.client.count(self.collection_name).count
+
+    def point_ids(self) -> List[str]:
+        ids, offset = [], None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=10000,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            ids.extend(str(r.id) for r in records)
+            if offset is None:
+                return ids
+
+    def retrieve(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=True,
+            with_vectors=False
+        )
+        return {str(r.id): r.payload for r in records}
+
+    def similarity(self, vector: List[float], ids: List[str]) -> Dict[str, float]:
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=False,
+            with_vectors=True
+        )
+        if not records:
+            return {}
+        query = np.asarray(vector, dtype=np.float32)
+        stored = np.asarray([r.vector for r in records], dtype=np.float32)
+        sims = stored @ query / np.maximum(np.linalg.norm(stored, axis=1) * np.linalg.norm(query), 1e-12)
+        return {str(r.id): float(s) for r, s in zip(records, sims)}
+
+    def scan(self, batch_size: int = 10000):
+        offset = None
+        while True:
+            records, offset = self.client.scroll(
+                collection_name=self.collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            if records:
+                yield [str(r.id) for r in records], [r.payload for r in records]
+            if offset is None:
+                return
+
+    def delete(self, ids: List[str]) -> int:
+        # Only ids that exist are deleted and counted
+        if not ids:
+            return 0
+        records = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=ids,
+            with_payload=False,
+            with_vectors=False
+        )
+        existing = [record.id for record in records]
+        if existing:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=models.PointIdsList(points=existing)
+            )
+        return len(existing)
+
+    def compact(self, timeout: float = 300):
+        # The server vacuums segments once deleted_threshold of a segment is
+        # gone; submitting the vacuum thresholds makes it re-check now. The
+        # collection's own thresholds are put back once the optimizers are
+        # done (or after `timeout`). Local mode deletes rows directly and has
+        # nothing to compact.
+        if self.local:
+            return
+        previous = self.client.get_collection(self.collection_name).config.optimizer_config
+        try:
+            self.client.update_collection(
+                self.collection_name,
+                optimizers_config=models.OptimizersConfigDiff(deleted_threshold=0.2, vacuum_min_vector_number=1000)
+            )
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                if self.client.get_collection(self.collection_name).status != models.CollectionStatus.YELLOW:
+                    break
+                time.sleep(1)
+        finally:
+            self.client.update_collection(
+                self.collection_name,
+                optimizers_config=models.OptimizersConfigDiff(
+                    deleted_threshold=previous.deleted_threshold,
+                    vacuum_min_vector_number=previous.vacuum_min_vector_number
+                )
+            )
+
+    def reset(self):
+        # Re-initialize with a fresh collection (dropping old one)
+        self.client.delete_collection(self.collection_name)
+        self._ensure_collection()
+
+    def close(self):
+        self.client.close()
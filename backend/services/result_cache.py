@@ -0,0 +1,152 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from models.embedding_cache import normalize_text
+from utils.ids import point_id
+from utils.metrics import Histogram
+
+SIMILARITY_BUCKETS = [0.8, 0.85, 0.9, 0.95, 0.98, 0.99, 1.0]
+
+
+# Search results keyed by query embedding. A query whose embedding is within
+# `max_distance` (cosine) of a recently answered one reuses that answer, so
+# paraphrases skip the vector search and the Tenor fallback. Entries are LRU
+# in a fixed (capacity, dim) matrix, expire after `ttl` seconds, and are
+# dropped when newly indexed points could change them: a written point
+# within `threshold` of the cached query that isn't already in its results.
+# Entries that returned a point which has since been deleted are dropped too.
+class SemanticResultCache:
+    def __init__(self, dim: int, capacity: int = 1024, max_distance: float = 0.1, ttl: float = 300,
+                 threshold: float = 0.6):
+        self.dim = dim
+        self.capacity = capacity
+        self.min_similarity = 1.0 - max_distance
+        self.ttl = ttl
+        self.threshold = threshold
+        self.lock = threading.Lock()
+
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.used = np.zeros(capacity, dtype=bool)
+        # row -> entry, ordered from least to most recently used
+        self.entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self.free = list(range(capacity - 1, -1, -1))
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.hit_similarity = Histogram(SIMILARITY_BUCKETS)
+
+    def get(self, query_text: str, embedding, limit: int, policy: str = "") -> Optional[List[Dict[str, Any]]]:
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self.lock:
+            if self.entries:
+                sims = self.vectors @ query
+                sims[~self.used] = -1.0
+                # Best candidates first; the first usable one wins
+                for row in np.argsort(-sims)[:8]:
+                    if sims[row] < self.min_similarity:
+                        break
+                    entry = self.entries[int(row)]
+                    if entry["expires"] <= now:
+                        self._drop(int(row))
+                        continue
+                    if entry["policy"] != policy or entry["limit"] < limit:
+                        continue
+                    self.entries.move_to_end(int(row))
+                    self.hits += 1
+                    if entry["query"] != normalize_text(query_text):
+                        self.near_hits += 1
+                    # float32 rounding can put an exact repeat just above 1.0
+                    self.hit_similarity.observe(min(float(sims[row]), 1.0))
+                    return entry["results"][:limit]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, embedding, limit: int, results: List[Dict[str, Any]], policy: str = ""):
+        if not results or self.capacity <= 0:
+            return
+        vector = _unit(embedding)
+        with self.lock:
+            if self.free:
+                row = self.free.pop()
+            else:
+                row, _ = self.entries.popitem(last=False)
+                self.evictions += 1
+            self.vectors[row] = vector
+            self.used[row] = True
+            self.entries[row] = {
+                "query": normalize_text(query),
+                "policy": policy,
+                "limit": limit,
+                "results": list(results),
+                "ids": {r.get("id") for r in results},
+                # Vector store ids of the local results
+                "points": {point_id(r["id"], r["query"]) for r in results if "id" in r and "query" in r},
+                "expires": time.monotonic() + self.ttl
+            }
+
+    def invalidate(self, vectors: List[List[float]], payloads: List[Dict[str, Any]]):
+        # Called with each batch the index writer stores
+        if not self.entries or not vectors:
+            return
+        written = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        written /= np.maximum(np.linalg.norm(written, axis=1, keepdims=True), 1e-12)
+        with self.lock:
+            rows = np.array(list(self.entries), dtype=np.int64)
+            sims = written @ self.vectors[rows].T
+            for j, row in enumerate(rows):
+                close = np.flatnonzero(sims[:, j] >= self.threshold)
+                if any(payloads[i].get("id") not in self.entries[int(row)]["ids"] for i in close):
+                    self._drop(int(row))
+                    self.invalidations += 1
+
+    def forget(self, ids: List[str]):
+        # Called with the ids of points removed from the vector store
+        removed = set(ids)
+        if not self.entries or not removed:
+            return
+        with self.lock:
+            for row, entry in list(self.entries.items()):
+                if entry["points"] & removed:
+                    self._drop(row)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.invalidations += len(self.entries)
+            for row in list(self.entries):
+                self._drop(row)
+
+    def _drop(self, row: int):
+        del self.entries[row]
+        self.used[row] = False
+        self.free.append(row)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "capacity": self.capacity,
+                "min_similarity": self.min_similarity,
+                "hits": self.hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "hit_similarity": self.hit_similarity.snapshot()
+            }
+
+
+def _unit(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
@@ -0,0 +1,255 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+from utils.log import log
+from utils.metrics import Histogram
+
+
+# Keeps the vector collection bounded. Searches report the ids they returned
+# and the indexer reports the ids it wrote; both are buffered in memory and
+# written to a small SQLite table (created, last_hit, hits per point) by a
+# background task, which also evicts cold points in batches once the
+# collection is over `max_points` or points are older than `max_age`, and
+# periodically compacts the vector store.
+#
+# Cold means few hits for the time since the point was last used:
+# (hits + 1) / (days since last hit or insert + 1), lowest evicted first.
+# `on_evict` is called with the ids of every batch that was evicted.
+class RetentionManager:
+    def __init__(self, vector_db, pool=None, path: str = "data/retention.db", max_points: int = 0,
+                 max_age: float = 0, low_watermark: float = 0.9, batch_size: int = 500,
+                 interval: float = 60, compact_interval: float = 3600, on_evict=None):
+        self.vector_db = vector_db
+        self.pool = pool
+        self.on_evict = on_evict
+        self.max_points = max_points
+        self.max_age = max_age
+        self.low_watermark = low_watermark
+        self.batch_size = batch_size
+        self.interval = interval
+        self.compact_interval = compact_interval
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS points ("
+            "id TEXT PRIMARY KEY, created REAL NOT NULL, last_hit REAL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        self.db_lock = threading.Lock()
+
+        # Buffered since the last flush: id -> (hits, last_hit) and id -> insert time
+        self.pending_hits: Dict[str, List[float]] = {}
+        self.pending_inserts: Dict[str, float] = {}
+
+        self.run_lock = asyncio.Lock()
+        self.task = None
+        self.last_compaction = time.time()
+        self.evicted_size = 0
+        self.evicted_age = 0
+        self.dropped_stale = 0
+        self.eviction_runs = 0
+        self.compactions = 0
+        self.errors = 0
+        self.last_eviction_ms = 0.0
+        self.last_compaction_ms = 0.0
+        self.eviction_ms = Histogram()
+        self.compaction_ms = Histogram()
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self._call(self._flush, *self._take_pending())
+        self.conn.close()
+
+    def record_hits(self, ids: List[str]):
+        now = time.time()
+        for pid in ids:
+            entry = self.pending_hits.setdefault(str(pid), [0, now])
+            entry[0] += 1
+            entry[1] = now
+
+    def record_inserts(self, ids: List[str]):
+        now = time.time()
+        for pid in ids:
+            self.pending_inserts.setdefault(str(pid), now)
+
+    async def _call(self, fn, *args):
+        if self.pool:
+            return await self.pool.run(fn, *args)
+        return fn(*args)
+
+    async def _run(self):
+        # Track points indexed before retention existed, then settle into the loop
+        try:
+            await self._call(self._reconcile)
+        except Exception as e:
+            self.errors += 1
+            log.warning("Retention reconcile failed: %s", e)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.enforce()
+                if self.compact_interval and time.time() - self.last_compaction >= self.compact_interval:
+                    await self.compact()
+            except Exception as e:
+                self.errors += 1
+                log.warning("Retention run failed: %s", e)
+
+    def _reconcile(self):
+        if self.tracked() >= self.vector_db.count():
+            return
+        now = time.time()
+        ids = self.vector_db.point_ids()
+        with self.db_lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO points (id, created) VALUES (?, ?)",
+                [(pid, now) for pid in ids]
+            )
+        log.info("Retention: tracking %d existing points", len(ids))
+
+    def _take_pending(self):
+        # Called on the event loop, where record_* run, so no update is lost
+        hits, self.pending_hits = self.pending_hits, {}
+        inserts, self.pending_inserts = self.pending_inserts, {}
+        return hits, inserts
+
+    def _flush(self, hits: Dict[str, List[float]], inserts: Dict[str, float]):
+        if not hits and not inserts:
+            return
+        with self.db_lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO points (id, created) VALUES (?, ?)",
+                list(inserts.items())
+            )
+            self.conn.executemany(
+                "INSERT INTO points (id, created, last_hit, hits) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET hits = hits + excluded.hits, last_hit = excluded.last_hit",
+                [(pid, last_hit, last_hit, count) for pid, (count, last_hit) in hits.items()]
+            )
+
+    def _expired_batch(self) -> List[str]:
+        cutoff = time.time() - self.max_age
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id FROM points WHERE COALESCE(last_hit, created) < ? LIMIT ?",
+                (cutoff, self.batch_size)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _coldest_batch(self, count: int) -> List[str]:
+        with self.db_lock:
+            rows = self.conn.execute(
+                "SELECT id FROM points "
+                "ORDER BY (hits + 1) / ((? - COALESCE(last_hit, created)) / 86400.0 + 1) ASC LIMIT ?",
+                (time.time(), min(count, self.batch_size))
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def _evict(self, ids: List[str]) -> Tuple[int, int]:
+        # (ids untracked, points actually deleted). Tracked ids that are no
+        # longer in the store (deleted by a reset or another process) are
+        # dropped from tracking but not counted as evictions.
+        if not ids:
+            return 0, 0
+        deleted = self.vector_db.delete(ids)
+        with self.db_lock, self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM points WHERE id = ?", [(pid,) for pid in ids])
+        self.dropped_stale += len(ids) - deleted
+        if self.on_evict:
+            self.on_evict(ids)
+        return len(ids), deleted
+
+    async def enforce(self) -> Dict[str, int]:
+        # One batch per pool call so searches and index writes interleave with eviction
+        async with self.run_lock:
+            started = time.perf_counter()
+            await self._call(self._flush, *self._take_pending())
+            by_age = by_size = 0
+            if self.max_age:
+                while True:
+                    taken, evicted = await self._call(lambda: self._evict(self._expired_batch()))
+                    by_age += evicted
+                    if taken < self.batch_size:
+                        break
+            if self.max_points:
+                size = await self._call(self.vector_db.count)
+                if size > self.max_points:
+                    excess = size - int(self.max_points * self.low_watermark)
+                    # Stale ids free nothing, so keep going until the store
+                    # itself is down to the target or nothing is tracked
+                    while excess > 0:
+                        taken, evicted = await self._call(lambda n=excess: self._evict(self._coldest_batch(n)))
+                        if not taken:
+                            break
+                        by_size += evicted
+                        excess -= evicted
+
+            self.evicted_age += by_age
+            self.evicted_size += by_size
+            if by_age or by_size:
+                self.eviction_runs += 1
+                self.last_eviction_ms = round((time.perf_counter() - started) * 1000, 1)
+                self.eviction_ms.observe(self.last_eviction_ms)
+                log.info("Retention: evicted %d cold and %d expired points in %sms", by_size, by_age, self.last_eviction_ms)
+            return {"evicted_size": by_size, "evicted_age": by_age}
+
+    async def compact(self) -> float:
+        async with self.run_lock:
+            started = time.perf_counter()
+            await self._call(self.vector_db.compact)
+            await self._call(self._checkpoint)
+            self.last_compaction = time.time()
+            self.compactions += 1
+            self.last_compaction_ms = round((time.perf_counter() - started) * 1000, 1)
+            self.compaction_ms.observe(self.last_compaction_ms)
+            return self.last_compaction_ms
+
+    def _checkpoint(self):
+        with self.db_lock:
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def clear(self):
+        self.pending_hits.clear()
+        self.pending_inserts.clear()
+        with self.db_lock:
+            self.conn.execute("DELETE FROM points")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_points": self.max_points,
+            "max_age_s": self.max_age,
+            "pending_hits": len(self.pending_hits),
+            "pending_inserts": len(self.pending_inserts),
+            "evicted_size": self.evicted_size,
+            "evicted_age": self.evicted_age,
+            "dropped_stale": self.dropped_stale,
+            "eviction_runs": self.eviction_runs,
+            "last_eviction_ms": self.last_eviction_ms,
+            "compactions": self.compactions,
+            "last_compaction_ms": self.last_compaction_ms,
+            "errors": self.errors,
+            "eviction_ms": self.eviction_ms.snapshot(),
+            "compaction_ms": self.compaction_ms.snapshot()
+        }
+
+    def tracked(self) -> int:
+        with self.db_lock:
+            return self.conn.execute("SELECT COUNT(*) FROM points").fetchone()[0]
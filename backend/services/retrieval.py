@@ -0,0 +1,186 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+from models.embedding_cache import normalize_text
+from utils.cache import TTLCache
+from utils.log import log
+from utils.metrics import Histogram
+
+
+# How a search decides whether to call Tenor.
+#   upstream "never":   local results only, Tenor is never called
+#   upstream "always":  Tenor on every request, local hits first
+#   upstream "unfilled": Tenor whenever local hits don't fill the limit
+#   upstream "swr":     local results are served when they clear the
+#                       confidence bar; stale or under-filled queries are then
+#                       refreshed from Tenor in the background. Below the bar
+#                       Tenor is called in the request path.
+class RetrievalPolicy(NamedTuple):
+    name: str
+    upstream: str
+    min_hits: int = 1
+    min_top_score: float = 0.0
+    min_margin: float = 0.0
+
+
+class Decision(NamedTuple):
+    policy: RetrievalPolicy
+    query: str
+    results: List[Any]
+    upstream: bool
+    revalidate: bool
+
+
+def lexical_match(hit: Any, min_coverage: float) -> bool:
+    # Hybrid hit that matched at least `min_coverage` of the query's IDF weight
+    coverage = getattr(hit, "coverage", None)
+    return coverage is not None and coverage >= min_coverage
+
+
+# Applies retrieval policies to vector search results and keeps per-policy
+# metrics. A hit is local when its cosine clears `threshold`, or when hybrid
+# search found it lexically with IDF coverage of at least `min_coverage`
+# (every query term, in practice): titles are never embedded, so an exact
+# title match can sit far from the query in vector space. Confidence is
+# measured on the local hits: their count, the top score, and the margin
+# between the top score and the best hit that missed (or the threshold itself
+# when none did). A lexical match scores its coverage there.
+class RetrievalEngine:
+    def __init__(self, policies: List[RetrievalPolicy], default: str, threshold: float = 0.6,
+                 revalidate_after: float = 3600, max_revalidations: int = 4, freshness_size: int = 10000,
+                 min_coverage: float = 0.99):
+        self.policies = {policy.name: policy for policy in policies}
+        if default not in self.policies:
+            raise ValueError(f"Unknown retrieval policy: {default}")
+        self.default = default
+        self.threshold = threshold
+        self.min_coverage = min_coverage
+        self.max_revalidations = max_revalidations
+        # Queries refreshed from Tenor recently; absent means stale
+        self.fresh = TTLCache(capacity=freshness_size, ttl=revalidate_after)
+        self.revalidating: Dict[str, asyncio.Task] = {}
+        self.metrics = {name: PolicyMetrics() for name in self.policies}
+
+    def get(self, name: Optional[str] = None) -> RetrievalPolicy:
+        policy = self.policies.get(name or self.default)
+        if policy is None:
+            raise ValueError(f"Unknown retrieval policy: {name} (expected one of {', '.join(self.policies)})")
+        return policy
+
+    def decide(self, policy: RetrievalPolicy, query: str, hits: List[Any], limit: int) -> Decision:
+        results = [r for r in hits if self.accepts(r)]
+        metrics = self.metrics[policy.name]
+        metrics.requests += 1
+        metrics.lexical_hits += sum(1 for r in results if r.score < self.threshold)
+
+        upstream = revalidate = False
+        if policy.upstream == "always":
+            upstream = True
+        elif policy.upstream == "unfilled":
+            upstream = len(results) < limit
+        elif policy.upstream == "swr":
+            if self.confident(policy, hits, results):
+                revalidate = self.fresh.get(normalize_text(query)) is None
+            else:
+                upstream = True
+
+        if not upstream:
+            metrics.local += 1
+        return Decision(policy, query, results, upstream, revalidate)
+
+    def accepts(self, hit: Any) -> bool:
+        return hit.score >= self.threshold or lexical_match(hit, self.min_coverage)
+
+    def strength(self, hit: Any) -> float:
+        if lexical_match(hit, self.min_coverage):
+            return max(hit.score, hit.coverage)
+        return hit.score
+
+    def confident(self, policy: RetrievalPolicy, hits: List[Any], results: List[Any]) -> bool:
+        if len(results) < policy.min_hits or not results:
+            return False
+        # Hybrid results are in fusion order, not by score
+        top = max(self.strength(r) for r in results)
+        rejected = [r.score for r in hits if not self.accepts(r)]
+        margin = top - (max(rejected) if rejected else self.threshold)
+        return top >= policy.min_top_score and margin >= policy.min_margin
+
+    async def fetch(self, decision: Decision, fetch: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        # Upstream call in the request path; its latency is what the policy adds
+        metrics = self.metrics[decision.policy.name]
+        metrics.upstream += 1
+        started = time.perf_counter()
+        try:
+            return await fetch()
+        finally:
+            metrics.added_ms.observe((time.perf_counter() - started) * 1000)
+            self.fresh.set(normalize_text(decision.query), True)
+
+    def mark_fresh(self, query: str):
+        # Fetched from Tenor elsewhere (e.g. by the prefetcher)
+        self.fresh.set(normalize_text(query), True)
+
+    def revalidate(self, decision: Decision, fetch: Callable[[], Awaitable[List[Any]]]) -> bool:
+        # Background refresh, at most one per query and `max_revalidations` overall
+        key = normalize_text(decision.query)
+        metrics = self.metrics[decision.policy.name]
+        if key in self.revalidating:
+            return False
+        if len(self.revalidating) >= self.max_revalidations:
+            metrics.revalidations_skipped += 1
+            return False
+        metrics.revalidations += 1
+        self.fresh.set(key, True)
+        task = asyncio.create_task(self._revalidate(key, fetch))
+        self.revalidating[key] = task
+        task.add_done_callback(lambda _: self.revalidating.pop(key, None))
+        return True
+
+    async def _revalidate(self, key: str, fetch: Callable[[], Awaitable[List[Any]]]):
+        try:
+            await fetch()
+        except Exception as e:
+            # Let the next request try again
+            self.fresh.pop(key)
+            log.warning("Background refresh failed for '%s': %s", key, e)
+
+    async def stop(self):
+        for task in list(self.revalidating.values()):
+            task.cancel()
+        await asyncio.gather(*self.revalidating.values(), return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.default,
+            "threshold": self.threshold,
+            "min_coverage": self.min_coverage,
+            "revalidating": len(self.revalidating),
+            "policies": {name: m.snapshot() for name, m in self.metrics.items()}
+        }
+
+
+class PolicyMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.local = 0
+        self.lexical_hits = 0
+        self.upstream = 0
+        self.revalidations = 0
+        self.revalidations_skipped = 0
+        self.added_ms = Histogram()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "served_locally": self.local,
+            # Results accepted on lexical coverage alone (below the cosine threshold)
+            "lexical_hits": self.lexical_hits,
+            "upstream_calls": self.upstream,
+            "upstream_rate": self.upstream / self.requests if self.requests else 0.0,
+            # Foreground upstream time spread over every request of the policy
+            "added_ms_per_request": self.added_ms.sum / self.requests if self.requests else 0.0,
+            "background_refreshes": self.revalidations,
+            "background_refreshes_skipped": self.revalidations_skipped,
+            "added_latency_ms": self.added_ms.snapshot()
+        }
@@ -1,53 +1,122 @@
-import requests
+import asyncio
+import httpx
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from utils.cache import TTLCache
+from utils.log import log
+
+DEFAULT_MEDIA_FILTER = "gif,tinygif"
 
 class TenorAPI:
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        timeout: float = 5.0,
+        cache_ttl: float = 300,
+        cache_size: int = 1024,
+        max_connections: int = 20
+    ):
         self.api_key = os.getenv("TENOR_API_KEY")
         self.client_key = "contextual_discord_bot"
-        self.base_url = "https://tenor.googleapis.com/v2"
+        self.base_url = base_url or "https://tenor.googleapis.com/v2"
+
+        # One keep-alive pool for the life of the process
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(timeout),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections
+            )
+        )
+        self.cache = TTLCache(capacity=cache_size, ttl=cache_ttl)
+        # Requests currently on the wire, keyed like the cache (single-flight)
+        self.inflight: Dict[tuple, asyncio.Task] = {}
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.coalesced = 0
         
         if not self.api_key:
             print("WARNING: TENOR_API_KEY not found in environment variables.")
 
-    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
-        if not self.api_key:
-            return []
-            
-        params = {
+    async def search(self, query: str, limit: int = 20, media_filter: str = DEFAULT_MEDIA_FILTER) -> List[Dict[str, Any]]:
+        return await self._get("/search", {
             "q": query,
-            "key": self.api_key,
-            "client_key": self.client_key,
             "limit": limit,
-            "media_filter": "gif,tinygif"
-        }
-        
-        try:
-            response = requests.get(f"{self.base_url}/search", params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("results", [])
-        except Exception as e:
-            print(f"Tenor API error: {e}")
-            return []
+            "media_filter": media_filter
+        })
 
-    def get_trending(self, limit: int = 20) -> List[Dict[str, Any]]:
+    async def get_trending(self, limit: int = 20, media_filter: str = DEFAULT_MEDIA_FILTER) -> List[Dict[str, Any]]:
+        return await self._get("/featured", {
+            "limit": limit,
+            "media_filter": media_filter
+        })
+
+    async def _get(self, endpoint: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         if not self.api_key:
             return []
-            
-        params = {
-            "key": self.api_key,
-            "client_key": self.client_key,
-            "limit": limit,
-            "media_filter": "gif,tinygif"
-        }
-        
+
+        key = (endpoint, tuple(sorted(params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+
+        task = self.inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, endpoint, params))
+            self.inflight[key] = task
+            task.add_done_callback(lambda _: self.inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller disconnecting doesn't cancel the shared request
+        return list(await asyncio.shield(task))
+
+    async def _fetch(self, key: tuple, endpoint: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.upstream_calls += 1
         try:
-            response = requests.get(f"{self.base_url}/featured", params=params)
+            response = await self.client.get(endpoint, params={
+                **params,
+                "key": self.api_key,
+                "client_key": self.client_key
+            })
             response.raise_for_status()
             data = response.json()
-            return data.get("results", [])
+            results = data.get("results", [])
         except Exception as e:
-            print(f"Tenor API error: {e}")
+            # Errors are not cached; the next request retries upstream
+            self.upstream_errors += 1
+            log.warning("Tenor API error: %s", e)
             return []
+        self.cache.set(key, results)
+        return results
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "upstream_errors": self.upstream_errors,
+            "coalesced": self.coalesced,
+            "inflight": len(self.inflight),
+            "cache": self.cache.stats()
+        }
+
+
+def format_tenor_results(tenor_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Tenor v2 result -> the GIF dict returned to the plugin and stored as payload
+    formatted = []
+    for item in tenor_data:
+        media = item.get("media_formats", {})
+        formatted.append({
+            "id": item.get("id"),
+            "title": item.get("content_description", ""),
+            "url": item.get("itemurl", ""),
+            "src": media.get("webm", {}).get("url", ""),
+            "gif_src": media.get("gif", {}).get("url", ""),
+            "width": media.get("gif", {}).get("dims", [498, 373])[0],
+            "height": media.get("gif", {}).get("dims", [498, 373])[1],
+            "preview": media.get("tinygif", {}).get("url", "")
+        })
+    return formatted
@@ -1,51 +1,91 @@
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
 import uuid
-from typing import List, Dict, Any
+from typing import List, Dict, Any, NamedTuple, Optional
+from utils.ids import point_id
 
+
+class ScoredPoint(NamedTuple):
+    id: str
+    score: float
+    payload: Dict[str, Any]
+    # Reciprocal rank fusion score of a hybrid result; orders the results,
+    # while `score` stays the cosine similarity used for thresholds
+    rrf: Optional[float] = None
+    # Share of the query's IDF weight the point matched lexically (hybrid
+    # results found by the lexical index; None otherwise)
+    coverage: Optional[float] = None
+
+
+def resolve_ids(payloads: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> List[str]:
+    if ids is not None:
+        return ids
+    return [
+        point_id(p["id"], p.get("query", "")) if p.get("id") else str(uuid.uuid4())
+        for p in payloads
+    ]
+
+
+# Interface shared by the vector store backends. search() returns objects with
+# .id, .score (cosine similarity) and .payload, best match first.
+# hybrid_search() also takes the query text; backends without a lexical index
+# (everything but HybridVectorDB) ignore it and run the dense search.
 class VectorDB:
-    def __init__(self, collection_name="gifs", memory=False):
-        print(f"Initializing VectorDB (Memory: {memory})...")
-        if memory:
-            self.client = QdrantClient(":memory:")
-        else:
-            self.client = QdrantClient(path="./qdrant_data")
-            
-        self.collection_name = collection_name
-        self._ensure_collection()
-        print("VectorDB initialized.")
-
-    def _ensure_collection(self):
-        try:
-            self.client.get_collection(self.collection_name)
-            print(f"Collection '{self.collection_name}' exists.")
-        except Exception:
-            print(f"Creating collection '{self.collection_name}'...")
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=384,  # MiniLM-L6-v2 dimension
-                    distance=models.Distance.COSINE
-                )
-            )
-
-    def upsert(self, vectors: List[List[float]], payloads: List[Dict[str, Any]]):
-        points = [
-            models.PointStruct(
-                id=str(uuid.uuid4()),
-                vector=v,
-                payload=p
-            )
-            for v, p in zip(vectors, payloads)
-        ]
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points
-        )
+    collection_name = "gifs"
+
+    def upsert(self, vectors: List[List[float]], payloads: List[Dict[str, Any]], ids: Optional[List[str]] = None):
+        raise NotImplementedError
 
     def search(self, vector: List[float], limit: int = 10):
-        return self.client.query_points(
-            collection_name=self.collection_name,
-            query=vector,
-            limit=limit
-        ).points
+        raise NotImplementedError
+
+    def search_batch(self, vectors: List[List[float]], limit: int = 10):
+        # One result list per query vector, in order
+        return [self.search(vector, limit) for vector in vectors]
+
+    def hybrid_search(self, text: str, vector: List[float], limit: int = 10):
+        return self.hybrid_search_batch([text], [vector], limit)[0]
+
+    def hybrid_search_batch(self, texts: List[str], vectors: List[List[float]], limit: int = 10):
+        return self.search_batch(vectors, limit)
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def point_ids(self) -> List[str]:
+        raise NotImplementedError
+
+    def retrieve(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        # id -> payload for the ids that exist
+        raise NotImplementedError
+
+    def similarity(self, vector: List[float], ids: List[str]) -> Dict[str, float]:
+        # id -> cosine similarity to `vector` for the ids that exist
+        raise NotImplementedError
+
+    def scan(self, batch_size: int = 10000):
+        # Yields (ids, payloads) batches covering the whole collection
+        raise NotImplementedError
+
+    def delete(self, ids: List[str]) -> int:
+        raise NotImplementedError
+
+    def compact(self):
+        # Reclaim space left by deletes; backends that do this on their own skip it
+        pass
+
+    def reset(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def open_vector_db(backend: str = "qdrant", collection_name: str = "gifs", path: Optional[str] = None,
+                   memory: bool = False, dim: int = 384, **options) -> VectorDB:
+    # Backends are imported on demand; qdrant_client alone takes ~1s to import
+    if backend == "qdrant":
+        from services.qdrant_db import QdrantVectorDB
+        return QdrantVectorDB(collection_name, memory=memory, path=path or "./qdrant_data", dim=dim, **options)
+    if backend == "numpy":
+        from services.numpy_db import NumpyVectorDB
+        return NumpyVectorDB(collection_name, memory=memory, path=path or "./vector_data", dim=dim, **options)
+    raise ValueError(f"Unknown vector DB backend: {backend}")
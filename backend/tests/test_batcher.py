@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from models.batcher import EmbeddingBatcher
+
+
+class RecordingModel:
+    def __init__(self, error=None):
+        self.calls = []
+        self.error = error
+
+    def encode(self, texts):
+        self.calls.append(list(texts))
+        if self.error:
+            raise self.error
+        return [[float(len(text))] for text in texts], 1.0
+
+
+def test_concurrent_requests_share_one_batch():
+    async def run():
+        model = RecordingModel()
+        batcher = EmbeddingBatcher(model, window_ms=50, max_batch_size=8)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.encode("x" * i) for i in range(1, 5)))
+        await batcher.stop()
+
+        assert model.calls == [["x", "xx", "xxx", "xxxx"]]
+        # Every caller gets its own row back
+        assert [embedding for embedding, _ in results] == [[1.0], [2.0], [3.0], [4.0]]
+        assert batcher.stats()["batch_size"]["count"] == 1
+    asyncio.run(run())
+
+
+def test_a_lone_request_is_flushed_after_the_window():
+    async def run():
+        model = RecordingModel()
+        batcher = EmbeddingBatcher(model, window_ms=20, max_batch_size=8)
+        batcher.start()
+        started = time.perf_counter()
+        embedding, _ = await asyncio.wait_for(batcher.encode("cat"), timeout=5)
+        elapsed = time.perf_counter() - started
+        await batcher.stop()
+
+        assert embedding == [3.0]
+        assert model.calls == [["cat"]]
+        # Waited for the window, not for the batch to fill up
+        assert 0.015 <= elapsed < 1
+    asyncio.run(run())
+
+
+def test_a_full_batch_is_dispatched_without_waiting():
+    async def run():
+        model = RecordingModel()
+        batcher = EmbeddingBatcher(model, window_ms=10000, max_batch_size=2)
+        batcher.start()
+        await asyncio.wait_for(asyncio.gather(batcher.encode("a"), batcher.encode("b")), timeout=5)
+        await batcher.stop()
+        assert model.calls == [["a", "b"]]
+    asyncio.run(run())
+
+
+def test_model_error_reaches_every_waiter():
+    async def run():
+        model = RecordingModel(error=RuntimeError("out of memory"))
+        batcher = EmbeddingBatcher(model, window_ms=50, max_batch_size=8)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.encode(t) for t in ("a", "b", "c")), return_exceptions=True)
+        assert len(model.calls) == 1
+        assert all(isinstance(r, RuntimeError) and str(r) == "out of memory" for r in results)
+
+        # The batcher keeps serving after a failed batch
+        model.error = None
+        assert (await batcher.encode("dd"))[0] == [2.0]
+        await batcher.stop()
+    asyncio.run(run())
+
@@ -0,0 +1,82 @@
+import os
+import warnings
+
+import numpy as np
+import pytest
+
+from models.classifier import LinearClassifier
+
+sklearn = pytest.importorskip("sklearn")
+joblib = pytest.importorskip("joblib")
+from sklearn.linear_model import LogisticRegression
+from sklearn.multiclass import OneVsRestClassifier
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+TOLERANCE = 1e-4
+
+
+def unit_vectors(n, dim, seed=0):
+    X = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def assert_parity(clf, exported, X):
+    expected = clf.predict_proba(X)
+    actual = exported.predict_proba(X)
+    assert np.abs(expected - actual).max() < TOLERANCE
+    assert (expected.argmax(axis=1) == actual.argmax(axis=1)).all()
+
+
+def roundtrip(clf, labels, tmp_path):
+    path = str(tmp_path / "classifier.npz")
+    LinearClassifier.from_sklearn(clf, labels).save(path)
+    return LinearClassifier.load(path)
+
+
+@pytest.fixture
+def training_data():
+    X = unit_vectors(600, 32, seed=1)
+    y = (X[:, :4] * [1, 2, 3, 4]).argmax(axis=1)
+    return X, y
+
+
+def test_shipped_artifact_matches_pickle():
+    pkl_path = os.path.join(MODELS_DIR, "emotion_classifier.pkl")
+    npz_path = os.path.join(MODELS_DIR, "emotion_classifier.npz")
+    if not (os.path.exists(pkl_path) and os.path.exists(npz_path)):
+        pytest.skip("classifier artifacts not present")
+    with warnings.catch_warnings():
+        # Pickled by an older scikit-learn; the coefficients are what matters
+        warnings.simplefilter("ignore")
+        data = joblib.load(pkl_path)
+    exported = LinearClassifier.load(npz_path)
+    assert exported.labels == [data["labels"][int(c)] for c in data["model"].classes_]
+    assert_parity(data["model"], exported, unit_vectors(2000, exported.weights.shape[1]))
+
+
+def test_multinomial(training_data, tmp_path):
+    X, y = training_data
+    clf = LogisticRegression(max_iter=1000).fit(X, y)
+    exported = roundtrip(clf, ["a", "b", "c", "d"], tmp_path)
+    assert exported.activation == "softmax"
+    assert_parity(clf, exported, unit_vectors(500, 32))
+
+
+def test_multiclass_one_vs_rest(training_data, tmp_path):
+    X, y = training_data
+    clf = OneVsRestClassifier(LogisticRegression(max_iter=1000)).fit(X, y)
+    exported = roundtrip(clf, ["a", "b", "c", "d"], tmp_path)
+    assert exported.activation == "ovr"
+    assert_parity(clf, exported, unit_vectors(500, 32))
+
+
+def test_multilabel_one_vs_rest(training_data, tmp_path):
+    X, y = training_data
+    Y = np.stack([y == 0, y == 1, (y == 2) | (y == 3), np.zeros(len(y), dtype=bool)], axis=1).astype(int)
+    with warnings.catch_warnings():
+        # The last label never occurs and gets a constant predictor
+        warnings.simplefilter("ignore")
+        clf = OneVsRestClassifier(LogisticRegression(max_iter=1000)).fit(X, Y)
+    exported = roundtrip(clf, ["a", "b", "c", "d"], tmp_path)
+    assert exported.activation == "sigmoid"
+    assert_parity(clf, exported, unit_vectors(500, 32))
@@ -0,0 +1,29 @@
+import asyncio
+
+import numpy as np
+
+from services.conversation import ConversationContext
+
+
+async def slow_encode(texts):
+    await asyncio.sleep(0.05)
+    return [np.ones(4, dtype=np.float32) for _ in texts], {}
+
+
+def test_concurrent_first_requests_share_one_session():
+    async def run():
+        context = ConversationContext(slow_encode, window=10)
+        await asyncio.gather(*(context.update("channel", [f"message {i}"]) for i in range(5)))
+        _, info = await context.update("channel", [])
+        assert info["total_messages"] == 5
+        assert len(context.sessions) == 1
+    asyncio.run(run())
+
+
+def test_reset_replaces_the_session():
+    async def run():
+        context = ConversationContext(slow_encode, window=10)
+        await context.update("channel", ["a", "b"])
+        _, info = await context.update("channel", ["c"], reset=True)
+        assert info["total_messages"] == 1
+    asyncio.run(run())
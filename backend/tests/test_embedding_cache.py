@@ -0,0 +1,54 @@
+import numpy as np
+
+from models.embedding_cache import EmbeddingCache
+
+
+def vector(i, dim=4):
+    return np.full(dim, i, dtype=np.float32)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = EmbeddingCache("model", dim=4, capacity=2)
+    cache.put("a", vector(1))
+    cache.put("b", vector(2))
+    # Touch "a" so "b" becomes the oldest
+    assert cache.get("a") is not None
+    cache.put("c", vector(3))
+
+    assert cache.get("b") is None
+    np.testing.assert_array_equal(cache.get("a"), vector(1))
+    np.testing.assert_array_equal(cache.get("c"), vector(3))
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_memmapped_entries_survive_a_reload(tmp_path):
+    path = str(tmp_path / "cache")
+    cache = EmbeddingCache("model", dim=4, capacity=8, path=path)
+    cache.put("hello world", vector(5))
+    cache.put("bye", vector(6))
+    cache.flush()
+    del cache
+
+    reloaded = EmbeddingCache("model", dim=4, capacity=8, path=path)
+    assert reloaded.stats()["size"] == 2
+    np.testing.assert_array_equal(reloaded.get("hello   world"), vector(5))
+    np.testing.assert_array_equal(reloaded.get("bye"), vector(6))
+    # New entries go to free rows, never over a restored one
+    reloaded.put("new", vector(7))
+    np.testing.assert_array_equal(reloaded.get("bye"), vector(6))
+
+    # A different model or shape starts cold instead of reusing the rows
+    assert EmbeddingCache("other", dim=4, capacity=8, path=path).stats()["size"] == 0
+
+
+def test_stats_count_hits_and_misses():
+    cache = EmbeddingCache("model", dim=4, capacity=4)
+    assert cache.get("a") is None
+    cache.put("a", vector(1))
+    cache.get("a")
+    cache.get_many(["a", "b"])
+
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["hit_rate"] == 0.5
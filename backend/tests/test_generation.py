@@ -0,0 +1,131 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.generation import GENERATION_BUCKETS_MS, FakeImageGenerator, GenerationQueue
+from services.media import MediaStore
+
+
+class FailingGenerator(FakeImageGenerator):
+    def generate(self, prompt: str) -> bytes:
+        self.calls += 1
+        raise RuntimeError("quota exceeded")
+
+
+class BlockingGenerator(FakeImageGenerator):
+    def __init__(self):
+        super().__init__(delay=0)
+        self.release = threading.Event()
+
+    def generate(self, prompt: str) -> bytes:
+        self.release.wait(10)
+        return super().generate(prompt)
+
+
+def make_queue(tmp_path, generator=None, **options):
+    return GenerationQueue(generator or FakeImageGenerator(delay=0.05), MediaStore(str(tmp_path / "media")), **options)
+
+
+def test_repeated_prompt_is_served_from_the_media_store(tmp_path):
+    async def run():
+        queue = make_queue(tmp_path)
+        queue.start()
+        first = await queue.wait(queue.submit("a cat"), timeout=5)
+        assert first.status == "done" and not first.cached
+
+        second = queue.submit("a cat")
+        assert second.id != first.id
+        assert second.cached and second.status == "done"
+        assert queue.generator.calls == 1
+        assert queue.cache_hits == 1
+        await queue.stop()
+    asyncio.run(run())
+
+
+def test_concurrent_identical_prompts_share_one_job(tmp_path):
+    async def run():
+        queue = make_queue(tmp_path)
+        queue.start()
+        jobs = [queue.submit("a dog") for _ in range(3)]
+        assert len({job.id for job in jobs}) == 1
+        await queue.wait(jobs[0], timeout=5)
+        assert jobs[0].status == "done"
+        assert queue.generator.calls == 1
+        assert queue.deduplicated == 2
+        await queue.stop()
+    asyncio.run(run())
+
+
+def test_full_queue_rejects_new_prompts(tmp_path):
+    async def run():
+        # No workers: the first job stays queued
+        queue = make_queue(tmp_path, max_queued=1)
+        queue.submit("first")
+        with pytest.raises(asyncio.QueueFull):
+            queue.submit("second")
+        assert queue.rejected == 1
+        # Dedup still answers a prompt that is already queued
+        assert queue.submit("first").prompt == "first"
+    asyncio.run(run())
+
+
+def test_generate_endpoint_returns_429_when_the_queue_is_full(tmp_path, monkeypatch):
+    import main
+
+    queue = make_queue(tmp_path, max_queued=1)
+    monkeypatch.setattr(main, "generation", queue)
+    # Without the startup events; the queue has no workers
+    client = TestClient(main.app)
+    assert client.post("/api/generate", json={"prompt": "first"}).status_code == 202
+    response = client.post("/api/generate", json={"prompt": "second"})
+    assert response.status_code == 429
+
+
+def test_generator_error_marks_the_job_failed(tmp_path):
+    async def run():
+        queue = make_queue(tmp_path, FailingGenerator())
+        queue.start()
+        job = await queue.wait(queue.submit("a bird"), timeout=5)
+        assert job.status == "error"
+        assert job.error == "quota exceeded"
+        assert queue.failed == 1
+        # Nothing was stored, so the next submit retries instead of reusing the failure
+        retry = queue.submit("a bird")
+        assert retry.id != job.id and not retry.cached
+        await queue.wait(retry, timeout=5)
+        assert queue.generator.calls == 2
+        await queue.stop()
+    asyncio.run(run())
+
+
+def test_expiry_never_drops_running_jobs(tmp_path):
+    async def run():
+        generator = BlockingGenerator()
+        queue = make_queue(tmp_path, generator, workers=1, max_jobs=1, job_ttl=0)
+        queue.start()
+        running = queue.submit("slow")
+        while running.status != "running":
+            await asyncio.sleep(0.01)
+        queued = queue.submit("next")
+
+        # Over max_jobs and past the TTL, but neither job has finished
+        queue._expire()
+        assert running.id in queue.jobs and queued.id in queue.jobs
+
+        generator.release.set()
+        await queue.wait(queued, timeout=5)
+        queue._expire()
+        assert running.id not in queue.jobs and queued.id not in queue.jobs
+        await queue.stop()
+    asyncio.run(run())
+
+
+def test_generation_latency_is_bucketed_past_ten_seconds(tmp_path):
+    queue = make_queue(tmp_path)
+    queue.generate_ms.observe(45000)
+    snapshot = queue.generate_ms.snapshot()
+    assert snapshot["p50"] == 60000
+    assert snapshot["buckets"]["+Inf"] == 0
+    assert GENERATION_BUCKETS_MS[-1] >= 300000
@@ -0,0 +1,52 @@
+import numpy as np
+
+from services.hybrid import HybridVectorDB
+from services.retrieval import RetrievalEngine, RetrievalPolicy
+from services.vector_db import ScoredPoint, open_vector_db
+
+
+def test_fused_results_keep_the_cosine_score():
+    db = open_vector_db("numpy", memory=True, dim=3)
+    hybrid = HybridVectorDB(db, candidates=2)
+    vectors = np.array([[1.0, 0.0, 0.0], [0.9, 0.1, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+    payloads = [
+        {"id": "a", "title": "typing cat", "query": "cat"},
+        {"id": "b", "title": "sleepy cat", "query": "cat"},
+        {"id": "c", "title": "hackerman", "query": "computer"},
+        {"id": "d", "title": "hackerman typing fast", "query": "keyboard"},
+    ]
+    hybrid.upsert(vectors, payloads, ids=["a", "b", "c", "d"])
+
+    query = np.array([1.0, 0.2, 0.0], dtype=np.float32)
+    results = hybrid.hybrid_search("hackerman typing", query.tolist(), limit=4)
+
+    # Ordered by fusion rank
+    rrf = [p.rrf for p in results]
+    assert rrf == sorted(rrf, reverse=True)
+    # `score` is the cosine for dense and lexical-only hits alike
+    unit = query / np.linalg.norm(query)
+    expected = {pid: float(v / np.linalg.norm(v) @ unit) for pid, v in zip("abcd", vectors)}
+    assert {p.id for p in results} >= {"a", "d"}
+    for point in results:
+        assert np.isclose(point.score, expected[point.id], atol=1e-6)
+    # A lexical-only match does not clear a cosine threshold it is far from
+    assert next(p for p in results if p.id == "d").score < 0.6
+
+
+def test_full_lexical_coverage_counts_as_a_local_hit():
+    engine = RetrievalEngine([RetrievalPolicy("swr", "swr", min_hits=1, min_top_score=0.7)], "swr", threshold=0.6)
+    policy = engine.get("swr")
+    hits = [
+        ScoredPoint("dense", 0.4, {}),
+        ScoredPoint("title", 0.2, {}, rrf=0.03, coverage=1.0),
+        ScoredPoint("partial", 0.3, {}, rrf=0.02, coverage=0.5),
+    ]
+    decision = engine.decide(policy, "hackerman", hits, limit=5)
+    assert [r.id for r in decision.results] == ["title"]
+    # Served locally: the exact title match is confident on its coverage
+    assert not decision.upstream
+    assert engine.stats()["policies"]["swr"]["lexical_hits"] == 1
+
+    # Below the coverage bar only the cosine counts
+    decision = engine.decide(policy, "hackerman", hits[2:], limit=5)
+    assert decision.results == [] and decision.upstream
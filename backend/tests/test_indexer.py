@@ -0,0 +1,40 @@
+import asyncio
+import threading
+import time
+
+from services.indexer import IndexWriter
+from utils.executors import BoundedPool
+
+
+class SlowDB:
+    def __init__(self):
+        self.points = {}
+        self.started = threading.Event()
+
+    def upsert(self, vectors, payloads, ids):
+        self.started.set()
+        time.sleep(0.2)
+        self.points.update(zip(ids, payloads))
+
+    def reset(self):
+        self.points.clear()
+
+
+def test_reset_waits_for_the_batch_in_flight():
+    async def run():
+        db = SlowDB()
+        pool = BoundedPool("test", 2)
+        indexer = IndexWriter(db, pool=pool)
+        indexer.submit([[0.0]], [{"id": "a", "query": "q"}])
+        flush = asyncio.create_task(indexer.flush())
+        # The batch has left `pending` and is being written
+        await asyncio.to_thread(db.started.wait)
+        assert not indexer.pending
+
+        async def wipe():
+            db.reset()
+        await indexer.reset(wipe)
+        await flush
+        assert db.points == {}
+        pool.shutdown()
+    asyncio.run(run())
@@ -0,0 +1,15 @@
+import json
+
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS
+
+
+def test_observations_above_the_top_bucket_stay_json_serializable():
+    histogram = Histogram()
+    histogram.observe(3)
+    histogram.observe(12000)
+    snapshot = histogram.snapshot()
+    # Starlette's JSONResponse rejects inf/nan the same way
+    json.dumps(snapshot, allow_nan=False)
+    assert snapshot["p99"] == LATENCY_BUCKETS_MS[-1]
+    assert snapshot["p50"] == 5
+    assert snapshot["buckets"]["+Inf"] == 1
@@ -0,0 +1,54 @@
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("hnswlib")
+
+from services.numpy_db import NumpyVectorDB
+
+
+def unit_vectors(n, dim, seed):
+    X = np.random.default_rng(seed).standard_normal((n, dim)).astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def test_hnsw_builds_in_the_background_and_replays_writes():
+    dim = 32
+    db = NumpyVectorDB(memory=True, dim=dim, hnsw_threshold=5000, hnsw_ef_construction=400)
+    X = unit_vectors(6000, dim, 0)
+    ids = [f"p{i}" for i in range(len(X))]
+    db.upsert(X, [{"i": i} for i in range(len(X))], ids=ids)
+    # The upsert that crossed the threshold returned before the graph exists
+    assert db.hnsw is None and db.hnsw_build is not None
+
+    # Writes during the build: new points, an overwrite and deletes
+    extra = unit_vectors(10, dim, 1)
+    db.upsert(extra, [{"i": -1}] * 10, ids=[f"new{i}" for i in range(10)])
+    db.upsert(-X[:1], [{"i": "moved"}], ids=["p0"])
+    db.delete(["p1", "new9"])
+    # Still answered by brute force while building
+    assert db.search(extra[0].tolist(), limit=1)[0].id == "new0"
+
+    assert db.wait_for_index(timeout=60)
+    assert db.hnsw_build is None and db.hnsw_dirty is None
+    assert db.search(extra[3].tolist(), limit=1)[0].id == "new3"
+    assert db.search((-X[0]).tolist(), limit=1)[0].payload == {"i": "moved"}
+    hits = {p.id for v in (X[1], extra[9]) for p in db.search(v.tolist(), limit=5)}
+    assert not hits & {"p1", "new9"}
+    db.close()
+
+
+def test_reset_drops_a_build_in_progress():
+    dim = 32
+    db = NumpyVectorDB(memory=True, dim=dim, hnsw_threshold=5000)
+    X = unit_vectors(6000, dim, 2)
+    db.upsert(X, [{}] * len(X), ids=[f"p{i}" for i in range(len(X))])
+    build = db.hnsw_build
+    db.reset()
+    db.upsert(X[:3], [{}] * 3, ids=["a", "b", "c"])
+    build.join(60)
+    time.sleep(0.05)
+    assert db.hnsw is None
+    assert [p.id for p in db.search(X[1].tolist(), limit=1)] == ["b"]
+    db.close()
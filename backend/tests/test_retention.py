@@ -0,0 +1,63 @@
+import asyncio
+
+import numpy as np
+
+from services.result_cache import SemanticResultCache
+from services.retention import RetentionManager
+from utils.ids import point_id
+
+
+class FakeDB:
+    def __init__(self, ids):
+        self.ids = set(ids)
+
+    def count(self):
+        return len(self.ids)
+
+    def point_ids(self):
+        return list(self.ids)
+
+    def delete(self, ids):
+        deleted = self.ids & set(ids)
+        self.ids -= deleted
+        return len(deleted)
+
+
+def test_eviction_drops_cached_results_that_returned_the_point(tmp_path):
+    async def run():
+        cold, warm = point_id("g1", "cat"), point_id("g2", "dog")
+        cache = SemanticResultCache(dim=2)
+        cache.put("cat", [1.0, 0.0], 5, [{"id": "g1", "query": "cat"}])
+        cache.put("dog", [0.0, 1.0], 5, [{"id": "g2", "query": "dog"}])
+
+        retention = RetentionManager(
+            FakeDB([cold, warm]), path=str(tmp_path / "retention.db"), max_points=1, low_watermark=1.0,
+            on_evict=cache.forget
+        )
+        retention.record_inserts([cold, warm])
+        retention.record_hits([warm])
+        assert await retention.enforce() == {"evicted_size": 1, "evicted_age": 0}
+
+        assert cache.get("cat", np.array([1.0, 0.0]), 5) is None
+        assert cache.get("dog", np.array([0.0, 1.0]), 5) == [{"id": "g2", "query": "dog"}]
+        assert cache.stats()["invalidations"] == 1
+        await retention.stop()
+    asyncio.run(run())
+
+
+def test_stale_tracked_ids_are_dropped_without_counting_as_evictions(tmp_path):
+    async def run():
+        live = ["a", "b", "c"]
+        db = FakeDB(live)
+        retention = RetentionManager(
+            db, path=str(tmp_path / "retention.db"), max_points=2, low_watermark=1.0, batch_size=1
+        )
+        # Tracked, never hit (so coldest), but already gone from the store
+        retention.record_inserts(["gone1", "gone2"] + live)
+        retention.record_hits(live)
+        assert await retention.enforce() == {"evicted_size": 1, "evicted_age": 0}
+        assert db.count() == 2
+        assert retention.stats()["dropped_stale"] == 2
+        assert retention.tracked() == 2
+        await retention.stop()
+    asyncio.run(run())
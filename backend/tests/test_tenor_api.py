@@ -0,0 +1,69 @@
+import asyncio
+import importlib
+
+import pytest
+
+import config
+import stub_tenor
+from services.tenor_api import TenorAPI
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    # Delayed enough that concurrent requests overlap; q=fail answers 500
+    server = stub_tenor.serve(latency=0.1, fail=("fail",))
+    monkeypatch.setenv("TENOR_API_KEY", "test")
+    monkeypatch.setenv("TENOR_BASE_URL", "http://127.0.0.1:%d" % server.server_address[1])
+    yield server.RequestHandlerClass
+    server.shutdown()
+    server.server_close()
+    monkeypatch.undo()
+    importlib.reload(config)
+
+
+def make_client(**options):
+    # Built the way main.py does, from config
+    importlib.reload(config)
+    return TenorAPI(base_url=config.TENOR_BASE_URL, **options)
+
+
+def test_ttl_cache(stub):
+    async def run():
+        tenor = make_client(cache_ttl=0.3)
+        try:
+            first = await tenor.search("cat", limit=3)
+            second = await tenor.search("cat", limit=3)
+            assert first == second and len(first) == 3
+            assert stub.queries["cat"] == 1
+            await asyncio.sleep(0.4)
+            await tenor.search("cat", limit=3)
+            assert stub.queries["cat"] == 2
+        finally:
+            await tenor.aclose()
+    asyncio.run(run())
+
+
+def test_concurrent_identical_queries_share_one_call(stub):
+    async def run():
+        tenor = make_client()
+        try:
+            results = await asyncio.gather(*[tenor.search("dog", limit=3) for _ in range(20)])
+            assert all(r == results[0] for r in results)
+            assert stub.queries["dog"] == 1
+            assert tenor.stats()["coalesced"] == 19
+        finally:
+            await tenor.aclose()
+    asyncio.run(run())
+
+
+def test_upstream_error_returns_empty_and_is_not_cached(stub):
+    async def run():
+        tenor = make_client()
+        try:
+            assert await tenor.search("fail") == []
+            assert await tenor.search("fail") == []
+            assert stub.queries["fail"] == 2
+            assert tenor.stats()["upstream_errors"] == 2
+        finally:
+            await tenor.aclose()
+    asyncio.run(run())
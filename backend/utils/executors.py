@@ -0,0 +1,65 @@
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import List
+
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS
+
+
+# Thread pool with an async front door. At most `max_concurrency` calls run at
+# once; the rest wait on the semaphore (queue depth) without holding a thread,
+# so a burst on one pool never starves the event loop or the other pools.
+class BoundedPool:
+    def __init__(self, name: str, max_workers: int, max_concurrency: int = None,
+                 buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_concurrency = max_concurrency or max_workers
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_ms = Histogram(buckets)
+        self.run_ms = Histogram(buckets)
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        enqueued = time.perf_counter()
+        self.queued += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.queued -= 1
+        started = time.perf_counter()
+        self.wait_ms.observe((started - enqueued) * 1000)
+        self.active += 1
+        try:
+            result = await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+            self.run_ms.observe((time.perf_counter() - started) * 1000)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        return {
+            "max_workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "queued": self.queued,
+            "active": self.active,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_ms": self.wait_ms.snapshot(),
+            "run_ms": self.run_ms.snapshot(),
+        }
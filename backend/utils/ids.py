@@ -0,0 +1,9 @@
+import uuid
+
+# Fixed namespace so the same GIF found by the same query always maps to the same point
+POINT_NAMESPACE = uuid.UUID("6f1c3d4e-2b8a-4c5e-9d71-3a0f8e6b2c19")
+
+
+def point_id(gif_id: str, query: str = "") -> str:
+    normalized = " ".join(query.split()).lower()
+    return str(uuid.uuid5(POINT_NAMESPACE, f"{normalized}\n{gif_id}"))
@@ -0,0 +1,144 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from utils.metrics import Histogram, LATENCY_BUCKETS_MS, prometheus_histogram, prometheus_labels
+
+# Stage durations of the current request (stage -> ms), set by ServerTimingMiddleware.
+# Tasks spawned by a request inherit it; anything outside a request records
+# into the histograms only.
+_request_timings: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+# Process-wide latency histograms per stage (encode, vector_search,
+# tenor_fetch, upsert, classify, ...) and event counters, rendered in the
+# Prometheus text format. Stages are timed in milliseconds like every other
+# histogram here and exported in seconds.
+class Instrumentation:
+    def __init__(self, prefix: str = "contextual"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.requests: Dict[Tuple[str, str, str], Histogram] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.help: Dict[str, str] = {}
+        # Extra samples computed at scrape time: () -> [(name, type, help, labels, value)]
+        self.collectors: List[Callable[[], Iterable[tuple]]] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - started) * 1000)
+
+    def observe(self, stage: str, ms: float, buckets: List[float] = LATENCY_BUCKETS_MS):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.stages.setdefault(stage, Histogram(buckets))
+        histogram.observe(ms)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + ms
+
+    def count(self, name: str, value: float = 1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def describe(self, name: str, help: str):
+        self.help[name] = help
+
+    def observe_request(self, method: str, route: str, status: int, ms: float):
+        key = (method, route, str(status))
+        histogram = self.requests.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.requests.setdefault(key, Histogram())
+        histogram.observe(ms)
+
+    def render(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_stage_duration_seconds Time spent in each processing stage",
+            f"# TYPE {p}_stage_duration_seconds histogram",
+        ]
+        for stage, histogram in sorted(self.stages.items()):
+            lines += prometheus_histogram(f"{p}_stage_duration_seconds", histogram, {"stage": stage}, 0.001)
+
+        lines += [
+            f"# HELP {p}_http_request_duration_seconds HTTP request latency by route",
+            f"# TYPE {p}_http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), histogram in sorted(self.requests.items()):
+            labels = {"method": method, "route": route, "status": status}
+            lines += prometheus_histogram(f"{p}_http_request_duration_seconds", histogram, labels, 0.001)
+
+        with self.lock:
+            counters = sorted(self.counters.items())
+        by_name: Dict[str, list] = {}
+        for (name, labels), value in counters:
+            by_name.setdefault(name, []).append((dict(labels), value))
+        for name, samples in by_name.items():
+            lines.append(f"# HELP {p}_{name}_total {self.help.get(name, name.replace('_', ' '))}")
+            lines.append(f"# TYPE {p}_{name}_total counter")
+            lines += [f"{p}_{name}_total{prometheus_labels(labels)} {value:g}" for labels, value in samples]
+
+        # Samples of one metric must be contiguous, whatever order collectors yield them in
+        families: Dict[str, list] = {}
+        for collector in self.collectors:
+            for name, kind, help, labels, value in collector():
+                family = families.setdefault(name, [f"# HELP {p}_{name} {help}", f"# TYPE {p}_{name} {kind}"])
+                family.append(f"{p}_{name}{prometheus_labels(labels)} {float(value):g}")
+        for family in families.values():
+            lines += family
+        return "\n".join(lines) + "\n"
+
+
+metrics = Instrumentation()
+
+
+def server_timing(timings: Dict[str, float], total_ms: float) -> str:
+    parts = [f"{stage};dur={ms:.1f}" for stage, ms in timings.items()]
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+# ASGI middleware: times each HTTP request, records it per route, and adds a
+# Server-Timing header with the stages that ran before the response started.
+# Streaming responses report what ran before the first byte.
+class ServerTimingMiddleware:
+    def __init__(self, app, instrumentation: Instrumentation = metrics):
+        self.app = app
+        self.metrics = instrumentation
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings: Dict[str, float] = {}
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                total = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings, total).encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.metrics.observe_request(scope["method"], route, status[0], (time.perf_counter() - started) * 1000)
@@ -0,0 +1,42 @@
+import logging
+import logging.handlers
+import queue
+import sys
+
+log = logging.getLogger("contextual")
+
+_listener = None
+
+
+# Request-path logging goes through a queue: callers only enqueue the record
+# and a listener thread does the formatting and the write to stdout, so a slow
+# terminal or pipe never stalls the event loop. Use %-style arguments
+# (log.info("x %s", y)) so disabled levels cost nothing.
+def setup_logging(level: str = "INFO"):
+    global _listener
+    if _listener is not None:
+        return log
+    records = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(message)s"))
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    log.addHandler(QueuedHandler(records))
+    log.setLevel(level.upper())
+    log.propagate = False
+    return log
+
+
+def stop_logging():
+    # Flushes whatever is still queued
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+class QueuedHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock handler formats the message in the caller's thread so the
+        # record could be pickled; this queue never leaves the process
+        return record
@@ -0,0 +1,91 @@
+import threading
+from typing import Dict, List
+
+# Default bucket bounds for millisecond latencies
+LATENCY_BUCKETS_MS = [0.5, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class Histogram:
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = sorted(buckets)
+        # Last slot counts observations above the largest bound (+Inf)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                idx = i
+                break
+        with self.lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float:
+        # Upper bound of the bucket containing the q-th observation. Above the
+        # largest bound this is that bound (a lower limit): infinity is not
+        # valid JSON and would break /api/stats.
+        with self.lock:
+            if not self.count:
+                return 0.0
+            target = q * self.count
+            seen = 0
+            for i, c in enumerate(self.counts):
+                seen += c
+                if seen >= target:
+                    break
+            return self.buckets[min(i, len(self.buckets) - 1)]
+
+    def cumulative(self):
+        # (bounds, cumulative counts including +Inf, sum, count), consistent with each other
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        running = 0
+        cumulative = []
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return self.buckets, cumulative, total, count
+
+    def snapshot(self) -> Dict[str, object]:
+        with self.lock:
+            count, total = self.count, self.sum
+            buckets = {str(b): c for b, c in zip(self.buckets, self.counts)}
+            buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": count,
+            "mean": total / count if count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+
+# Prometheus text exposition (version 0.0.4)
+
+def prometheus_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_histogram(name: str, histogram: Histogram, labels: Dict[str, str], scale: float = 1.0) -> List[str]:
+    # scale converts the recorded unit, e.g. 0.001 for milliseconds -> seconds
+    bounds, cumulative, total, count = histogram.cumulative()
+    lines = []
+    for bound, c in zip(list(bounds) + ["+Inf"], cumulative):
+        le = bound if bound == "+Inf" else format(bound * scale, "g")
+        lines.append(f"{name}_bucket{prometheus_labels({**labels, 'le': le})} {c}")
+    lines.append(f"{name}_sum{prometheus_labels(labels)} {total * scale:g}")
+    lines.append(f"{name}_count{prometheus_labels(labels)} {count}")
+    return lines
@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+
+# Token bucket for async callers: `rate` acquisitions per second on average,
+# up to `burst` back to back. A rate of 0 disables the limit.
+class TokenBucket:
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.waited = 0.0
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Callers queue on the lock, so tokens are handed out in arrival order
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)